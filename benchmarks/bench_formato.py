@@ -0,0 +1,131 @@
+"""Formato verboso vs. compacto: tokens de saída e latência estimada (ou medida, com --ao-vivo)
+
+Offline, cada processo sintético é escrito como o modelo escreveria nos dois
+formatos; os tokens vêm do tiktoken (cl100k, se instalado) ou de ~4
+caracteres por token, e a latência de geração é estimada por
+--tokens-por-segundo. A economia é medida contra o verboso minificado, que
+é o que o modelo de fato emite (o indentado aparece só como referência).
+Confere também que expandir(compacto) reproduz o processo original (a menos
+dos ids).
+
+Com --ao-vivo (requer GOOGLE_API_KEY), gera as descrições de exemplo nos dois
+formatos, sem cache, e mede tokens de saída (usage_metadata) e tempo real.
+
+Uso:
+    python -m benchmarks.bench_formato
+    python -m benchmarks.bench_formato --nos 10 30 100 --tokens-por-segundo 150
+    python -m benchmarks.bench_formato --ao-vivo --modelo gemini-2.5-flash --repeticoes 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.compacto import PROMPT_COMPACTO, compactar, expandir
+
+DESCRICOES = (
+    "Processo de compra:\n1. Funcionário cria pedido\n2. Se valor < R$1000: aprova automático\n"
+    "3. Se valor >= R$1000: gerente aprova\n4. Compras executa\n5. Finaliza",
+    "Atendimento: o cliente abre um chamado, o sistema classifica a prioridade, o suporte "
+    "analisa; se for bug, o time de desenvolvimento corrige e o suporte responde ao cliente, "
+    "senão o suporte responde direto. O cliente avalia o atendimento.",
+    "Contratação: RH publica a vaga, recebe currículos e faz triagem. O gestor entrevista os "
+    "candidatos aprovados. Se aprovar, RH faz a proposta e, em paralelo, TI prepara o acesso e "
+    "Facilities prepara a estação. O novo funcionário assina o contrato.",
+)
+
+
+def contador_de_tokens():
+    """(função texto -> tokens, nome do método)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda texto: len(texto) / 4), "~4 caracteres/token"
+    codificador = tiktoken.get_encoding("cl100k_base")
+    return (lambda texto: len(codificador.encode(texto))), "tiktoken cl100k"
+
+
+def _canonico(data: dict) -> tuple:
+    indice = {e["id"]: i for i, e in enumerate(data["elementos"])}
+    return (
+        [(e.get("tipo"), e.get("nome"), e.get("papel")) for e in data["elementos"]],
+        sorted((indice[f["origem"]], indice[f["destino"]], f.get("nome") or "") for f in data["fluxos"]),
+    )
+
+
+def offline(args) -> None:
+    tokens, metodo = contador_de_tokens()
+    from gerador_bpmn.geracao import PROMPT_SYSTEM
+    print(f"tokens: {metodo} · geração a {args.tokens_por_segundo:.0f} tokens/s")
+    print(f"prompt de sistema: verboso {tokens(PROMPT_SYSTEM):.0f} · compacto {tokens(PROMPT_COMPACTO):.0f} tokens")
+    print(f"{'nós':>5} | {'indentado':>9} {'minificado':>10} {'compacto':>9} | {'economia':>8} | "
+          f"{'s verboso':>9} {'s compacto':>10}")
+    for n in args.nos:
+        data = gerar_processo(n, n_raias=args.raias, seed=0, densidade_ciclos=0.1, fanout=3)
+        compacto = compactar(data)
+        if _canonico(expandir(json.loads(json.dumps(compacto)))) != _canonico(data):
+            raise SystemExit(f"expandir(compactar(x)) diferente de x com {n} nós")
+        # O modelo responde minificado; o indentado (como no prompt) fica só de referência
+        indentado = tokens(json.dumps(data, ensure_ascii=False, indent=2))
+        verboso = tokens(json.dumps(data, ensure_ascii=False))
+        curto = tokens(json.dumps(compacto, ensure_ascii=False))
+        print(f"{n:>5} | {indentado:>9.0f} {verboso:>10.0f} {curto:>9.0f} | {1 - curto / verboso:>8.0%} | "
+              f"{verboso / args.tokens_por_segundo:>9.1f} {curto / args.tokens_por_segundo:>10.1f}")
+
+
+def ao_vivo(args) -> None:
+    from gerador_bpmn.geracao import gerar_bpmn
+    from gerador_bpmn.rastreio import metricas_padrao
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise SystemExit("--ao-vivo requer GOOGLE_API_KEY")
+
+    def _saida() -> float:
+        return metricas_padrao().resumo()["contadores"].get("tokens{tipo=completion}", 0)
+
+    medidas = {False: ([], []), True: ([], [])}
+    for descricao in DESCRICOES:
+        for _ in range(args.repeticoes):
+            for compacto in (False, True):
+                antes = _saida()
+                inicio = time.perf_counter()
+                gerar_bpmn(descricao, args.modelo, args.temperatura, api_key=api_key, compacto=compacto)
+                medidas[compacto][0].append(time.perf_counter() - inicio)
+                medidas[compacto][1].append(_saida() - antes)
+
+    print(f"{'formato':>8} | {'tokens saída (mediana)':>22} | {'s (mediana)':>11} {'s (p95)':>8}")
+    for compacto, (tempos, saidas) in medidas.items():
+        tempos = sorted(tempos)
+        print(f"{'compacto' if compacto else 'verboso':>8} | {statistics.median(saidas):>22.0f} | "
+              f"{statistics.median(tempos):>11.2f} {tempos[min(len(tempos) - 1, int(0.95 * len(tempos)))]:>8.2f}")
+    economia = 1 - statistics.median(medidas[True][1]) / max(1, statistics.median(medidas[False][1]))
+    ganho = 1 - statistics.median(medidas[True][0]) / statistics.median(medidas[False][0])
+    print(f"economia: {economia:.0%} dos tokens de saída, {ganho:.0%} do tempo de geração")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nos", type=int, nargs="+", default=[10, 30, 100])
+    parser.add_argument("--raias", type=int, default=4)
+    parser.add_argument("--tokens-por-segundo", type=float, default=200,
+                        help="Velocidade de geração do modelo, para estimar a latência")
+    parser.add_argument("--ao-vivo", action="store_true", help="Mede com o modelo real (GOOGLE_API_KEY)")
+    parser.add_argument("--modelo", default="gemini-2.5-flash")
+    parser.add_argument("--temperatura", type=float, default=0.1)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.ao_vivo:
+        ao_vivo(args)
+    else:
+        offline(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
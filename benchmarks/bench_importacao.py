@@ -0,0 +1,78 @@
+"""Tempo de import dos módulos do núcleo (partida a frio de workers em lote e handlers)
+
+Cada módulo é importado num processo novo com `python -X importtime`; vale o
+menor tempo acumulado entre as repetições. Falha (código 1) se o import
+carregar uma dependência pesada que só deveria vir quando uma geração é
+pedida (LangChain, SDK do Gemini, Streamlit), ou se passar de --limite-ms.
+
+Uso:
+    python -m benchmarks.bench_importacao
+    python -m benchmarks.bench_importacao --repeticoes 10 --limite-ms 150
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+MODULOS = (
+    "gerador_bpmn.conversao",
+    "gerador_bpmn.renderizacao",
+    "gerador_bpmn.geracao",
+    "gerador_bpmn.cli",
+    "gerador_bpmn.servico",
+)
+
+# Pacotes que o núcleo só pode importar sob demanda
+PROIBIDOS = ("langchain_core", "langchain_google_genai", "google", "streamlit", "cairosvg")
+
+
+def medir_import(modulo: str) -> tuple[float, list, list]:
+    """Tempo acumulado (ms), os 5 módulos mais caros (ms próprios) e os pacotes proibidos carregados"""
+    codigo = f"import {modulo}, sys, json; print(json.dumps(sorted(sys.modules)))"
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, check=True
+    )
+    total = 0.0
+    proprios = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        campos = linha[len("import time:"):].split("|")
+        if not campos[0].strip().isdigit():
+            continue  # cabeçalho
+        nome = campos[2].strip()
+        proprios.append((int(campos[0]) / 1000, nome))
+        if campos[2] == f" {modulo}":
+            total = int(campos[1]) / 1000
+    carregados = json.loads(processo.stdout)
+    proibidos = sorted({m.split(".")[0] for m in carregados if m.split(".")[0] in PROIBIDOS})
+    return total, sorted(proprios, reverse=True)[:5], proibidos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modulos", nargs="+", default=list(MODULOS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite-ms", type=float, default=None, help="Falha se algum módulo passar disso")
+    args = parser.parse_args()
+
+    falhou = False
+    print(f"{'módulo':<28} | {'ms':>7} | mais caros (ms próprios)")
+    for modulo in args.modulos:
+        medidas = [medir_import(modulo) for _ in range(args.repeticoes)]
+        total, caros, proibidos = min(medidas, key=lambda m: m[0])
+        resumo = ", ".join(f"{nome} {ms:.1f}" for ms, nome in caros)
+        print(f"{modulo:<28} | {total:>7.1f} | {resumo}")
+        if proibidos:
+            print(f"  carrega no import o que deveria vir sob demanda: {', '.join(proibidos)}", file=sys.stderr)
+            falhou = True
+        if args.limite_ms is not None and total > args.limite_ms:
+            print(f"  acima do limite de {args.limite_ms:.0f} ms", file=sys.stderr)
+            falhou = True
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
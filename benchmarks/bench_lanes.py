@@ -0,0 +1,61 @@
+"""Escalonamento da indexação de raias: laço antigo O(raias × elementos) vs. modelo O(n)
+
+Uso:
+    python -m benchmarks.bench_lanes
+"""
+
+import argparse
+import time
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.conversao import json_to_bpmn_xml
+from gerador_bpmn.modelo import ModeloProcesso
+
+
+def membros_legado(elementos: list) -> list:
+    """Reprodução do caminho anterior: normaliza e varre todos os elementos por raia"""
+    papeis = []
+    vistos = set()
+    normalizados = []
+    for elem in elementos:
+        chave = elem.get("papel", "Geral").strip().lower()
+        normalizados.append(chave)
+        if chave not in vistos:
+            papeis.append(elem.get("papel", "Geral").strip())
+            vistos.add(chave)
+    return [
+        [elem.get("id") for elem, chave in zip(elementos, normalizados) if chave == papel.lower()]
+        for papel in papeis
+    ]
+
+
+def cronometrar(funcao, *args, repeticoes: int = 3) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nos", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--raias", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    print(f"{'nós':>7} {'raias':>6} {'legado (ms)':>12} {'modelo (ms)':>12} "
+          f"{'xml (ms)':>10} {'µs/nó xml':>10}")
+    for n in args.nos:
+        for r in args.raias:
+            data = gerar_processo(n, n_raias=r)
+            elementos = data["elementos"]
+            legado = cronometrar(membros_legado, elementos)
+            indice = cronometrar(ModeloProcesso.from_dict, data)
+            total = cronometrar(json_to_bpmn_xml, data, repeticoes=1)
+            print(f"{n:>7} {r:>6} {legado * 1000:>12.1f} {indice * 1000:>12.2f} "
+                  f"{total * 1000:>10.1f} {total / n * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
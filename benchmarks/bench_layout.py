@@ -0,0 +1,90 @@
+"""Tempo e qualidade do layout em camadas sobre grafos sintéticos com ciclos
+
+Compara com o layout anterior (ordenação topológica simples, sem empilhamento),
+em que nós de ciclos caíam no nível 0 e nós da mesma raia/nível se sobrepunham.
+
+Uso:
+    python -m benchmarks.bench_layout
+    python -m benchmarks.bench_layout --nos 1000 10000 --ciclos 0 0.05 0.2
+"""
+
+import argparse
+import time
+from array import array
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.layout import (
+    ITEM_SPACING, LANE_HEIGHT, START_X, Layout, avaliar_layout, calcular_layout, dimensoes,
+)
+from gerador_bpmn.modelo import ModeloProcesso
+
+
+def layout_legado(modelo: ModeloProcesso) -> Layout:
+    """Reprodução do layout anterior, para comparar as métricas de qualidade"""
+    n = len(modelo.nos)
+    graph_out = modelo.saidas()
+    in_degree = [0] * n
+    for destinos in graph_out:
+        for d in destinos:
+            in_degree[d] += 1
+    levels = [0] * n
+    queue = [i for i in modelo.indice.values() if in_degree[i] == 0]
+    curr_level = 0
+    while queue:
+        next_queue = []
+        for node in queue:
+            levels[node] = curr_level
+            for neighbor in graph_out[node]:
+                in_degree[neighbor] -= 1
+                if in_degree[neighbor] == 0:
+                    next_queue.append(neighbor)
+        queue = next_queue
+        curr_level += 1
+
+    xs, ys, ws, hs = array("d"), array("d"), array("i"), array("i")
+    for i, no in enumerate(modelo.nos):
+        w, h = dimensoes(no.tipo)
+        xs.append(START_X + levels[modelo.indice[no.id]] * ITEM_SPACING)
+        ys.append(no.raia * LANE_HEIGHT + (LANE_HEIGHT - h) / 2)
+        ws.append(w)
+        hs.append(h)
+    n_raias = len(modelo.raias)
+    return Layout(
+        x=xs, y=ys, largura=ws, altura=hs, nivel=array("i", levels),
+        raia_y=[r * LANE_HEIGHT for r in range(n_raias)], raia_altura=[LANE_HEIGHT] * n_raias,
+        largura_total=START_X + (max(levels, default=0) + 1) * ITEM_SPACING + 100,
+        altura_total=n_raias * LANE_HEIGHT, fluxos_retorno=frozenset(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nos", type=int, nargs="+", default=[200, 1000, 5000, 20000])
+    parser.add_argument("--raias", type=int, default=8)
+    parser.add_argument("--ciclos", type=float, nargs="+", default=[0.0, 0.1])
+    parser.add_argument("--legado-ate", type=int, default=2000,
+                        help="Só avalia o layout antigo até este número de nós (suas pilhas são quadráticas)")
+    args = parser.parse_args()
+
+    print(f"{'nós':>6} {'ciclos':>6} {'ms':>8} {'µs/nó':>6} | {'sobrep.':>8} {'cruz.':>7} {'retorno':>7}"
+          f" | {'legado: sobrep.':>15} {'cruz.':>7}")
+    for n in args.nos:
+        for densidade in args.ciclos:
+            modelo = ModeloProcesso.from_dict(
+                gerar_processo(n, n_raias=args.raias, seed=n, densidade_ciclos=densidade)
+            )
+            inicio = time.perf_counter()
+            layout = calcular_layout(modelo)
+            tempo = time.perf_counter() - inicio
+            novo = avaliar_layout(modelo, layout)
+            legado = "-"
+            if n <= args.legado_ate:
+                antigo = avaliar_layout(modelo, layout_legado(modelo))
+                legado = f"{antigo['sobreposicoes']:>15} {antigo['cruzamentos']:>7}"
+            print(f"{n:>6} {densidade:>6.2f} {tempo * 1000:>8.1f} {tempo / n * 1e6:>6.1f} | "
+                  f"{novo['sobreposicoes']:>8} {novo['cruzamentos']:>7} {novo['arcos_retorno']:>7} | "
+                  f"{legado:>23}")
+
+
+if __name__ == "__main__":
+    main()
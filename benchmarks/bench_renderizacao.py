@@ -0,0 +1,58 @@
+"""Renderização SVG no servidor: diagramas por minuto, com e sem o layout já calculado
+
+"svg" mede só o desenho (layout e rotas reaproveitados); "completo" inclui
+layout e roteamento; "xml" parte do XML BPMN já gerado (svg_de_xml).
+
+Uso:
+    python -m benchmarks.bench_renderizacao
+    python -m benchmarks.bench_renderizacao --nos 20 50 200 --diagramas 500
+"""
+
+import argparse
+import time
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.conversao import json_to_bpmn_xml
+from gerador_bpmn.layout import calcular_layout
+from gerador_bpmn.modelo import ModeloProcesso
+from gerador_bpmn.renderizacao import renderizar_svg, svg_de_xml
+from gerador_bpmn.roteamento import rotear_fluxos
+
+
+def por_minuto(funcao, entradas: list) -> float:
+    inicio = time.perf_counter()
+    for entrada in entradas:
+        funcao(entrada)
+    return len(entradas) / (time.perf_counter() - inicio) * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nos", type=int, nargs="+", default=[15, 30, 100, 500])
+    parser.add_argument("--raias", type=int, default=4)
+    parser.add_argument("--diagramas", type=int, default=200, help="Diagramas distintos por tamanho")
+    args = parser.parse_args()
+
+    print(f"{'nós':>5} | {'svg/min':>9} {'miniatura/min':>13} {'completo/min':>12} {'xml/min':>9} | {'KB':>6}")
+    for n in args.nos:
+        modelos = [
+            ModeloProcesso.from_dict(gerar_processo(n, n_raias=args.raias, seed=s, densidade_ciclos=0.1))
+            for s in range(args.diagramas)
+        ]
+        prontos = []
+        for modelo in modelos:
+            layout = calcular_layout(modelo)
+            prontos.append((modelo, layout, rotear_fluxos(modelo, layout)))
+        xmls = [json_to_bpmn_xml(m, False, l, r) for m, l, r in prontos]
+
+        svg = por_minuto(lambda p: renderizar_svg(*p), prontos)
+        miniatura = por_minuto(lambda p: renderizar_svg(*p, largura_max=240, rotulos=False), prontos)
+        completo = por_minuto(renderizar_svg, modelos)
+        de_xml = por_minuto(svg_de_xml, xmls)
+        tamanho = sum(len(renderizar_svg(*p)) for p in prontos) / len(prontos) / 1024
+
+        print(f"{n:>5} | {svg:>9.0f} {miniatura:>13.0f} {completo:>12.0f} {de_xml:>9.0f} | {tamanho:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Roteamento ortogonal: tempo, fluxos que atravessam formas e re-roteamento incremental
+
+Compara com os waypoints anteriores (linha reta, ou "degrau" no meio quando
+|y1 − y2| > 20), que ignoravam as formas no caminho.
+
+Uso:
+    python -m benchmarks.bench_roteamento
+    python -m benchmarks.bench_roteamento --nos 1000 20000 --movimentos 50
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.layout import calcular_layout
+from gerador_bpmn.modelo import SEM_NO, ModeloProcesso
+from gerador_bpmn.roteamento import Roteador, avaliar_rotas
+
+
+def rotas_legado(modelo, layout) -> list:
+    """Reprodução dos waypoints anteriores"""
+    rotas = []
+    for f in modelo.fluxos:
+        o, d = f.origem, f.destino
+        if o == SEM_NO or d == SEM_NO:
+            rotas.append(None)
+            continue
+        x1, y1 = int(layout.x[o] + layout.largura[o]), int(layout.cy(o))
+        x2, y2 = int(layout.x[d]), int(layout.cy(d))
+        pontos = [(x1, y1)]
+        if abs(y1 - y2) > 20:
+            mid_x = x1 + (x2 - x1) // 2
+            pontos += [(mid_x, y1), (mid_x, y2)]
+        pontos.append((x2, y2))
+        rotas.append(pontos)
+    return rotas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nos", type=int, nargs="+", default=[200, 1000, 5000, 20000])
+    parser.add_argument("--raias", type=int, default=8)
+    parser.add_argument("--ciclos", type=float, default=0.1)
+    parser.add_argument("--movimentos", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'nós':>6} {'fluxos':>7} {'ms':>8} {'µs/fluxo':>9} | {'atravessam':>10} {'legado':>7}"
+          f" | {'índice ms':>9} {'mover ms':>9} {'re-rot.':>7}")
+    aleatorio = random.Random(0)
+    for n in args.nos:
+        modelo = ModeloProcesso.from_dict(
+            gerar_processo(n, n_raias=args.raias, seed=n, densidade_ciclos=args.ciclos)
+        )
+        layout = calcular_layout(modelo)
+        roteador = Roteador(modelo, layout)
+        inicio = time.perf_counter()
+        rotas = roteador.rotear_todos()
+        tempo = time.perf_counter() - inicio
+
+        novo = avaliar_rotas(modelo, layout, rotas)
+        antigo = avaliar_rotas(modelo, layout, rotas_legado(modelo, layout))
+
+        # O índice das rotas é montado no primeiro movimento
+        inicio = time.perf_counter()
+        roteador.indexar_rotas()
+        tempo_indice = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        rerroteados = 0
+        for _ in range(args.movimentos):
+            i = aleatorio.randrange(n)
+            rerroteados += len(roteador.mover_no(i, layout.x[i] + 30, layout.y[i] + 40))
+        tempo_mover = (time.perf_counter() - inicio) / args.movimentos
+
+        n_fluxos = len(modelo.fluxos)
+        print(f"{n:>6} {n_fluxos:>7} {tempo * 1000:>8.1f} {tempo / n_fluxos * 1e6:>9.1f} | "
+              f"{novo['fluxos_atravessando_formas']:>10} {antigo['fluxos_atravessando_formas']:>7} | "
+              f"{tempo_indice * 1000:>9.1f} {tempo_mover * 1000:>9.2f} "
+              f"{rerroteados / args.movimentos:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compara a serialização antiga (ET.tostring + minidom) com o escritor em streaming
+
+O caminho antigo é medido só na etapa de serialização, a partir de uma árvore
+já pronta; os caminhos novos incluem o layout inteiro. A comparação, portanto,
+favorece o caminho antigo.
+
+Uso:
+    python -m benchmarks.bench_serializacao
+    python -m benchmarks.bench_serializacao --tamanhos 100 1000 20000
+"""
+
+import argparse
+import copy
+import os
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.conversao import escrever_bpmn_xml, json_to_bpmn_xml
+
+
+def serializar_minidom(root: ET.Element) -> str:
+    """Caminho anterior: tostring, reparse completo, toprettyxml e filtro de linhas"""
+    xml_string = ET.tostring(root, encoding='unicode')
+    dom = minidom.parseString(xml_string)
+    return '\n'.join([line for line in dom.toprettyxml(indent="  ").split('\n') if line.strip()])
+
+
+def escrever_devnull(data: dict) -> None:
+    with open(os.devnull, "w", encoding="utf-8") as destino:
+        escrever_bpmn_xml(data, destino)
+
+
+def medir(funcao, entrada, repeticoes: int) -> tuple[float, int]:
+    """Melhor tempo (s) e pico de memória adicional (bytes), sempre sobre uma cópia da entrada"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        copia = copy.deepcopy(entrada)
+        inicio = time.perf_counter()
+        funcao(copia)
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    copia = copy.deepcopy(entrada)
+    tracemalloc.start()
+    funcao(copia)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[50, 200, 1000, 5000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'nós':>7} | {'minidom':>16} | {'string':>16} | {'streaming':>16}")
+    print(f"{'':>7} | {'ms':>7} {'MB':>8} | {'ms':>7} {'MB':>8} | {'ms':>7} {'MB':>8}")
+    for n in args.tamanhos:
+        data = gerar_processo(n, n_raias=max(2, n // 50))
+        root = ET.fromstring(json_to_bpmn_xml(copy.deepcopy(data), compacto=True).split("\n", 1)[1])
+        linhas = [
+            medir(serializar_minidom, root, args.repeticoes),
+            medir(json_to_bpmn_xml, data, args.repeticoes),
+            medir(escrever_devnull, data, args.repeticoes),
+        ]
+        print(f"{n:>7} | " + " | ".join(f"{t * 1000:>7.1f} {pico / 2**20:>8.2f}" for t, pico in linhas))
+
+
+if __name__ == "__main__":
+    main()
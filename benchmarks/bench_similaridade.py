@@ -0,0 +1,156 @@
+"""Índice de similares: inserção e busca conforme o índice cresce, recall e falsos positivos
+
+Descrições sintéticas (papéis, verbos e objetos sorteados) são inseridas em
+um único índice; ao passar por cada tamanho de --tamanhos, mede a latência
+das buscas (assinatura incluída) e a qualidade:
+
+- reescrita: a mesma descrição com artigos, maiúsculas, acentos e numeração
+  trocados; deve voltar a original com similaridade >= REESCRITA
+- edição: um passo trocado por outro; deve voltar a original acima do
+  limiar de adaptação
+- falsos positivos: descrições novas que encontram alguma acima do limiar
+  de adaptação
+
+Uso:
+    python -m benchmarks.bench_similaridade
+    python -m benchmarks.bench_similaridade --tamanhos 1000 10000 100000 300000 --buscas 500
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from gerador_bpmn.similaridade import IndiceSimilaridade
+
+# Reescritas só mudam o que termos() descarta: a assinatura deve ficar quase igual
+REESCRITA = 0.95
+
+PAPEIS = ("Cliente", "Gerente", "Sistema", "Financeiro", "RH", "Compras", "Vendas", "Suporte",
+          "Logística", "Jurídico", "Diretoria", "Fornecedor", "Auditoria", "TI", "Almoxarifado")
+VERBOS = ("cria", "envia", "aprova", "rejeita", "analisa", "registra", "valida", "confere", "emite",
+          "cancela", "agenda", "notifica", "arquiva", "calcula", "revisa", "assina", "paga", "recebe",
+          "publica", "classifica", "encaminha", "corrige", "consulta", "atualiza", "separa")
+OBJETOS = ("pedido", "nota fiscal", "contrato", "orçamento", "chamado", "currículo", "reembolso",
+           "pagamento", "relatório", "estoque", "proposta", "fatura", "cadastro", "entrega", "vaga",
+           "auditoria", "ordem de compra", "boleto", "protocolo", "parecer", "laudo", "inventário",
+           "acesso", "treinamento", "viagem", "férias", "remessa", "cotação", "garantia", "devolução")
+CONDICOES = ("valor alto", "houver estoque", "aprovado", "urgente", "cliente novo", "prazo vencido")
+
+
+def _passo(rnd: random.Random) -> str:
+    texto = f"{rnd.choice(PAPEIS)} {rnd.choice(VERBOS)} o {rnd.choice(OBJETOS)}"
+    if rnd.random() < 0.2:
+        texto = f"Se {rnd.choice(CONDICOES)}, {texto[0].lower()}{texto[1:]}"
+    return texto
+
+
+def gerar_descricao(rnd: random.Random) -> list:
+    """Título e passos de uma descrição sintética"""
+    return [f"Processo de {rnd.choice(OBJETOS)}"] + [_passo(rnd) for _ in range(rnd.randint(4, 9))]
+
+
+def escrever(partes: list) -> str:
+    return partes[0] + ":\n" + "\n".join(f"{i}. {p}" for i, p in enumerate(partes[1:], start=1))
+
+
+def reescrever(partes: list, rnd: random.Random) -> str:
+    """Mesmo processo, escrito de outro jeito"""
+    tira_acento = str.maketrans("áâãàéêíóôõúç", "aaaaeeiooouc")
+    linhas = [partes[0].upper() if rnd.random() < 0.5 else partes[0]]
+    for i, passo in enumerate(partes[1:], start=1):
+        passo = passo.replace(" o ", " um " if rnd.random() < 0.5 else " ")
+        if rnd.random() < 0.5:
+            passo = passo.translate(tira_acento)
+        linhas.append(f"{i}) {passo}." if rnd.random() < 0.5 else f"- {passo.lower()}")
+    return "\n".join(linhas)
+
+
+def editar(partes: list, rnd: random.Random) -> str:
+    """O mesmo processo com um passo trocado"""
+    novas = list(partes)
+    novas[rnd.randrange(1, len(novas))] = _passo(rnd)
+    return escrever(novas)
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def medir(indice: IndiceSimilaridade, originais: list, n_buscas: int, rnd: random.Random) -> dict:
+    amostra = rnd.sample(range(len(originais)), min(n_buscas, len(originais)))
+    tempos = []
+    reescritas = edicoes = falsos = 0
+    for i in amostra:
+        partes = originais[i]
+        for consulta, limiar, tipo in (
+            (reescrever(partes, rnd), REESCRITA, "reescrita"),
+            (editar(partes, rnd), indice.limiar_adaptacao, "edicao"),
+            (escrever(gerar_descricao(rnd)), indice.limiar_adaptacao, "nova"),
+        ):
+            inicio = time.perf_counter()
+            parecido = indice.buscar(consulta, limiar=limiar)
+            tempos.append(time.perf_counter() - inicio)
+            if tipo == "nova":
+                falsos += parecido is not None
+            elif parecido is not None and parecido.dados["i"] == i:
+                if tipo == "reescrita":
+                    reescritas += 1
+                else:
+                    edicoes += 1
+    n = len(amostra)
+    return {
+        "busca_p50_ms": _percentil(tempos, 0.5) * 1000,
+        "busca_p95_ms": _percentil(tempos, 0.95) * 1000,
+        "recall_reescrita": reescritas / n,
+        "recall_edicao": edicoes / n,
+        "falsos_positivos": falsos / n,
+    }
+
+
+def memoria_por_item(n: int, seed: int) -> float:
+    """Bytes alocados por item indexado (descrição e JSON mínimos incluídos)"""
+    rnd = random.Random(seed)
+    textos = [escrever(gerar_descricao(rnd)) for _ in range(n)]
+    indice = IndiceSimilaridade(caminho=None, max_itens=n)
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    for i, texto in enumerate(textos):
+        indice.adicionar(texto, {"i": i})
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (depois - antes) / n
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--buscas", type=int, default=300, help="Descrições consultadas em cada tamanho")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    indice = IndiceSimilaridade(caminho=None, max_itens=max(args.tamanhos))
+    originais = []
+    print(f"limiares: reescrita {REESCRITA} · adaptação {indice.limiar_adaptacao}")
+    print(f"memória: ~{memoria_por_item(5_000, args.seed) / 1024:.1f} KiB por item")
+    print(f"{'itens':>8} | {'inserções/s':>11} | {'busca p50':>9} {'p95 (ms)':>8} | "
+          f"{'reescrita':>9} {'edição':>7} {'falsos +':>8}")
+    for tamanho in sorted(args.tamanhos):
+        inicio = time.perf_counter()
+        novos = tamanho - len(originais)
+        while len(originais) < tamanho:
+            partes = gerar_descricao(rnd)
+            indice.adicionar(escrever(partes), {"i": len(originais)})
+            originais.append(partes)
+        taxa = novos / (time.perf_counter() - inicio) if novos else 0.0
+        m = medir(indice, originais, args.buscas, rnd)
+        print(f"{tamanho:>8} | {taxa:>11.0f} | {m['busca_p50_ms']:>9.2f} {m['busca_p95_ms']:>8.2f} | "
+              f"{m['recall_reescrita']:>9.1%} {m['recall_edicao']:>7.1%} {m['falsos_positivos']:>8.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Corpus de respostas "ruidosas" de LLM para medir o extrator de JSON
+
+Cada amostra parte de um processo sintético serializado e recebe defeitos
+que aparecem em respostas reais: cerca markdown, prosa ao redor,
+comentários, aspas simples, chaves sem aspas, literais Python, vírgulas
+sobrando ou faltando, quebra de linha dentro de string e saída truncada.
+"""
+
+import json
+import random
+import re
+
+from benchmarks.sintetico import gerar_processo
+
+
+def _cerca(texto: str, rnd: random.Random) -> str:
+    return f"```json\n{texto}\n```"
+
+
+def _prosa(texto: str, rnd: random.Random) -> str:
+    return f"Claro! Aqui está o processo em JSON:\n\n{texto}\n\nSe quiser, posso detalhar as raias."
+
+
+def _comentarios(texto: str, rnd: random.Random) -> str:
+    linhas = texto.split("\n")
+    for i in sorted(rnd.sample(range(1, len(linhas)), min(3, len(linhas) - 1)), reverse=True):
+        linhas.insert(i, "  // elemento gerado a partir da descrição")
+    return "\n".join(linhas)
+
+
+def _aspas_simples(texto: str, rnd: random.Random) -> str:
+    return texto.replace('"', "'")
+
+
+def _chaves_sem_aspas(texto: str, rnd: random.Random) -> str:
+    return re.sub(r'"(\w+)":', r"\1:", texto)
+
+
+def _literais_python(texto: str, rnd: random.Random) -> str:
+    return texto.replace('"processo":', '"valido": True, "observacao": None, "processo":', 1)
+
+
+def _virgula_final(texto: str, rnd: random.Random) -> str:
+    return re.sub(r'(["}\]])(\n\s*[\]}])', r"\1,\2", texto)
+
+
+def _virgula_ausente(texto: str, rnd: random.Random) -> str:
+    return re.sub(r"},\n", lambda m: "}\n" if rnd.random() < 0.3 else m.group(0), texto)
+
+
+def _quebra_em_string(texto: str, rnd: random.Random) -> str:
+    return texto.replace("Passo 1", "Passo\n1", 1)
+
+
+def _truncado(texto: str, rnd: random.Random) -> str:
+    return texto[:int(len(texto) * rnd.uniform(0.6, 0.95))]
+
+
+DEFEITOS = {
+    "cerca": _cerca,
+    "prosa": _prosa,
+    "comentarios": _comentarios,
+    "aspas_simples": _aspas_simples,
+    "chaves_sem_aspas": _chaves_sem_aspas,
+    "literais_python": _literais_python,
+    "virgula_final": _virgula_final,
+    "virgula_ausente": _virgula_ausente,
+    "quebra_em_string": _quebra_em_string,
+    "truncado": _truncado,
+}
+
+# Defeitos que só mexem no que está fora do objeto (o caminho rápido resolve)
+_EMBALAGENS = ("cerca", "prosa")
+
+
+def gerar_resposta(data: dict, defeitos: list, seed: int = 0) -> str:
+    """Serializa `data` como o modelo faria e aplica os `defeitos` em ordem (embalagens por último)"""
+    rnd = random.Random(seed)
+    texto = json.dumps(data, indent=2, ensure_ascii=False)
+    ordem = [d for d in defeitos if d not in _EMBALAGENS] + [d for d in defeitos if d in _EMBALAGENS]
+    for defeito in ordem:
+        texto = DEFEITOS[defeito](texto, rnd)
+    return texto
+
+
+def gerar_corpus(n: int, n_nos: int = 30, seed: int = 0, fracao_limpa: float = 0.5) -> list:
+    """`n` respostas: `fracao_limpa` só com cerca/prosa, o resto com 1 a 3 defeitos de sintaxe"""
+    rnd = random.Random(seed)
+    sintaxe = [d for d in DEFEITOS if d not in _EMBALAGENS]
+    corpus = []
+    for i in range(n):
+        data = gerar_processo(n_nos, n_raias=3, seed=seed + i)
+        defeitos = [rnd.choice(_EMBALAGENS)]
+        if rnd.random() >= fracao_limpa:
+            defeitos += rnd.sample(sintaxe, rnd.randint(1, 3))
+        corpus.append(gerar_resposta(data, defeitos, seed=seed + i))
+    return corpus
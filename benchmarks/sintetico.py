@@ -0,0 +1,47 @@
+"""Gerador de documentos processo/elementos/fluxos sintéticos para benchmarks"""
+
+import random
+
+TIPOS_TAREFA = ("task", "userTask", "serviceTask")
+
+
+def gerar_processo(
+    n_nos: int, n_raias: int = 4, seed: int = 0, densidade_ciclos: float = 0.0, fanout: int = 1
+) -> dict:
+    """Processo conexo com início, fim, tarefas e gateways distribuídos entre raias
+
+    `densidade_ciclos` é a fração de fluxos extras que voltam a um nó anterior
+    (loops de retrabalho). `fanout` é o número de saídas de cada gateway
+    (1 = só o fluxo principal).
+    """
+    rnd = random.Random(seed)
+    raias = [f"Papel {i}" for i in range(max(1, n_raias))]
+    elementos = [{"id": "StartEvent_1", "tipo": "startEvent", "nome": "Início", "papel": raias[0]}]
+    for i in range(1, max(2, n_nos) - 1):
+        if rnd.random() < 0.15:
+            tipo = rnd.choice(("exclusiveGateway", "parallelGateway"))
+            eid = f"Gateway_{i}"
+        else:
+            tipo = rnd.choice(TIPOS_TAREFA)
+            eid = f"Task_{i}"
+        elementos.append({"id": eid, "tipo": tipo, "nome": f"Passo {i}", "papel": rnd.choice(raias)})
+    elementos.append({"id": "EndEvent_1", "tipo": "endEvent", "nome": "Fim", "papel": raias[-1]})
+
+    fluxos = []
+    for i in range(1, len(elementos)):
+        # Cada nó recebe um fluxo de algum nó anterior (grafo acíclico e conexo)
+        origem = elementos[max(0, i - rnd.randint(1, 3))]["id"]
+        fluxos.append({"id": f"Flow_{len(fluxos) + 1}", "origem": origem, "destino": elementos[i]["id"]})
+    existentes = {(f["origem"], f["destino"]) for f in fluxos}
+    for i, elem in enumerate(elementos):
+        if elem["tipo"].endswith("Gateway"):
+            # Ramos extras para os próximos nós, sem repetir um fluxo já existente
+            for destino in elementos[i + 1:i + fanout]:
+                if (elem["id"], destino["id"]) not in existentes:
+                    fluxos.append({"id": f"Flow_{len(fluxos) + 1}", "origem": elem["id"], "destino": destino["id"]})
+    for _ in range(int(len(elementos) * densidade_ciclos)):
+        # Retrabalho: volta de um nó intermediário para um anterior próximo
+        i = rnd.randint(2, len(elementos) - 2)
+        j = max(1, i - rnd.randint(1, 8))
+        fluxos.append({"id": f"Flow_{len(fluxos) + 1}", "origem": elementos[i]["id"], "destino": elementos[j]["id"]})
+    return {"processo": f"Sintético {n_nos}", "elementos": elementos, "fluxos": fluxos}
@@ -0,0 +1,222 @@
+"""Suíte de benchmarks do pipeline: tempo e pico de memória por etapa, comparados a uma baseline
+
+Cada cenário gera um processo sintético (nós, raias, fan-out dos gateways e
+densidade de ciclos) e um corpus de respostas ruidosas do modelo, e mede as
+etapas extracao, validacao, modelo, layout, roteamento, xml e svg.
+
+Os tempos são guardados também relativos a uma calibração (laço fixo em
+Python puro medido logo antes de cada etapa), para a baseline valer em
+outra máquina. Uma etapa regride quando o tempo relativo passa da baseline em
+mais que --tolerancia (e em mais que TEMPO_MINIMO por item, em segundos desta
+máquina), ou a memória em mais que --tolerancia-memoria.
+
+Uso:
+    python -m benchmarks.suite                    # compara com benchmarks/baseline.json
+    python -m benchmarks.suite --salvar-baseline  # grava a baseline a partir desta execução
+    python -m benchmarks.suite --cenarios pequeno medio --json resultado.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.ruido import gerar_corpus
+from benchmarks.sintetico import gerar_processo
+from gerador_bpmn.conversao import json_to_bpmn_xml
+from gerador_bpmn.extracao import extrair_json_com_reparos
+from gerador_bpmn.layout import calcular_layout
+from gerador_bpmn.modelo import ModeloProcesso
+from gerador_bpmn.renderizacao import renderizar_svg
+from gerador_bpmn.roteamento import rotear_fluxos
+from gerador_bpmn.validacao import normalizar_processo
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+CENARIOS = {
+    "pequeno": {"nos": 15, "raias": 3, "fanout": 2, "ciclos": 0.0, "corpus": 40},
+    "medio": {"nos": 100, "raias": 5, "fanout": 3, "ciclos": 0.1, "corpus": 20},
+    "grande": {"nos": 1000, "raias": 8, "fanout": 3, "ciclos": 0.1, "corpus": 5},
+}
+
+ETAPAS = ("extracao", "validacao", "modelo", "layout", "roteamento", "xml", "svg")
+
+# Diferenças de memória abaixo disso são ruído do alocador
+MEMORIA_MINIMA = 16 * 1024
+
+# Em etapas de dezenas de microssegundos a variação relativa é quase toda ruído;
+# regressões reais nelas aparecem nos cenários maiores, que rodam o mesmo código
+TEMPO_MINIMO = 50e-6
+
+# Etapas acima da tolerância de tempo são medidas de novo antes de acusar regressão
+CONFIRMACOES = 2
+
+
+def calibrar(repeticoes: int = 5) -> float:
+    """Tempo (s) de um laço fixo em Python puro: dicts, strings, ordenação e json"""
+    def _laco():
+        itens = [{"id": f"Task_{i}", "peso": (i * 7919) % 1000} for i in range(2000)]
+        itens.sort(key=lambda d: (d["peso"], d["id"]))
+        json.loads(json.dumps(itens))
+    return min(timeit.repeat(_laco, number=10, repeat=repeticoes)) / 10
+
+
+def preparar(cenario: dict, seed: int = 0) -> dict:
+    """Funções sem argumentos para cada etapa, com as entradas já calculadas pelas anteriores"""
+    data = gerar_processo(
+        cenario["nos"], n_raias=cenario["raias"], seed=seed,
+        densidade_ciclos=cenario["ciclos"], fanout=cenario["fanout"]
+    )
+    corpus = gerar_corpus(cenario["corpus"], n_nos=cenario["nos"], seed=seed)
+    normalizado, _ = normalizar_processo(data)
+    modelo = ModeloProcesso.from_dict(normalizado)
+    layout = calcular_layout(modelo)
+    rotas = rotear_fluxos(modelo, layout)
+
+    def _extrair():
+        for texto in corpus:
+            extrair_json_com_reparos(texto)
+
+    return {
+        "extracao": (_extrair, len(corpus)),
+        "validacao": (lambda: normalizar_processo(data), 1),
+        "modelo": (lambda: ModeloProcesso.from_dict(normalizado), 1),
+        "layout": (lambda: calcular_layout(modelo), 1),
+        "roteamento": (lambda: rotear_fluxos(modelo, layout), 1),
+        "xml": (lambda: json_to_bpmn_xml(modelo, False, layout, rotas), 1),
+        "svg": (lambda: renderizar_svg(modelo, layout, rotas), 1),
+    }
+
+
+def medir(funcao, itens: int, repeticoes: int) -> tuple[float, int]:
+    """Melhor tempo por item (s) e pico de memória (bytes) de uma execução"""
+    timer = timeit.Timer(funcao)
+    lacos, _ = timer.autorange()
+    tempo = min(timer.repeat(repeat=repeticoes, number=lacos)) / lacos / itens
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tempo, pico
+
+
+def medir_etapa(funcao, itens: int, repeticoes: int) -> dict:
+    # Calibração ao lado de cada etapa: a carga da máquina muda durante a execução
+    calibracao = calibrar(repeticoes)
+    tempo, pico = medir(funcao, itens, repeticoes)
+    return {
+        "tempo_s": tempo,
+        "relativo": tempo / calibracao,
+        "memoria_bytes": pico,
+        "calibracao_s": calibracao,
+    }
+
+
+def executar(cenarios: list, repeticoes: int) -> dict:
+    resultados = {}
+    for nome in cenarios:
+        etapas = preparar(CENARIOS[nome])
+        resultados[nome] = {etapa: medir_etapa(*etapas[etapa], repeticoes) for etapa in ETAPAS}
+    return {
+        "calibracao_s": min(m["calibracao_s"] for etapas in resultados.values() for m in etapas.values()),
+        "python": platform.python_version(),
+        "cenarios": {nome: CENARIOS[nome] for nome in cenarios},
+        "resultados": resultados,
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float, tolerancia_memoria: float) -> list:
+    """Regressões: (cenário, etapa, métrica, variação) acima da tolerância"""
+    regressoes = []
+    for nome, etapas in atual["resultados"].items():
+        if baseline["cenarios"].get(nome) != atual["cenarios"][nome]:
+            continue  # cenário mudou de parâmetros: não é comparável
+        for etapa, medida in etapas.items():
+            base = baseline["resultados"].get(nome, {}).get(etapa)
+            if base is None:
+                continue
+            variacao = medida["relativo"] / base["relativo"] - 1
+            # Diferença absoluta em segundos desta máquina (baseline convertida pela calibração atual)
+            diferenca_s = (medida["relativo"] - base["relativo"]) * medida["calibracao_s"]
+            if variacao > tolerancia and diferenca_s > TEMPO_MINIMO:
+                regressoes.append((nome, etapa, "tempo", variacao))
+            diferenca = medida["memoria_bytes"] - base["memoria_bytes"]
+            if diferenca > MEMORIA_MINIMA and diferenca / base["memoria_bytes"] > tolerancia_memoria:
+                regressoes.append((nome, etapa, "memoria", diferenca / base["memoria_bytes"]))
+    return regressoes
+
+
+def remedir(atual: dict, suspeitos: set, repeticoes: int) -> None:
+    """Mede de novo as etapas (cenário, etapa) e fica com a melhor medida (ruído só deixa mais lento)"""
+    for nome in {nome for nome, _ in suspeitos}:
+        etapas = preparar(CENARIOS[nome])
+        for etapa in (e for n, e in suspeitos if n == nome):
+            nova = medir_etapa(*etapas[etapa], repeticoes)
+            if nova["relativo"] < atual["resultados"][nome][etapa]["relativo"]:
+                atual["resultados"][nome][etapa] = nova
+
+
+def imprimir(atual: dict, baseline) -> None:
+    print(f"calibração: {atual['calibracao_s'] * 1000:.2f} ms (Python {atual['python']})")
+    print(f"{'cenário':>8} {'etapa':>10} | {'ms':>9} {'KB':>9} | {'Δ tempo':>8} {'Δ mem':>8}")
+    for nome, etapas in atual["resultados"].items():
+        base_cenario = (baseline or {}).get("resultados", {}).get(nome, {})
+        for etapa, medida in etapas.items():
+            base = base_cenario.get(etapa)
+            delta_t = delta_m = ""
+            if base is not None:
+                delta_t = f"{(medida['relativo'] / base['relativo'] - 1) * 100:+.0f}%"
+                delta_m = f"{(medida['memoria_bytes'] / max(1, base['memoria_bytes']) - 1) * 100:+.0f}%"
+            print(f"{nome:>8} {etapa:>10} | {medida['tempo_s'] * 1000:>9.3f} "
+                  f"{medida['memoria_bytes'] / 1024:>9.1f} | {delta_t:>8} {delta_m:>8}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava esta execução como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.5,
+                        help="Aumento relativo de tempo aceito (padrão: 0.5 = 50%%)")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.1,
+                        help="Aumento relativo de pico de memória aceito (padrão: 0.1 = 10%%)")
+    parser.add_argument("--json", type=Path, help="Grava os resultados desta execução neste arquivo")
+    args = parser.parse_args(argv)
+
+    atual = executar(args.cenarios, args.repeticoes)
+    if args.salvar_baseline:
+        # A baseline também é a melhor de duas medidas, senão um acaso rápido vira referência
+        remedir(atual, {(nome, etapa) for nome in args.cenarios for etapa in ETAPAS}, args.repeticoes)
+        args.baseline.write_text(json.dumps(atual, indent=2) + "\n", encoding="utf-8")
+        imprimir(atual, None)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    regressoes = []
+    if baseline is not None:
+        regressoes = comparar(atual, baseline, args.tolerancia, args.tolerancia_memoria)
+        for _ in range(CONFIRMACOES):
+            suspeitos = {(nome, etapa) for nome, etapa, metrica, _ in regressoes if metrica == "tempo"}
+            if not suspeitos:
+                break
+            remedir(atual, suspeitos, args.repeticoes)
+            regressoes = comparar(atual, baseline, args.tolerancia, args.tolerancia_memoria)
+
+    if args.json:
+        args.json.write_text(json.dumps(atual, indent=2), encoding="utf-8")
+    imprimir(atual, baseline)
+    if baseline is None:
+        print(f"Sem baseline em {args.baseline}; use --salvar-baseline")
+    for nome, etapa, metrica, variacao in regressoes:
+        print(f"REGRESSÃO {nome}/{etapa}: {metrica} {variacao * 100:+.0f}%", file=sys.stderr)
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
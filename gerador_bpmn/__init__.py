@@ -0,0 +1 @@
+"""Núcleo do Gerador de BPMN com IA (sem dependência do Streamlit)"""
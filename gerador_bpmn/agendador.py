@@ -0,0 +1,222 @@
+"""Agendador de chamadas ao modelo com baldes de tokens (RPM/TPM), prioridades e backoff"""
+
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from .rastreio import contar, etapa
+
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_LOTE = 10
+
+RPM_PADRAO = int(os.environ.get("BPMN_RPM", "10"))
+TPM_PADRAO = int(os.environ.get("BPMN_TPM", "250000"))
+
+_STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+_PADRAO_STATUS = re.compile(r"\b(429|500|502|503|504)\b")
+
+
+def status_do_erro(erro: Exception) -> Optional[int]:
+    """Descobre o status HTTP de um erro do SDK (atributos ou mensagem)"""
+    for atributo in ("status_code", "code", "http_status"):
+        valor = getattr(erro, atributo, None)
+        valor = valor() if callable(valor) else valor
+        if isinstance(valor, int):
+            return valor
+    resposta = getattr(erro, "response", None)
+    if isinstance(getattr(resposta, "status_code", None), int):
+        return resposta.status_code
+
+    texto = f"{type(erro).__name__} {erro}"
+    encontrado = _PADRAO_STATUS.search(texto)
+    if encontrado:
+        return int(encontrado.group(1))
+    if "ResourceExhausted" in texto or "quota" in texto.lower():
+        return 429
+    if "ServiceUnavailable" in texto or "DeadlineExceeded" in texto:
+        return 503
+    return None
+
+
+def erro_retentavel(erro: Exception) -> bool:
+    return status_do_erro(erro) in _STATUS_RETENTAVEIS
+
+
+def estimar_tokens(*textos: str) -> int:
+    """Estimativa grosseira (~4 caracteres por token), suficiente para reservar orçamento"""
+    return sum(len(t) for t in textos) // 4 + 1
+
+
+class BaldeTokens:
+    """Balde de tokens com reposição contínua; o nível pode ficar negativo após ajustes"""
+
+    def __init__(self, capacidade: float, por_minuto: float, relogio: Callable[[], float]):
+        self.capacidade = float(capacidade)
+        self.taxa = por_minuto / 60.0
+        self.relogio = relogio
+        self.nivel = float(capacidade)
+        self._atualizado = relogio()
+
+    def _repor(self) -> None:
+        agora = self.relogio()
+        self.nivel = min(self.capacidade, self.nivel + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def tempo_ate(self, quantidade: float) -> float:
+        self._repor()
+        falta = min(quantidade, self.capacidade) - self.nivel
+        return falta / self.taxa if falta > 0 else 0.0
+
+    def consumir(self, quantidade: float) -> None:
+        self._repor()
+        self.nivel -= min(quantidade, self.capacidade)
+
+    def ajustar(self, delta: float) -> None:
+        self._repor()
+        self.nivel = min(self.capacidade, self.nivel - delta)
+
+    def esvaziar(self) -> None:
+        self._repor()
+        self.nivel = min(self.nivel, 0.0)
+
+
+class _EstadoChave:
+    __slots__ = ("rpm", "tpm", "fila")
+
+    def __init__(self, rpm: BaldeTokens, tpm: BaldeTokens):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.fila: list[tuple[int, int]] = []  # (prioridade, ordem de chegada)
+
+
+class Agendador:
+    """Serializa o acesso ao modelo por chave de API respeitando RPM/TPM
+
+    Chamadas excedentes esperam numa fila de prioridade (interativas antes de
+    lote, FIFO dentro da mesma prioridade). Erros 429/5xx são repetidos com
+    backoff exponencial com jitter; um 429 também esvazia o balde de
+    requisições da chave, freando as demais chamadas na fila.
+    """
+
+    def __init__(
+        self,
+        rpm: int = RPM_PADRAO,
+        tpm: int = TPM_PADRAO,
+        max_tentativas: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.relogio = relogio
+        self._cond = threading.Condition()
+        self._chaves: dict[str, _EstadoChave] = {}
+        self._ordem = itertools.count()
+        self._esperas: deque = deque(maxlen=1000)
+        self._contadores = {
+            "requisicoes": 0,
+            "retentativas": 0,
+            "erros_429": 0,
+            "erros_5xx": 0,
+            "falhas": 0,
+        }
+
+    def _estado(self, chave: str) -> _EstadoChave:
+        estado = self._chaves.get(chave)
+        if estado is None:
+            estado = _EstadoChave(
+                BaldeTokens(self.rpm, self.rpm, self.relogio),
+                BaldeTokens(self.tpm, self.tpm, self.relogio),
+            )
+            self._chaves[chave] = estado
+        return estado
+
+    def _aguardar_vez(self, chave: str, tokens: int, prioridade: int) -> None:
+        inicio = self.relogio()
+        with self._cond:
+            estado = self._estado(chave)
+            bilhete = (prioridade, next(self._ordem))
+            heapq.heappush(estado.fila, bilhete)
+            while True:
+                espera = None
+                if estado.fila[0] == bilhete:
+                    espera = max(estado.rpm.tempo_ate(1), estado.tpm.tempo_ate(tokens))
+                    if espera <= 0:
+                        estado.rpm.consumir(1)
+                        estado.tpm.consumir(tokens)
+                        heapq.heappop(estado.fila)
+                        self._contadores["requisicoes"] += 1
+                        self._esperas.append(self.relogio() - inicio)
+                        # Próximo da fila reavalia o próprio tempo de espera
+                        self._cond.notify_all()
+                        return
+                self._cond.wait(espera)
+
+    def executar(
+        self,
+        chave: str,
+        funcao: Callable[[], object],
+        tokens_estimados: int = 1,
+        prioridade: int = PRIORIDADE_INTERATIVA,
+        tokens_reais: Optional[Callable[[object], Optional[int]]] = None,
+    ):
+        """Executa `funcao` quando houver orçamento para a chave, repetindo em 429/5xx
+
+        `tokens_reais(resultado)` corrige o balde de TPM com o consumo efetivo.
+        """
+        for tentativa in range(self.max_tentativas):
+            with etapa("fila", tentativa=tentativa):
+                self._aguardar_vez(chave, tokens_estimados, prioridade)
+            try:
+                resultado = funcao()
+            except Exception as e:
+                status = status_do_erro(e)
+                with self._cond:
+                    if status == 429:
+                        self._contadores["erros_429"] += 1
+                        self._estado(chave).rpm.esvaziar()
+                    elif status in _STATUS_RETENTAVEIS:
+                        self._contadores["erros_5xx"] += 1
+                    if status not in _STATUS_RETENTAVEIS or tentativa == self.max_tentativas - 1:
+                        self._contadores["falhas"] += 1
+                        raise
+                    self._contadores["retentativas"] += 1
+                contar("retentativas", status=status)
+                # Full jitter: espalha as novas tentativas de vários clientes
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** tentativa)))
+                continue
+
+            if tokens_reais is not None:
+                real = tokens_reais(resultado)
+                if real:
+                    with self._cond:
+                        self._estado(chave).tpm.ajustar(real - tokens_estimados)
+            return resultado
+
+    def metricas(self) -> dict:
+        """Profundidade das filas, tempos de espera e contadores de erros"""
+        with self._cond:
+            esperas = sorted(self._esperas)
+            profundidade = {chave: len(e.fila) for chave, e in self._chaves.items() if e.fila}
+
+            def _p(q):
+                return esperas[min(len(esperas) - 1, int(q * len(esperas)))] if esperas else 0.0
+
+            return {
+                "fila_total": sum(profundidade.values()),
+                "fila_por_chave": profundidade,
+                "espera_media_s": sum(esperas) / len(esperas) if esperas else 0.0,
+                "espera_p95_s": _p(0.95),
+                "espera_max_s": esperas[-1] if esperas else 0.0,
+                **self._contadores,
+            }
@@ -0,0 +1,167 @@
+"""Cache de respostas do modelo endereçado por conteúdo (memória LRU + SQLite)"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+CAMINHO_PADRAO = os.environ.get("BPMN_CACHE_PATH", os.path.join(".cache", "respostas.sqlite3"))
+
+
+def normalizar_descricao(texto: str) -> str:
+    """Normaliza a descrição para que variações de espaçamento gerem a mesma chave"""
+    texto = unicodedata.normalize("NFC", texto or "")
+    linhas = (" ".join(linha.split()) for linha in texto.splitlines())
+    return "\n".join(linha for linha in linhas if linha)
+
+
+def chave_cache(descricao: str, prompt: str, modelo: str, temp: float, modo: str = "") -> str:
+    """Hash SHA-256 de (descrição normalizada, prompt, modelo, temperatura, modo de saída)"""
+    payload = json.dumps(
+        [normalizar_descricao(descricao), prompt, modelo, round(float(temp), 3), modo],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache em dois níveis: LRU em memória e SQLite persistente com TTL e limite de tamanho"""
+
+    def __init__(
+        self,
+        caminho: Optional[str] = CAMINHO_PADRAO,
+        max_memoria: int = 256,
+        max_disco: int = 10_000,
+        ttl: float = 7 * 24 * 3600,
+    ):
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self.ttl = ttl
+        self._memoria: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits_memoria = 0
+        self._hits_disco = 0
+        self._misses = 0
+        self._db = None
+
+        # caminho=None desativa o nível persistente
+        if caminho:
+            import sqlite3
+
+            pasta = os.path.dirname(caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            self._db = sqlite3.connect(caminho, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    criado REAL NOT NULL,
+                    acessado REAL NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_acessado ON respostas (acessado)")
+            self._db.commit()
+
+    def _expirado(self, criado: float, agora: float) -> bool:
+        return self.ttl is not None and agora - criado > self.ttl
+
+    def get(self, chave: str) -> Optional[dict]:
+        """Retorna uma cópia do JSON armazenado ou None"""
+        agora = time.time()
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                criado, dados = item
+                if not self._expirado(criado, agora):
+                    self._memoria.move_to_end(chave)
+                    self._hits_memoria += 1
+                    return json.loads(dados)
+                del self._memoria[chave]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT dados, criado FROM respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if row is not None:
+                    dados, criado = row
+                    if not self._expirado(criado, agora):
+                        self._db.execute(
+                            "UPDATE respostas SET acessado = ? WHERE chave = ?", (agora, chave)
+                        )
+                        self._db.commit()
+                        self._guardar_memoria(chave, criado, dados)
+                        self._hits_disco += 1
+                        return json.loads(dados)
+                    self._db.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                    self._db.commit()
+
+            self._misses += 1
+            return None
+
+    def set(self, chave: str, data: dict) -> None:
+        """Armazena o JSON já extraído nos dois níveis"""
+        dados = json.dumps(data, ensure_ascii=False)
+        agora = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, agora, dados)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO respostas (chave, dados, criado, acessado) VALUES (?, ?, ?, ?)",
+                    (chave, dados, agora, agora),
+                )
+                self._evict_disco(agora)
+                self._db.commit()
+
+    def _guardar_memoria(self, chave: str, criado: float, dados: str) -> None:
+        self._memoria[chave] = (criado, dados)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _evict_disco(self, agora: float) -> None:
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM respostas WHERE criado < ?", (agora - self.ttl,))
+        (total,) = self._db.execute("SELECT COUNT(*) FROM respostas").fetchone()
+        excesso = total - self.max_disco
+        if excesso > 0:
+            # Remove os menos acessados recentemente
+            self._db.execute(
+                "DELETE FROM respostas WHERE chave IN "
+                "(SELECT chave FROM respostas ORDER BY acessado ASC LIMIT ?)",
+                (excesso,),
+            )
+
+    def limpar(self) -> None:
+        """Esvazia os dois níveis (os contadores são mantidos)"""
+        with self._lock:
+            self._memoria.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM respostas")
+                self._db.commit()
+
+    def estatisticas(self) -> dict:
+        """Contadores de acerto/erro e tamanho de cada nível"""
+        with self._lock:
+            total_disco = 0
+            if self._db is not None:
+                (total_disco,) = self._db.execute("SELECT COUNT(*) FROM respostas").fetchone()
+            consultas = self._hits_memoria + self._hits_disco + self._misses
+            return {
+                "hits_memoria": self._hits_memoria,
+                "hits_disco": self._hits_disco,
+                "misses": self._misses,
+                "taxa_acerto": (self._hits_memoria + self._hits_disco) / consultas if consultas else 0.0,
+                "itens_memoria": len(self._memoria),
+                "itens_disco": total_disco,
+            }
+
+    def fechar(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,265 @@
+"""Conversão em lote de descrições para arquivos .bpmn (sem Streamlit)
+
+Uso:
+    python -m gerador_bpmn descricoes/ --saida saida/ --concorrencia 8
+    python -m gerador_bpmn descricoes.jsonl --saida saida/ --stub
+    python -m gerador_bpmn descricoes/ --saida saida/ --svg --png
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .agendador import PRIORIDADE_LOTE, RPM_PADRAO, TPM_PADRAO, Agendador
+from .cache import CacheRespostas
+from .coalescencia import Coalescedor
+from .conversao import escrever_bpmn_xml
+from .esquema import suporta_saida_estruturada
+from .geracao import gerar_bpmn
+from .incremental import montar_diagrama
+from .rastreio import configurar_log_json, etapa, metricas_padrao, rastreio
+from .renderizacao import svg_para_png
+from .similaridade import CAMINHO_PADRAO as CAMINHO_SIMILARES, LIMIAR_ADAPTACAO, IndiceSimilaridade
+from .stub import LLMStub
+
+EXTENSOES_TEXTO = (".txt", ".md")
+
+
+def ler_entradas(caminho: str) -> list[dict]:
+    """Lê descrições de um diretório (*.txt/*.md) ou de um arquivo JSONL"""
+    origem = Path(caminho)
+    itens = []
+    if origem.is_dir():
+        for arquivo in sorted(origem.iterdir()):
+            if arquivo.suffix.lower() in EXTENSOES_TEXTO and arquivo.is_file():
+                itens.append({"id": arquivo.stem, "descricao": arquivo.read_text(encoding="utf-8")})
+    elif origem.is_file():
+        with origem.open(encoding="utf-8") as f:
+            for n, linha in enumerate(f, start=1):
+                if not linha.strip():
+                    continue
+                registro = json.loads(linha)
+                descricao = registro.get("descricao") or registro.get("texto")
+                if not descricao:
+                    raise ValueError(f"Linha {n} sem 'descricao'")
+                itens.append({"id": str(registro.get("id") or f"item_{n}"), "descricao": descricao})
+    else:
+        raise FileNotFoundError(f"Entrada não encontrada: {caminho}")
+
+    vistos = set()
+    for item in itens:
+        base = nome = re.sub(r"[^\w.-]+", "_", item["id"]).strip("._") or "item"
+        sufixo = 2
+        while nome in vistos:
+            nome = f"{base}_{sufixo}"
+            sufixo += 1
+        vistos.add(nome)
+        item["arquivo"] = nome
+    return itens
+
+
+def _percentil(valores: list[float], p: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def processar_item(
+    item: dict, saida: Path, args, cache, llm, agendador=None, coalescedor=None, similares=None
+) -> dict:
+    """Gera JSON + XML de uma descrição e grava os arquivos; nunca levanta exceção"""
+    inicio = time.perf_counter()
+    resultado = {"id": item["id"], "arquivo": item["arquivo"]}
+    with rastreio(trace_id=str(item["id"])) as rastro:
+        _processar(item, saida, args, cache, llm, agendador, coalescedor, similares, resultado)
+    resultado["latencia_s"] = round(time.perf_counter() - inicio, 4)
+    resultado["etapas_ms"] = {nome: round(s * 1000, 2) for nome, s in rastro.duracoes().items()}
+    return resultado
+
+
+def _processar(item, saida, args, cache, llm, agendador, coalescedor, similares, resultado) -> None:
+    try:
+        data = gerar_bpmn(
+            item["descricao"],
+            args.modelo,
+            args.temperatura,
+            api_key=args.api_key,
+            cache=cache,
+            llm=llm,
+            agendador=agendador,
+            prioridade=PRIORIDADE_LOTE,
+            estruturado=not args.sem_esquema and suporta_saida_estruturada(args.modelo),
+            coalescedor=coalescedor,
+            compacto=args.saida_compacta_modelo,
+            similares=similares
+        )
+        # Validação, layout e rotas uma vez só, para o XML e as imagens
+        diagrama = montar_diagrama(data)
+        data, problemas = diagrama.data, diagrama.problemas
+        (saida / f"{item['arquivo']}.json").write_text(
+            json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        with etapa("xml", nos=len(diagrama.modelo.nos)), \
+                (saida / f"{item['arquivo']}.bpmn").open("w", encoding="utf-8") as destino:
+            escrever_bpmn_xml(diagrama.modelo, destino, args.compacto, diagrama.layout, diagrama.rotas)
+        if args.svg or args.png:
+            svg = diagrama.svg(largura_max=args.largura_imagem)
+            if args.svg:
+                (saida / f"{item['arquivo']}.svg").write_text(svg, encoding="utf-8")
+            if args.png:
+                (saida / f"{item['arquivo']}.png").write_bytes(svg_para_png(svg))
+        resultado.update(
+            status="ok",
+            elementos=len(data.get("elementos", [])),
+            fluxos=len(data.get("fluxos", []))
+        )
+        if problemas:
+            resultado["correcoes"] = [p.to_dict() for p in problemas]
+    except Exception as e:
+        resultado.update(status="erro", erro=f"{type(e).__name__}: {e}")
+
+
+async def processar_lote(
+    itens: list[dict], saida: Path, args, cache=None, llm=None, agendador=None, coalescedor=None, similares=None
+) -> list[dict]:
+    """Processa os itens com no máximo `args.concorrencia` chamadas simultâneas"""
+    semaforo = asyncio.Semaphore(args.concorrencia)
+    # O executor padrão do asyncio limitaria a concorrência a min(32, CPUs + 4)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.concorrencia))
+    total = len(itens)
+    concluidos = 0
+
+    async def _um(item):
+        nonlocal concluidos
+        async with semaforo:
+            resultado = await asyncio.to_thread(
+                processar_item, item, saida, args, cache, llm, agendador, coalescedor, similares
+            )
+        concluidos += 1
+        if not args.silencioso:
+            print(f"[{concluidos}/{total}] {item['id']}: {resultado['status']} "
+                  f"({resultado['latencia_s']:.2f}s)", file=sys.stderr)
+        return resultado
+
+    return await asyncio.gather(*(_um(item) for item in itens))
+
+
+def resumir(resultados: list[dict], duracao: float) -> dict:
+    latencias = [r["latencia_s"] for r in resultados]
+    falhas = [r for r in resultados if r["status"] != "ok"]
+    return {
+        "total": len(resultados),
+        "sucesso": len(resultados) - len(falhas),
+        "falhas": len(falhas),
+        "duracao_s": round(duracao, 3),
+        "throughput_itens_s": round(len(resultados) / duracao, 3) if duracao > 0 else None,
+        "latencia_p50_s": _percentil(latencias, 50),
+        "latencia_p95_s": _percentil(latencias, 95),
+        "latencia_max_s": max(latencias) if latencias else None,
+    }
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m gerador_bpmn",
+        description="Converte descrições de processos em arquivos .bpmn/.json em lote"
+    )
+    parser.add_argument("entrada", help="Diretório com arquivos .txt/.md ou arquivo .jsonl ({id, descricao})")
+    parser.add_argument("--saida", default="saida_bpmn", help="Diretório de saída (padrão: saida_bpmn)")
+    parser.add_argument("--modelo", default="gemini-2.5-flash")
+    parser.add_argument("--temperatura", type=float, default=0.1)
+    parser.add_argument("--concorrencia", type=int, default=4, help="Chamadas simultâneas ao modelo")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY"),
+                        help="Padrão: variável de ambiente GOOGLE_API_KEY")
+    parser.add_argument("--rpm", type=int, default=None,
+                        help=f"Requisições por minuto por chave (padrão: {RPM_PADRAO}; sem limite com --stub)")
+    parser.add_argument("--tpm", type=int, default=TPM_PADRAO, help="Tokens por minuto por chave")
+    parser.add_argument("--stub", action="store_true", help="Usa um LLM falso local (sem rede)")
+    parser.add_argument("--stub-latencia", type=float, default=0.0, help="Latência simulada do stub (s)")
+    parser.add_argument("--sem-cache", action="store_true", help="Não consulta nem grava o cache de respostas")
+    parser.add_argument("--compacto", action="store_true", help="Grava o XML sem indentação")
+    parser.add_argument("--svg", action="store_true", help="Grava também <id>.svg do diagrama")
+    parser.add_argument("--png", action="store_true", help="Grava também <id>.png (requer cairosvg)")
+    parser.add_argument("--largura-imagem", type=int, default=None,
+                        help="Largura máxima das imagens em px (miniaturas)")
+    parser.add_argument("--sem-esquema", action="store_true",
+                        help="Não usa saída estruturada (esquema JSON) nem valida a resposta")
+    parser.add_argument("--saida-compacta-modelo", action="store_true",
+                        help="Pede ao modelo o formato compacto (menos tokens de saída; sem esquema estruturado)")
+    parser.add_argument("--similares", action="store_true",
+                        help="Reaproveita (ou adapta) o resultado de descrições parecidas já geradas")
+    parser.add_argument("--limiar-similares", type=float, default=LIMIAR_ADAPTACAO,
+                        help="Similaridade (0 a 1) a partir da qual o resultado parecido é adaptado")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Escreve no stderr uma linha JSON por etapa (span) de cada item")
+    parser.add_argument("--silencioso", action="store_true")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    if args.concorrencia < 1:
+        print("--concorrencia deve ser >= 1", file=sys.stderr)
+        return 2
+    if not args.stub and not args.api_key:
+        print("Informe --api-key, defina GOOGLE_API_KEY ou use --stub", file=sys.stderr)
+        return 2
+    if args.png and importlib.util.find_spec("cairosvg") is None:
+        print("--png requer o pacote cairosvg (pip install cairosvg)", file=sys.stderr)
+        return 2
+
+    if args.log_json:
+        configurar_log_json()
+
+    itens = ler_entradas(args.entrada)
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+
+    llm = LLMStub(latencia=args.stub_latencia) if args.stub else None
+    # O stub é determinístico e barato: não vale poluir o cache com ele
+    cache = None if args.sem_cache or args.stub else CacheRespostas()
+
+    agendador = None
+    if args.rpm or not args.stub:
+        agendador = Agendador(rpm=args.rpm or RPM_PADRAO, tpm=args.tpm)
+
+    similares = None
+    if args.similares:
+        # Com o stub o índice fica só em memória, como o cache
+        similares = IndiceSimilaridade(
+            caminho=None if args.stub else CAMINHO_SIMILARES, limiar_adaptacao=args.limiar_similares
+        )
+
+    # Descrições repetidas no lote, processadas ao mesmo tempo, fazem uma chamada só
+    coalescedor = Coalescedor()
+
+    inicio = time.perf_counter()
+    resultados = asyncio.run(
+        processar_lote(
+            itens, saida, args, cache=cache, llm=llm, agendador=agendador,
+            coalescedor=coalescedor, similares=similares
+        )
+    )
+    resumo = resumir(resultados, time.perf_counter() - inicio)
+    resumo["coalescidas"] = coalescedor.metricas()["coalescidas"]
+    if agendador is not None:
+        resumo["agendador"] = agendador.metricas()
+    if similares is not None:
+        resumo["similares"] = similares.estatisticas()
+
+    relatorio = {"resumo": resumo, "metricas": metricas_padrao().resumo(), "itens": resultados}
+    (saida / "relatorio.json").write_text(
+        json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(json.dumps(resumo, ensure_ascii=False))
+    return 0 if resumo["falhas"] == 0 else 1
@@ -0,0 +1,157 @@
+"""Registro de clientes LLM reutilizáveis entre reruns, sessões e threads"""
+
+import atexit
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Optional
+
+
+def hash_api_key(api_key: str) -> str:
+    """Identifica a chave sem mantê-la em claro na chave do registro"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def criar_cliente_gemini(api_key: str, modelo: str, temp: float, esquema: Optional[dict] = None):
+    """Fábrica padrão: um ChatGoogleGenerativeAI por combinação chave/modelo/temperatura
+
+    Com `esquema`, liga a saída estruturada do Gemini (JSON restrito ao esquema).
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    opcoes = {}
+    if esquema is not None:
+        opcoes = {"response_mime_type": "application/json", "response_schema": esquema}
+    return ChatGoogleGenerativeAI(
+        model=modelo,
+        temperature=temp,
+        google_api_key=api_key,
+        convert_system_message_to_human=True,
+        **opcoes
+    )
+
+
+def _fechar_cliente(cliente) -> None:
+    """Fecha o canal HTTP/gRPC subjacente, quando o SDK expõe um"""
+    for nome in ("client", "async_client"):
+        sdk = getattr(cliente, nome, None)
+        fechar = getattr(sdk, "close", None)
+        if callable(fechar):
+            try:
+                fechar()
+            except Exception:
+                pass
+
+
+class _Entrada:
+    __slots__ = ("cliente", "ultimo_uso", "lock")
+
+    def __init__(self):
+        self.cliente = None
+        self.ultimo_uso = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class RegistroClientes:
+    """Mantém um cliente por (hash da api_key, modelo, temperatura, esquema) com despejo por ociosidade"""
+
+    def __init__(
+        self,
+        fabrica: Callable = criar_cliente_gemini,
+        tempo_ocioso: float = 15 * 60,
+        max_clientes: int = 32,
+    ):
+        self.fabrica = fabrica
+        self.tempo_ocioso = tempo_ocioso
+        self.max_clientes = max_clientes
+        self._entradas: dict[tuple, _Entrada] = {}
+        self._lock = threading.Lock()
+        self._criados = 0
+        self._reusados = 0
+        self._encerrado = False
+
+    def obter(self, api_key: str, modelo: str, temp: float, esquema: Optional[dict] = None):
+        """Retorna um cliente existente ou cria um novo (uma única vez por chave)"""
+        assinatura = None
+        if esquema is not None:
+            assinatura = hashlib.sha256(json.dumps(esquema, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        chave = (hash_api_key(api_key), modelo, round(float(temp), 3), assinatura)
+        with self._lock:
+            if self._encerrado:
+                raise RuntimeError("Registro de clientes encerrado")
+            self._despejar_ociosos(time.monotonic())
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                entrada = _Entrada()
+                self._entradas[chave] = entrada
+
+        # Construção fora do lock global: outras chaves não ficam bloqueadas
+        with entrada.lock:
+            if entrada.cliente is None:
+                if esquema is None:
+                    entrada.cliente = self.fabrica(api_key, modelo, temp)
+                else:
+                    entrada.cliente = self.fabrica(api_key, modelo, temp, esquema=esquema)
+                with self._lock:
+                    self._criados += 1
+            else:
+                with self._lock:
+                    self._reusados += 1
+            entrada.ultimo_uso = time.monotonic()
+            return entrada.cliente
+
+    def _despejar_ociosos(self, agora: float) -> None:
+        removidos = [
+            chave for chave, e in self._entradas.items()
+            if e.cliente is not None and agora - e.ultimo_uso > self.tempo_ocioso
+        ]
+        for chave in removidos:
+            _fechar_cliente(self._entradas.pop(chave).cliente)
+
+        # Acima do limite, esquece os usados há mais tempo sem fechá-los:
+        # podem estar em uso por outra thread e serão coletados pelo GC
+        excesso = len(self._entradas) - self.max_clientes
+        if excesso >= 0:
+            antigos = sorted(
+                (e.ultimo_uso, chave) for chave, e in self._entradas.items()
+                if e.cliente is not None
+            )
+            for _, chave in antigos[:excesso + 1]:
+                del self._entradas[chave]
+
+    def despejar_ociosos(self) -> None:
+        """Fecha clientes sem uso há mais de `tempo_ocioso` segundos"""
+        with self._lock:
+            self._despejar_ociosos(time.monotonic())
+
+    def encerrar(self) -> None:
+        """Fecha todos os clientes; chamadas posteriores a obter() falham"""
+        with self._lock:
+            self._encerrado = True
+            entradas, self._entradas = self._entradas, {}
+        for entrada in entradas.values():
+            if entrada.cliente is not None:
+                _fechar_cliente(entrada.cliente)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "ativos": sum(1 for e in self._entradas.values() if e.cliente is not None),
+                "criados": self._criados,
+                "reusados": self._reusados,
+            }
+
+
+_registro_padrao: Optional[RegistroClientes] = None
+_registro_lock = threading.Lock()
+
+
+def registro_padrao() -> RegistroClientes:
+    """Registro global do processo, encerrado automaticamente na saída"""
+    global _registro_padrao
+    with _registro_lock:
+        if _registro_padrao is None:
+            _registro_padrao = RegistroClientes()
+            atexit.register(_registro_padrao.encerrar)
+        return _registro_padrao
@@ -0,0 +1,70 @@
+"""Coalescência de chamadas idênticas em andamento (single-flight)
+
+Quando várias sessões pedem a mesma geração ao mesmo tempo (ex.: uma turma
+clicando no mesmo exemplo), só a primeira chama o modelo; as demais esperam
+por ela e recebem uma cópia do resultado, ou a mesma exceção. Terminada a
+chamada, a chave sai da tabela: pedidos posteriores vão ao cache normal.
+"""
+
+import copy
+import threading
+from typing import Callable, Hashable
+
+from .rastreio import contar
+
+
+class _Chamada:
+    __slots__ = ("pronto", "resultado", "erro", "seguidores")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.seguidores = 0
+
+
+class Coalescedor:
+    """Executa no máximo uma `funcao` por chave de cada vez, compartilhando o resultado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: dict = {}
+        self._contadores = {"executadas": 0, "coalescidas": 0, "erros": 0, "max_seguidores": 0}
+
+    def executar(self, chave: Hashable, funcao: Callable[[], object]):
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_andamento[chave] = _Chamada()
+            else:
+                chamada.seguidores += 1
+                self._contadores["coalescidas"] += 1
+        if not lider:
+            contar("coalescidas")
+            chamada.pronto.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            # Cada chamador recebe o seu objeto: o resultado pode ser alterado depois
+            return copy.deepcopy(chamada.resultado)
+
+        try:
+            chamada.resultado = funcao()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+                self._contadores["executadas"] += 1
+                if chamada.erro is not None:
+                    self._contadores["erros"] += 1
+                self._contadores["max_seguidores"] = max(self._contadores["max_seguidores"], chamada.seguidores)
+            chamada.pronto.set()
+        # Depois de sair da tabela ninguém mais entra como seguidor; com seguidores
+        # copiando o resultado, o líder fica com uma cópia própria
+        return copy.deepcopy(chamada.resultado) if chamada.seguidores else chamada.resultado
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return dict(self._contadores, em_andamento=len(self._em_andamento))
@@ -0,0 +1,161 @@
+"""Formato compacto de geração: menos tokens de saída, expandido localmente para o JSON do processo
+
+No formato verboso cada nó repete "id", "tipo", "nome" e "papel", e cada
+fluxo repete os ids de origem e destino. No compacto:
+
+    {"p": "Pedido", "r": ["Cliente", "Gerente"],
+     "n": [["s", "Início", 0], ["t", "Pedir", 0], ["x", "Aprovado?", 1, [[3, "Sim"], [4, "Não"]]],
+           ["u", "Aprovar", 1], ["e", "Fim", 0]]}
+
+- "r" é a tabela de papéis; o 3º item de cada nó é o índice nela
+- o tipo vira um código curto (CODIGOS_TIPO)
+- cada nó liga-se ao seguinte da lista, exceto endEvent; um 4º item com
+  a lista de destinos (índice ou [índice, "rótulo"]) substitui essa ligação
+
+`expandir` gera o formato atual (ids StartEvent_1, Task_1, Gateway_1,
+EndEvent_1, Flow_1...) sem perder nada do que o modelo escreveu; o que
+estiver inválido segue adiante para a validação corrigir. `compactar` faz
+o caminho inverso, para medir a economia e para o LLM falso.
+"""
+
+CODIGOS_TIPO = {
+    "s": "startEvent",
+    "e": "endEvent",
+    "t": "task",
+    "u": "userTask",
+    "sv": "serviceTask",
+    "x": "exclusiveGateway",
+    "p": "parallelGateway",
+}
+_CODIGO_DO_TIPO = {tipo: codigo for codigo, tipo in CODIGOS_TIPO.items()}
+
+_PREFIXOS = {
+    "startEvent": "StartEvent",
+    "endEvent": "EndEvent",
+    "exclusiveGateway": "Gateway",
+    "parallelGateway": "Gateway",
+}
+
+PROMPT_COMPACTO = """Você é um especialista em BPMN 2.0. Converta a descrição em JSON compacto com foco em POOLS e LANES.
+
+ESTRUTURA OBRIGATÓRIA:
+{"p": "Nome do Processo",
+ "r": ["Cliente", "Gerente", "Sistema"],
+ "n": [
+  ["s", "Início", 0],
+  ["t", "Solicitar Pedido", 0],
+  ["u", "Aprovar Pedido", 1],
+  ["x", "Aprovado?", 1, [[4, "Sim"], [5, "Não"]]],
+  ["sv", "Emitir Nota", 2, [6]],
+  ["t", "Avisar Recusa", 0],
+  ["e", "Fim", 0]
+ ]}
+
+REGRAS:
+1. "r" lista os papéis (Ex: Cliente, Sistema, Gerente, RH); o 3º item de cada nó é o índice do papel em "r". Agrupe tarefas do mesmo ator.
+2. Cada nó é [tipo, nome, papel]. TIPOS: s=início, e=fim, t=tarefa, u=tarefa de usuário, sv=tarefa automática, x=gateway exclusivo, p=gateway paralelo.
+3. Cada nó segue automaticamente para o próximo da lista (menos "e"). Para ir a outro nó, ou a vários, acrescente um 4º item com os índices de destino (contando de 0); use [índice, "rótulo"] nas saídas de gateways e [] para nenhuma saída.
+4. Se o papel não estiver claro, use "Sistema".
+RETORNE APENAS O JSON."""
+
+
+def e_compacto(data) -> bool:
+    return isinstance(data, dict) and "n" in data and "elementos" not in data
+
+
+def expandir(data) -> dict:
+    """JSON compacto -> processo/elementos/fluxos; um JSON já no formato verboso volta como está"""
+    if not e_compacto(data):
+        return data
+    raias = data.get("r") if isinstance(data.get("r"), list) else []
+    nos = data.get("n") if isinstance(data.get("n"), list) else []
+
+    elementos = []
+    ids = []  # índice do nó -> id (None se o item não for um nó)
+    contagem = {}
+    for item in nos:
+        if not isinstance(item, list) or not item:
+            ids.append(None)
+            continue
+        tipo = _tipo_do_item(item)
+        prefixo = _PREFIXOS.get(tipo, "Task")
+        contagem[prefixo] = contagem.get(prefixo, 0) + 1
+        eid = f"{prefixo}_{contagem[prefixo]}"
+        ids.append(eid)
+
+        elem = {"id": eid, "tipo": tipo}
+        if len(item) > 1 and item[1] is not None:
+            elem["nome"] = item[1]
+        if len(item) > 2:
+            papel = item[2]
+            if isinstance(papel, int) and not isinstance(papel, bool) and 0 <= papel < len(raias):
+                elem["papel"] = raias[papel]
+            elif isinstance(papel, str) and papel:
+                elem["papel"] = papel  # o modelo escreveu o nome em vez do índice
+        elementos.append(elem)
+
+    fluxos = []
+    for i, item in enumerate(nos):
+        if ids[i] is None:
+            continue
+        if len(item) > 3:
+            saidas = item[3] if isinstance(item[3], list) else [item[3]]
+        elif _tipo_do_item(item) != "endEvent" and i + 1 < len(nos):
+            saidas = [i + 1]
+        else:
+            saidas = []
+        for saida in saidas:
+            nome = None
+            if isinstance(saida, list):
+                destino, nome = (saida + [None])[:2] if saida else (None, None)
+            else:
+                destino = saida
+            if isinstance(destino, int) and not isinstance(destino, bool) and 0 <= destino < len(ids):
+                destino = ids[destino]
+            else:
+                destino = None  # a validação descarta e religa o nó
+            fluxo = {"id": f"Flow_{len(fluxos) + 1}", "origem": ids[i], "destino": destino}
+            if nome is not None:
+                fluxo["nome"] = nome
+            fluxos.append(fluxo)
+
+    return {"processo": data.get("p") or "Processo", "elementos": elementos, "fluxos": fluxos}
+
+
+def _tipo_do_item(item: list) -> str:
+    codigo = item[0]
+    return CODIGOS_TIPO.get(codigo, codigo) if isinstance(codigo, str) else "task"
+
+
+def compactar(data: dict) -> dict:
+    """JSON verboso -> compacto; fluxos para ids inexistentes ficam de fora"""
+    elementos = [e for e in data.get("elementos") or [] if isinstance(e, dict)]
+    indice = {e.get("id"): i for i, e in enumerate(elementos)}
+    raias = []
+    posicao_raia = {}
+    saidas = [[] for _ in elementos]
+    for f in data.get("fluxos") or []:
+        if not isinstance(f, dict):
+            continue
+        origem, destino = indice.get(f.get("origem")), indice.get(f.get("destino"))
+        if origem is None or destino is None:
+            continue
+        saidas[origem].append(destino if f.get("nome") is None else [destino, f["nome"]])
+
+    nos = []
+    for i, elem in enumerate(elementos):
+        tipo = elem.get("tipo")
+        item = [_CODIGO_DO_TIPO.get(tipo, tipo), elem.get("nome")]
+        papel = elem.get("papel")
+        if papel is not None:
+            if papel not in posicao_raia:
+                posicao_raia[papel] = len(raias)
+                raias.append(papel)
+            item.append(posicao_raia[papel])
+        implicitas = [i + 1] if tipo != "endEvent" and i + 1 < len(elementos) else []
+        if saidas[i] != implicitas:
+            if papel is None:
+                item.append(None)
+            item.append(saidas[i])
+        nos.append(item)
+    return {"p": data.get("processo"), "r": raias, "n": nos}
@@ -0,0 +1,249 @@
+"""Conversão da resposta do modelo em JSON e do JSON em XML BPMN 2.0"""
+
+from typing import IO, Iterator, Optional, Union
+
+from .extracao import extrair_json  # noqa: F401  (reexportado por compatibilidade)
+from .layout import LANE_HEADER_WIDTH, Layout, calcular_layout
+from .modelo import SEM_NO, ModeloProcesso, como_modelo
+from .roteamento import rotear_fluxos
+
+DECLARACAO_XML = '<?xml version="1.0" encoding="UTF-8"?>'
+
+
+NAMESPACES = {
+    "bpmn": "http://www.omg.org/spec/BPMN/20100524/MODEL",
+    "bpmndi": "http://www.omg.org/spec/BPMN/20100524/DI",
+    "dc": "http://www.omg.org/spec/DD/20100524/DC",
+    "di": "http://www.omg.org/spec/DD/20100524/DI"
+}
+
+TAG_MAP = {
+    "startEvent": "bpmn:startEvent",
+    "endEvent": "bpmn:endEvent",
+    "task": "bpmn:task",
+    "userTask": "bpmn:userTask",
+    "serviceTask": "bpmn:serviceTask",
+    "exclusiveGateway": "bpmn:exclusiveGateway",
+    "parallelGateway": "bpmn:parallelGateway"
+}
+
+
+def escapar_texto(texto: str) -> str:
+    """Escapa &, < e > para conteúdo de elementos XML/SVG (aspas não precisam)"""
+    if "&" in texto:
+        texto = texto.replace("&", "&amp;")
+    if "<" in texto:
+        texto = texto.replace("<", "&lt;")
+    if ">" in texto:
+        texto = texto.replace(">", "&gt;")
+    return texto
+
+
+def _escapar_atributo(valor: str) -> str:
+    # Mesmas regras do ElementTree, para manter a saída idêntica
+    valor = escapar_texto(valor)
+    if '"' in valor:
+        valor = valor.replace('"', "&quot;")
+    if "\r" in valor:
+        valor = valor.replace("\r", "&#13;")
+    if "\n" in valor:
+        valor = valor.replace("\n", "&#10;")
+    if "\t" in valor:
+        valor = valor.replace("\t", "&#09;")
+    return valor
+
+
+class _Escritor:
+    """Formata tags com a mesma indentação de ET.indent (ou sem nenhuma, se compacto)"""
+
+    def __init__(self, compacto: bool):
+        self.compacto = compacto
+
+    def _quebra(self, nivel: int) -> str:
+        return "" if self.compacto else "\n" + "  " * nivel
+
+    @staticmethod
+    def _attrs(attrs) -> str:
+        return "".join(f' {k}="{_escapar_atributo(v)}"' for k, v in attrs)
+
+    def abrir(self, nivel: int, tag: str, *attrs) -> str:
+        return f"{self._quebra(nivel)}<{tag}{self._attrs(attrs)}>"
+
+    def fechar(self, nivel: int, tag: str) -> str:
+        return f"{self._quebra(nivel)}</{tag}>"
+
+    def vazio(self, nivel: int, tag: str, *attrs) -> str:
+        return f"{self._quebra(nivel)}<{tag}{self._attrs(attrs)} />"
+
+    def texto(self, nivel: int, tag: str, texto: str) -> str:
+        return f"{self._quebra(nivel)}<{tag}>{escapar_texto(texto)}</{tag}>"
+
+    def elemento(self, nivel: int, tag: str, attrs: tuple, filhos: list) -> Iterator[str]:
+        """Elemento com filhos já formatados (um nível abaixo)"""
+        if not filhos:
+            yield self.vazio(nivel, tag, *attrs)
+            return
+        yield self.abrir(nivel, tag, *attrs)
+        yield from filhos
+        yield self.fechar(nivel, tag)
+
+
+def json_to_bpmn_xml(
+    data: Union[dict, ModeloProcesso],
+    compacto: bool = False,
+    layout: Optional[Layout] = None,
+    rotas: Optional[list] = None
+) -> str:
+    """Converte JSON em XML BPMN 2.0 com suporte a Pools e Lanes
+
+    `compacto=True` omite a indentação (saída menor para consumo por máquinas).
+    """
+    return "".join(iter_bpmn_xml(data, compacto, layout, rotas))
+
+
+def escrever_bpmn_xml(
+    data: Union[dict, ModeloProcesso],
+    destino: IO[str],
+    compacto: bool = False,
+    layout: Optional[Layout] = None,
+    rotas: Optional[list] = None
+) -> None:
+    """Grava o XML diretamente em um arquivo, sem montar o documento em memória"""
+    for pedaco in iter_bpmn_xml(data, compacto, layout, rotas):
+        destino.write(pedaco)
+
+
+def iter_bpmn_xml(
+    data: Union[dict, ModeloProcesso],
+    compacto: bool = False,
+    layout: Optional[Layout] = None,
+    rotas: Optional[list] = None
+) -> Iterator[str]:
+    """Gera o XML BPMN em pedaços, seção por seção, à medida que é calculado
+
+    Aceita o JSON do modelo ou um ModeloProcesso (e, opcionalmente, layout e
+    rotas já calculados). Só o modelo e as colunas de coordenadas ficam em
+    memória; o documento em si nunca é materializado.
+    """
+    modelo = como_modelo(data)
+    nos, fluxos, raias = modelo.nos, modelo.fluxos, modelo.raias
+    w = _Escritor(compacto)
+    
+    # No modo indentado a quebra após a declaração vem com a própria raiz
+    yield DECLARACAO_XML + ("\n" if compacto else "")
+    yield w.abrir(
+        0, "bpmn:definitions",
+        *((f"xmlns:{prefix}", uri) for prefix, uri in NAMESPACES.items()),
+        ("id", "Definitions_1"),
+        ("targetNamespace", "http://bpmn.io/schema/bpmn")
+    )
+    
+    # 1. Estrutura de Colaboração
+    yield w.abrir(1, "bpmn:collaboration", ("id", "Collaboration_1"))
+    yield w.vazio(
+        2, "bpmn:participant",
+        ("id", "Participant_1"),
+        ("name", modelo.processo),
+        ("processRef", "Process_1")
+    )
+    yield w.fechar(1, "bpmn:collaboration")
+    
+    # 2. Processo e LaneSet
+    yield w.abrir(1, "bpmn:process", ("id", "Process_1"), ("isExecutable", "false"))
+    yield w.abrir(2, "bpmn:laneSet", ("id", "LaneSet_1"))
+    
+    for i, raia in enumerate(raias):
+        refs = [w.texto(4, "bpmn:flowNodeRef", nos[j].id) for j in raia.membros]
+        yield from w.elemento(3, "bpmn:lane", (("id", f"Lane_{i}"), ("name", raia.nome)), refs)
+    
+    yield w.fechar(2, "bpmn:laneSet")
+    
+    # 3. Conexões de cada nó, na ordem dos fluxos
+    # (ids repetidos: só a última ocorrência, a do índice, recebe as conexões)
+    conexoes = [None] * len(nos)
+    for fluxo in fluxos:
+        if fluxo.origem != SEM_NO:
+            conexoes[fluxo.origem] = conexoes[fluxo.origem] or []
+            conexoes[fluxo.origem].append(("bpmn:outgoing", fluxo.id))
+        if fluxo.destino != SEM_NO:
+            conexoes[fluxo.destino] = conexoes[fluxo.destino] or []
+            conexoes[fluxo.destino].append(("bpmn:incoming", fluxo.id))
+    
+    # 4. Elementos do Processo
+    for i, no in enumerate(nos):
+        attrs = [("id", no.id)]
+        if no.nome:
+            attrs.append(("name", no.nome))
+        filhos = [w.texto(3, tag, fid) for tag, fid in conexoes[i] or ()]
+        yield from w.elemento(2, TAG_MAP.get(no.tipo, "bpmn:task"), attrs, filhos)
+    del conexoes
+    
+    # 5. Fluxos
+    for fluxo in fluxos:
+        yield w.vazio(
+            2, "bpmn:sequenceFlow",
+            ("id", fluxo.id),
+            ("sourceRef", fluxo.origem_id),
+            ("targetRef", fluxo.destino_id)
+        )
+    
+    yield w.fechar(1, "bpmn:process")
+
+    # === CÁLCULO DE LAYOUT (DI) ===
+    if layout is None:
+        layout = calcular_layout(modelo)
+
+    # === GERAR DIAGRAMA (BPMNDI) ===
+    yield w.abrir(1, "bpmndi:BPMNDiagram", ("id", "BPMNDiagram_1"))
+    yield w.abrir(2, "bpmndi:BPMNPlane", ("id", "BPMNPlane_1"), ("bpmnElement", "Collaboration_1"))
+
+    def _bounds(x, y, largura, altura):
+        return w.vazio(
+            4, "dc:Bounds",
+            ("x", str(x)), ("y", str(y)), ("width", str(largura)), ("height", str(altura))
+        )
+
+    # 1. Shapes das Lanes e Participant
+    # Participant (Pool inteira)
+    yield from w.elemento(
+        3, "bpmndi:BPMNShape",
+        (("id", "Participant_1_di"), ("bpmnElement", "Participant_1"), ("isHorizontal", "true")),
+        [_bounds(50, 0, int(layout.largura_total), int(layout.altura_total))]
+    )
+    
+    # Shapes individuais das Lanes (Opcional em alguns renderizadores, mas bom para compatibilidade)
+    for i in range(len(raias)):
+        lid = f"Lane_{i}"
+        yield from w.elemento(
+            3, "bpmndi:BPMNShape",
+            (("id", f"{lid}_di"), ("bpmnElement", lid), ("isHorizontal", "true")),
+            # offset para o header da pool
+            [_bounds(
+                50 + LANE_HEADER_WIDTH,
+                int(layout.raia_y[i]),
+                int(layout.largura_total - LANE_HEADER_WIDTH),
+                int(layout.raia_altura[i])
+            )]
+        )
+
+    # 2. Shapes dos Elementos
+    for i, no in enumerate(nos):
+        yield from w.elemento(
+            3, "bpmndi:BPMNShape",
+            (("id", f"{no.id}_di"), ("bpmnElement", no.id)),
+            [_bounds(int(layout.x[i]), int(layout.y[i]), layout.largura[i], layout.altura[i])]
+        )
+
+    # 3. Edges (Fluxos): rotas ortogonais desviando das formas
+    if rotas is None:
+        rotas = rotear_fluxos(modelo, layout)
+    for fluxo, pontos in zip(fluxos, rotas):
+        yield from w.elemento(
+            3, "bpmndi:BPMNEdge",
+            (("id", f"{fluxo.id}_di"), ("bpmnElement", fluxo.id)),
+            [w.vazio(4, "di:waypoint", ("x", str(px)), ("y", str(py))) for px, py in pontos or ()]
+        )
+
+    yield w.fechar(2, "bpmndi:BPMNPlane")
+    yield w.fechar(1, "bpmndi:BPMNDiagram")
+    yield w.fechar(0, "bpmn:definitions")
@@ -0,0 +1,92 @@
+"""Esquema formal do JSON do processo e validador local do mesmo subconjunto
+
+ESQUEMA_BPMN usa só o subconjunto de OpenAPI aceito pela saída estruturada do
+Gemini (type/properties/required/items/enum), então o mesmo dicionário serve
+de `response_schema` para o modelo e de referência para `validar_esquema`.
+"""
+
+import hashlib
+import json
+
+TIPOS_PERMITIDOS = (
+    "startEvent", "endEvent", "task", "userTask", "serviceTask",
+    "exclusiveGateway", "parallelGateway",
+)
+
+ESQUEMA_BPMN = {
+    "type": "object",
+    "properties": {
+        "processo": {"type": "string"},
+        "elementos": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "tipo": {"type": "string", "enum": list(TIPOS_PERMITIDOS)},
+                    "nome": {"type": "string"},
+                    "papel": {"type": "string"},
+                },
+                "required": ["id", "tipo", "nome", "papel"],
+            },
+        },
+        "fluxos": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "origem": {"type": "string"},
+                    "destino": {"type": "string"},
+                    "nome": {"type": "string"},
+                },
+                "required": ["id", "origem", "destino"],
+            },
+        },
+    },
+    "required": ["processo", "elementos", "fluxos"],
+}
+
+_TIPOS_PYTHON = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+}
+
+# Muda sozinha quando o esquema muda; entra na chave do cache das respostas estruturadas
+VERSAO_ESQUEMA = hashlib.sha256(json.dumps(ESQUEMA_BPMN, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+# Modelos servidos pela API Gemini sem suporte a response_schema
+_SEM_SAIDA_ESTRUTURADA = ("gemma-",)
+
+
+def suporta_saida_estruturada(modelo: str) -> bool:
+    return not modelo.startswith(_SEM_SAIDA_ESTRUTURADA)
+
+
+def validar_esquema(valor, esquema: dict = ESQUEMA_BPMN, caminho: str = "$") -> list[str]:
+    """Lista de erros ("caminho: problema"); vazia se `valor` segue o esquema"""
+    tipo = esquema.get("type")
+    esperado = _TIPOS_PYTHON.get(tipo)
+    # bool é subclasse de int, mas não é um número em JSON
+    if esperado and (not isinstance(valor, esperado) or (tipo != "boolean" and isinstance(valor, bool))):
+        return [f"{caminho}: esperado {tipo}, veio {type(valor).__name__}"]
+
+    erros = []
+    if "enum" in esquema and valor not in esquema["enum"]:
+        erros.append(f"{caminho}: {valor!r} não é um dos valores permitidos ({', '.join(esquema['enum'])})")
+
+    if tipo == "object":
+        for campo in esquema.get("required", ()):
+            if campo not in valor or valor[campo] is None:
+                erros.append(f"{caminho}.{campo}: campo obrigatório ausente")
+        for campo, sub in esquema.get("properties", {}).items():
+            if valor.get(campo) is not None:
+                erros.extend(validar_esquema(valor[campo], sub, f"{caminho}.{campo}"))
+    elif tipo == "array" and "items" in esquema:
+        for i, item in enumerate(valor):
+            erros.extend(validar_esquema(item, esquema["items"], f"{caminho}[{i}]"))
+    return erros
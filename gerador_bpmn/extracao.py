@@ -0,0 +1,353 @@
+"""Extração do JSON da resposta do modelo, com reparo de defeitos comuns em uma passada
+
+Caminho rápido: `json.JSONDecoder.raw_decode` a partir do primeiro "{" (ou do
+bloco ```json), que já ignora prosa depois do objeto. Só se ele falhar o
+texto passa pelo `_Reparador`, que percorre a resposta uma única vez
+balanceando chaves/colchetes e reescrevendo o que não é JSON válido:
+comentários, aspas simples, chaves sem aspas, literais Python, vírgulas
+sobrando ou faltando, caracteres de controle em strings, números fora do
+padrão (01, .5) e saída truncada.
+"""
+
+import json
+import re
+
+# Código do reparo -> descrição (para logs e para a interface)
+REPAROS = {
+    "texto_ao_redor": "texto fora do objeto JSON ignorado",
+    "comentarios": "comentários removidos",
+    "aspas_simples": "aspas simples trocadas por duplas",
+    "chaves_sem_aspas": "chaves sem aspas",
+    "texto_sem_aspas": "valores de texto sem aspas",
+    "literais_python": "True/False/None convertidos para JSON",
+    "virgula_final": "vírgulas antes de } ou ] removidas",
+    "virgula_ausente": "vírgulas ausentes inseridas",
+    "virgula_extra": "vírgulas repetidas removidas",
+    "dois_pontos_ausentes": "dois-pontos ausentes inseridos",
+    "valor_ausente": "valores ausentes preenchidos com null",
+    "quebra_em_string": "quebras de linha e outros caracteres de controle em strings escapados",
+    "numero_invalido": "números fora do padrão JSON (01, .5) normalizados",
+    "escape_invalido": "barras invertidas inválidas escapadas",
+    "fechamento_trocado": "chave/colchete de fechamento trocado",
+    "caractere_invalido": "caracteres fora da sintaxe JSON ignorados",
+    "truncado": "JSON truncado, fechado no último valor completo",
+}
+
+MAX_CANDIDATOS = 5
+
+_decodificador = json.JSONDecoder()
+_CERCA_JSON = re.compile(r"```\s*json", re.IGNORECASE)
+_CERCAS = re.compile(r"```(?:\s*json)?", re.IGNORECASE)
+_ESPACO = re.compile(r"[ \t\r\n]*")
+_NUMERO = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\d.])")
+# O que o modelo escreve como número e o JSON não aceita: zeros à esquerda, ".5", "5."
+_NUMERO_LIVRE = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_PALAVRA = re.compile(r"[^\W\d][\w$-]*")
+_TRECHO_STRING = {
+    '"': re.compile(r'[^"\\\x00-\x1f]+'),
+    "'": re.compile(r"[^'\\\x00-\x1f\"]+"),
+}
+_ESCAPES_CONTROLE = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_LITERAIS = {"true": "true", "false": "false", "null": "null"}
+_LITERAIS_PYTHON = {"True": "true", "False": "false", "None": "null"}
+_FECHA = {"{": "}", "[": "]"}
+
+# Estados de um contêiner aberto
+_CHAVE, _DOIS_PONTOS, _VALOR, _DEPOIS = range(4)
+
+
+def _escapar_controle(c: str) -> str:
+    return _ESCAPES_CONTROLE.get(c) or f"\\u{ord(c):04x}"
+
+
+def _normalizar_numero(bruto: str) -> str:
+    """01 -> 1, .5 -> 0.5, 5. -> 5.0"""
+    if "." in bruto or "e" in bruto.lower():
+        return json.dumps(float(bruto))
+    return str(int(bruto))
+
+
+class _Reparador:
+    """Uma passada sobre o texto a partir de um "{", emitindo JSON válido"""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.saida: list[str] = []
+        self.pilha: list[list] = []  # [abertura, estado]
+        self.reparos: dict = {}      # código -> None (dict mantém a ordem)
+        self.corte = 0               # tamanho de `saida` no último ponto seguro
+        self.fim = len(texto)        # posição logo após o objeto raiz
+
+    def _reparo(self, codigo: str) -> None:
+        self.reparos.setdefault(codigo)
+
+    def _abrir(self, c: str) -> None:
+        self.saida.append(c)
+        self.pilha.append([c, _CHAVE if c == "{" else _VALOR])
+        self.corte = len(self.saida)
+
+    def _fim_valor(self) -> None:
+        # Depois de um valor completo, cortar aqui mantém o JSON fechável
+        if self.pilha:
+            self.pilha[-1][1] = _DEPOIS
+        self.corte = len(self.saida)
+
+    def _string(self, i: int):
+        """Lê uma string a partir da aspa em i; devolve a posição seguinte ou None se truncada"""
+        texto, n = self.texto, len(self.texto)
+        aspa = texto[i]
+        if aspa == "'":
+            self._reparo("aspas_simples")
+        trecho = _TRECHO_STRING[aspa]
+        partes = ['"']
+        j = i + 1
+        while True:
+            m = trecho.match(texto, j)
+            if m:
+                partes.append(m.group())
+                j = m.end()
+            if j >= n:
+                return None
+            c = texto[j]
+            if c == aspa:
+                partes.append('"')
+                self.saida.append("".join(partes))
+                return j + 1
+            if c == "\\":
+                if j + 1 >= n:
+                    return None
+                seguinte = texto[j + 1]
+                if aspa == "'" and seguinte == "'":
+                    partes.append("'")
+                elif seguinte in '"\\/bfnrtu':
+                    partes.append("\\" + seguinte)
+                elif seguinte < " ":
+                    # Barra antes de um caractere de controle: a barra fica literal
+                    self._reparo("escape_invalido")
+                    partes.append("\\\\" + _escapar_controle(seguinte))
+                else:
+                    # Escape inválido em JSON (ex.: "\d"): mantém a barra literal
+                    self._reparo("escape_invalido")
+                    partes.append("\\\\" + seguinte)
+                j += 2
+            elif c == '"':
+                partes.append('\\"')
+                j += 1
+            else:
+                # Caractere de controle cru (quebra de linha, tab...), proibido em strings JSON
+                self._reparo("quebra_em_string")
+                partes.append(_escapar_controle(c))
+                j += 1
+
+    def _fechar(self, c: str) -> bool:
+        """Fecha até o contêiner correspondente; devolve True se o objeto raiz terminou"""
+        if not any(_FECHA[aberto] == c for aberto, _ in self.pilha):
+            self._reparo("caractere_invalido")
+            return False
+        while True:
+            aberto, estado = self.pilha[-1]
+            if aberto == "{" and estado in (_DOIS_PONTOS, _VALOR):
+                if estado == _DOIS_PONTOS:
+                    self.saida.append(":")
+                self._reparo("valor_ausente")
+                self.saida.append("null")
+            self.pilha.pop()
+            self.saida.append(_FECHA[aberto])
+            self._fim_valor()
+            if _FECHA[aberto] == c:
+                break
+            self._reparo("fechamento_trocado")
+        return not self.pilha
+
+    def executar(self, inicio: int) -> str:
+        texto, n = self.texto, len(self.texto)
+        virgula_pendente = False
+        self._abrir("{")
+        i = inicio + 1
+        while i < n:
+            i = _ESPACO.match(texto, i).end()
+            if i >= n:
+                break
+            c = texto[i]
+
+            # Comentários (//, /* */ e #) fora de strings
+            if c == "/" and texto.startswith(("//", "/*"), i) or c == "#":
+                self._reparo("comentarios")
+                if texto.startswith("/*", i):
+                    fim = texto.find("*/", i + 2)
+                    i = n if fim == -1 else fim + 2
+                else:
+                    fim = texto.find("\n", i)
+                    i = n if fim == -1 else fim + 1
+                continue
+
+            topo = self.pilha[-1]
+            objeto = topo[0] == "{"
+
+            if c in "}]":
+                if virgula_pendente:
+                    self._reparo("virgula_final")
+                    virgula_pendente = False
+                i += 1
+                if self._fechar(c):
+                    self.fim = i
+                    break
+                continue
+
+            if c == ",":
+                if topo[1] == _DEPOIS:
+                    virgula_pendente = True
+                    topo[1] = _CHAVE if objeto else _VALOR
+                else:
+                    self._reparo("virgula_extra")
+                i += 1
+                continue
+
+            if c == ":":
+                if objeto and topo[1] == _DOIS_PONTOS:
+                    self.saida.append(":")
+                    topo[1] = _VALOR
+                else:
+                    self._reparo("caractere_invalido")
+                i += 1
+                continue
+
+            # Daqui em diante começa uma chave ou um valor
+            if topo[1] == _DEPOIS:
+                self._reparo("virgula_ausente")
+                virgula_pendente = True
+                topo[1] = _CHAVE if objeto else _VALOR
+            if virgula_pendente:
+                self.saida.append(",")
+                virgula_pendente = False
+
+            if objeto and topo[1] == _CHAVE:
+                if c in "\"'":
+                    i = self._string(i)
+                    if i is None:
+                        break
+                    topo[1] = _DOIS_PONTOS
+                    continue
+                m = _PALAVRA.match(texto, i)
+                if m:
+                    self._reparo("chaves_sem_aspas")
+                    self.saida.append(json.dumps(m.group()))
+                    topo[1] = _DOIS_PONTOS
+                    i = m.end()
+                else:
+                    self._reparo("caractere_invalido")
+                    i += 1
+                continue
+
+            if objeto and topo[1] == _DOIS_PONTOS:
+                self._reparo("dois_pontos_ausentes")
+                self.saida.append(":")
+                topo[1] = _VALOR
+
+            if c in "{[":
+                self._abrir(c)
+                i += 1
+            elif c in "\"'":
+                i = self._string(i)
+                if i is None:
+                    break
+                self._fim_valor()
+            elif m := _NUMERO.match(texto, i):
+                self.saida.append(m.group())
+                i = m.end()
+                self._fim_valor()
+            elif m := _NUMERO_LIVRE.match(texto, i):
+                self._reparo("numero_invalido")
+                self.saida.append(_normalizar_numero(m.group()))
+                i = m.end()
+                self._fim_valor()
+            elif m := _PALAVRA.match(texto, i):
+                palavra = m.group()
+                if palavra in _LITERAIS:
+                    self.saida.append(palavra)
+                elif palavra in _LITERAIS_PYTHON:
+                    self._reparo("literais_python")
+                    self.saida.append(_LITERAIS_PYTHON[palavra])
+                else:
+                    self._reparo("texto_sem_aspas")
+                    self.saida.append(json.dumps(palavra))
+                i = m.end()
+                self._fim_valor()
+            else:
+                self._reparo("caractere_invalido")
+                i += 1
+
+        if self.pilha:
+            # Truncado: volta ao último valor completo e fecha o que ficou aberto
+            self._reparo("truncado")
+            del self.saida[self.corte:]
+            for aberto, _ in reversed(self.pilha):
+                self.saida.append(_FECHA[aberto])
+            self.pilha.clear()
+            self.fim = n
+        return "".join(self.saida)
+
+
+def _texto_ao_redor(texto: str, inicio: int, fim: int) -> bool:
+    """Há algo além de espaços e cercas markdown fora do trecho [inicio, fim)?"""
+    return bool(_CERCAS.sub("", texto[:inicio]).strip() or _CERCAS.sub("", texto[fim:]).strip())
+
+
+def extrair_json_com_reparos(texto: str) -> tuple[dict, list[str]]:
+    """Objeto JSON da resposta e a lista de códigos de reparo aplicados (ver REPAROS)
+
+    Tenta, em ordem, o objeto dentro do bloco ```json (se houver) e os objetos
+    seguintes no texto; vence o primeiro que carrega sem reparos, senão o
+    maior dos reparados.
+    """
+    if not texto:
+        raise ValueError("Texto vazio retornado pelo modelo")
+
+    cerca = _CERCA_JSON.search(texto)
+    inicio = texto.find("{", cerca.end() if cerca else 0)
+    if inicio == -1 and cerca:
+        inicio = texto.find("{")
+    if inicio == -1:
+        raise ValueError("JSON não encontrado na resposta")
+
+    melhor = None  # (tamanho, dados, reparos)
+    erro = None
+    for _ in range(MAX_CANDIDATOS):
+        # Caminho rápido: JSON válido a partir daqui (prosa depois é ignorada)
+        try:
+            dados, fim = _decodificador.raw_decode(texto, inicio)
+            if isinstance(dados, dict):
+                reparos = ["texto_ao_redor"] if _texto_ao_redor(texto, inicio, fim) else []
+                return dados, reparos
+        except json.JSONDecodeError:
+            pass
+
+        reparador = _Reparador(texto)
+        try:
+            dados = json.loads(reparador.executar(inicio))
+        except json.JSONDecodeError as e:
+            erro = e
+        else:
+            reparos = list(reparador.reparos)
+            if _texto_ao_redor(texto, inicio, reparador.fim):
+                reparos.insert(0, "texto_ao_redor")
+            tamanho = reparador.fim - inicio
+            if melhor is None or tamanho > melhor[0]:
+                melhor = (tamanho, dados, reparos)
+
+        inicio = texto.find("{", reparador.fim)
+        if inicio == -1:
+            break
+
+    if melhor is None:
+        raise ValueError(f"JSON inválido na resposta, mesmo após reparos: {erro}")
+    return melhor[1], melhor[2]
+
+
+def extrair_json(texto: str) -> dict:
+    """Extrai JSON de texto com múltiplas estratégias"""
+    return extrair_json_com_reparos(texto)[0]
+
+
+def descrever_reparos(reparos: list) -> str:
+    return ", ".join(REPAROS.get(codigo, codigo) for codigo in reparos)
@@ -0,0 +1,454 @@
+"""Geração do JSON do processo a partir da descrição, via LLM"""
+
+import json
+import logging
+from typing import Callable, Optional
+
+from .agendador import PRIORIDADE_INTERATIVA, Agendador, estimar_tokens
+from .cache import CacheRespostas, chave_cache
+from .clientes import RegistroClientes, hash_api_key, registro_padrao
+from .coalescencia import Coalescedor
+from .compacto import PROMPT_COMPACTO, expandir
+from .esquema import ESQUEMA_BPMN, VERSAO_ESQUEMA, validar_esquema
+from .extracao import descrever_reparos, extrair_json_com_reparos
+from .incremental import aplicar_patch, descrever_mudancas, diferenca_descricoes, patch_vazio
+from .rastreio import contar, etapa
+from .similaridade import IndiceSimilaridade
+from .streaming import ParserIncremental
+
+PROMPT_SYSTEM = """Você é um especialista em BPMN 2.0. Converta a descrição em JSON estruturado com foco em POOLS e LANES.
+
+ESTRUTURA OBRIGATÓRIA:
+{
+  "processo": "Nome do Processo",
+  "elementos": [
+    {"id": "StartEvent_1", "tipo": "startEvent", "nome": "Início", "papel": "Cliente"},
+    {"id": "Task_1", "tipo": "task", "nome": "Solicitar Pedido", "papel": "Cliente"},
+    {"id": "Task_2", "tipo": "userTask", "nome": "Aprovar Pedido", "papel": "Gerente"},
+    {"id": "EndEvent_1", "tipo": "endEvent", "nome": "Fim", "papel": "Cliente"}
+  ],
+  "fluxos": [
+    {"id": "Flow_1", "origem": "StartEvent_1", "destino": "Task_1"},
+    {"id": "Flow_2", "origem": "Task_1", "destino": "Task_2"}
+  ]
+}
+
+REGRAS:
+1. "papel" é OBRIGATÓRIO (Ex: Cliente, Sistema, Gerente, RH). Agrupe tarefas do mesmo ator.
+2. TIPOS PERMITIDOS: startEvent, endEvent, task, userTask, serviceTask, exclusiveGateway, parallelGateway.
+3. Se o papel não estiver claro, use "Sistema".
+RETORNE APENAS O JSON."""
+
+_FORMATO_PATCH = """Devolva APENAS as alterações necessárias no JSON, neste formato:
+{
+  "remover_elementos": ["Task_3"],
+  "adicionar_elementos": [
+    {"id": "Task_7", "tipo": "task", "nome": "Emitir Nota", "papel": "Financeiro"}
+  ],
+  "alterar_elementos": [
+    {"id": "Task_2", "nome": "Aprovar Pedido (Diretor)", "papel": "Diretor"}
+  ],
+  "remover_fluxos": ["Flow_4"],
+  "adicionar_fluxos": [
+    {"id": "Flow_9", "origem": "Task_2", "destino": "Task_7"}
+  ],
+  "alterar_fluxos": [
+    {"id": "Flow_5", "destino": "Task_7"}
+  ]
+}
+
+REGRAS:
+1. Mantenha os ids existentes. Ids novos não podem repetir ids atuais.
+2. Ao remover um elemento, religue o processo com fluxos novos ou alterados.
+3. Em "alterar_*", informe o "id" e só os campos que mudam.
+4. Omita as listas vazias. Se nada mudar no processo, retorne {}.
+5. TIPOS PERMITIDOS: startEvent, endEvent, task, userTask, serviceTask, exclusiveGateway, parallelGateway.
+RETORNE APENAS O JSON."""
+
+PROMPT_PATCH = (
+    "Você é um especialista em BPMN 2.0. Você receberá o JSON atual de um processo "
+    "e as mudanças feitas na descrição dele.\n" + _FORMATO_PATCH
+)
+
+PROMPT_REPARO = (
+    "Você é um especialista em BPMN 2.0. Você receberá o JSON de um processo e os erros "
+    "de validação encontrados nele. Corrija apenas esses erros, sem mudar o resto do processo.\n"
+    + _FORMATO_PATCH
+)
+
+# Pedidos de correção ao modelo antes de desistir de uma resposta fora do esquema
+MAX_REPAROS_ESQUEMA = 2
+
+# Reserva de tokens de saída usada pelo agendador antes de conhecer o consumo real
+TOKENS_SAIDA_ESTIMADOS = 1500
+TOKENS_SAIDA_COMPACTO = 400
+TOKENS_SAIDA_PATCH = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _uso(resultado) -> dict:
+    """usage_metadata do LangChain (input_tokens/output_tokens/total_tokens), se houver"""
+    return getattr(resultado, "usage_metadata", None) or {}
+
+
+def _contar_tokens(uso: dict) -> None:
+    if uso.get("input_tokens"):
+        contar("tokens", uso["input_tokens"], tipo="prompt")
+    if uso.get("output_tokens"):
+        contar("tokens", uso["output_tokens"], tipo="completion")
+
+
+def _mensagens(sistema: str, humano: str, injetado: bool = False) -> list:
+    """Mensagens de sistema e usuário; com um `llm` injetado (ex.: o stub), tuplas (papel, texto)"""
+    if injetado:
+        # Sem LangChain: o modo offline precisa rodar numa máquina sem ele
+        return [("system", sistema), ("human", humano)]
+    # LangChain só é importado quando alguém de fato pede uma geração
+    from langchain_core.messages import HumanMessage, SystemMessage
+    return [SystemMessage(content=sistema), HumanMessage(content=humano)]
+
+
+def _obter_llm(
+    llm,
+    api_key: Optional[str],
+    modelo: str,
+    temp: float,
+    registro: Optional[RegistroClientes],
+    esquema: Optional[dict] = None
+):
+    if llm is not None:
+        return llm
+    if not api_key:
+        raise ValueError("Configure a API Key!")
+    return (registro or registro_padrao()).obter(api_key, modelo, temp, esquema=esquema)
+
+
+def _extrair(texto: str) -> dict:
+    """JSON da resposta; defeitos reparados localmente são registrados em vez de pedir outra resposta"""
+    with etapa("extracao", caracteres=len(texto or "")) as span:
+        data, reparos = extrair_json_com_reparos(texto)
+        span.atributos["reparos"] = reparos
+    for codigo in reparos:
+        contar("reparos_json", codigo=codigo)
+    if reparos:
+        logger.warning("Resposta do modelo reparada: %s", descrever_reparos(reparos))
+    return data
+
+
+def _chamar_modelo(
+    llm,
+    messages: list,
+    api_key: Optional[str],
+    agendador: Optional[Agendador],
+    prioridade: int,
+    tokens_estimados: int,
+    ao_parcial: Optional[Callable[[dict], None]] = None
+) -> str:
+    """Texto completo da resposta, via invoke ou stream, passando pelo agendador se houver"""
+    # Ambos os modos devolvem (texto completo, usage_metadata)
+    def _invocar():
+        with etapa("modelo", modo="invoke"):
+            response = llm.invoke(messages)
+        return response.content, _uso(response)
+    
+    def _stream():
+        with etapa("modelo", modo="stream"):
+            return _consumir_stream()
+    
+    def _consumir_stream():
+        # Cada tentativa recomeça o parse do zero
+        parser = ParserIncremental()
+        parcial = {"processo": None, "elementos": [], "fluxos": []}
+        tokens = {}
+        previa_falhou = False
+        for chunk in llm.stream(messages):
+            tokens = _uso(chunk) or tokens
+            eventos = parser.feed(chunk.content or "")
+            for tipo, valor in eventos:
+                if tipo == "processo":
+                    parcial["processo"] = valor
+                elif tipo == "elemento":
+                    parcial["elementos"].append(valor)
+                else:
+                    parcial["fluxos"].append(valor)
+            if eventos:
+                try:
+                    ao_parcial(parcial)
+                except Exception:
+                    # A prévia é só visual: um elemento ainda incompleto não pode derrubar a geração
+                    if not previa_falhou:
+                        logger.warning("Falha na pré-visualização parcial, seguindo com a geração",
+                                       exc_info=True)
+                    previa_falhou = True
+        return parser.texto, tokens
+    
+    chamar = _invocar if ao_parcial is None else _stream
+    if agendador is None:
+        texto, uso = chamar()
+    else:
+        texto, uso = agendador.executar(
+            hash_api_key(api_key) if api_key else "local",
+            chamar,
+            tokens_estimados=tokens_estimados,
+            prioridade=prioridade,
+            tokens_reais=lambda resultado: resultado[1].get("total_tokens")
+        )
+    _contar_tokens(uso)
+    return texto
+
+
+def _consultar_cache(cache: Optional[CacheRespostas], chave: str, pedido: str) -> Optional[dict]:
+    """Consulta o cache contando o desfecho (acerto, falha ou desligado)"""
+    if cache is None:
+        contar("cache", pedido=pedido, resultado="desligado")
+        return None
+    em_cache = cache.get(chave)
+    contar("cache", pedido=pedido, resultado="falha" if em_cache is None else "acerto")
+    return em_cache
+
+
+def gerar_bpmn(
+    descricao: str,
+    modelo: str,
+    temp: float,
+    api_key: Optional[str] = None,
+    cache: Optional[CacheRespostas] = None,
+    registro: Optional[RegistroClientes] = None,
+    llm=None,
+    ao_parcial: Optional[Callable[[dict], None]] = None,
+    agendador: Optional[Agendador] = None,
+    prioridade: int = PRIORIDADE_INTERATIVA,
+    estruturado: bool = False,
+    coalescedor: Optional[Coalescedor] = None,
+    compacto: bool = False,
+    similares: Optional[IndiceSimilaridade] = None
+) -> dict:
+    """Gera BPMN usando Gemini via LangChain
+
+    `llm` permite injetar um modelo já construído (ex.: o stub offline); sem
+    ele o cliente vem do `registro`. Com `cache`, respostas repetidas não
+    chamam o modelo. Com `ao_parcial`, consome o stream de tokens e chama o
+    callback com o JSON parcial sempre que um elemento ou fluxo completo chega.
+    Com `agendador`, a chamada respeita os limites RPM/TPM da chave e é
+    repetida automaticamente em 429/5xx. Com `estruturado`, o modelo recebe
+    ESQUEMA_BPMN como esquema da saída; respostas fora dele geram um pedido
+    de correção só dos erros encontrados, não uma nova geração. Com
+    `coalescedor`, pedidos idênticos já em andamento (de outras sessões)
+    esperam por aquela chamada em vez de fazer a sua; só a primeira recebe
+    o streaming parcial. Com `compacto`, o modelo responde no formato de
+    compacto.py (bem menos tokens de saída), expandido aqui para o formato
+    de sempre; nesse modo não há esquema estruturado nem prévia parcial.
+    Com `similares`, uma descrição parecida com outra já gerada (mesmo
+    modelo, temperatura e formato), acima de `limiar_adaptacao`, reaproveita
+    aquele JSON: como está, se nenhuma frase mudou, ou adaptado por um patch
+    das frases que mudaram.
+    """
+    # A mesma descrição rende JSONs diferentes em cada modo: cada um tem sua chave
+    modo = "compacto" if compacto else f"estruturado:{VERSAO_ESQUEMA}" if estruturado else "texto"
+    chave = chave_cache(descricao, PROMPT_COMPACTO if compacto else PROMPT_SYSTEM, modelo, temp, modo)
+    em_cache = _consultar_cache(cache, chave, "bpmn")
+    if em_cache is not None:
+        return em_cache
+    
+    # Só se aproveita o que foi gerado nas mesmas condições
+    contexto = f"{modelo}|{temp}|{modo}"
+
+    def _gerar() -> dict:
+        data = None
+        if similares is not None:
+            data = _reaproveitar_parecido(
+                similares, contexto, descricao, modelo, temp, api_key, registro, llm, agendador, prioridade
+            )
+        if data is None:
+            if compacto:
+                data = _gerar_compacto(descricao, modelo, temp, api_key, registro, llm, agendador, prioridade)
+            else:
+                data = _gerar_sem_cache(
+                    descricao, modelo, temp, api_key, registro, llm, ao_parcial, agendador, prioridade, estruturado
+                )
+            if similares is not None:
+                similares.adicionar(descricao, data, contexto)
+        if cache is not None:
+            cache.set(chave, data)
+        return data
+    
+    if coalescedor is None:
+        return _gerar()
+    return coalescedor.executar(("bpmn", chave), _gerar)
+
+
+def _reaproveitar_parecido(
+    similares: IndiceSimilaridade,
+    contexto: str,
+    descricao: str,
+    modelo: str,
+    temp: float,
+    api_key: Optional[str],
+    registro: Optional[RegistroClientes],
+    llm,
+    agendador: Optional[Agendador],
+    prioridade: int
+) -> Optional[dict]:
+    """JSON de uma descrição parecida já gerada, como está ou adaptado; None se não houver
+
+    A similaridade só escolhe a candidata: um "não" ou um papel trocado mal
+    muda a assinatura e inverte o processo, então o JSON volta como está
+    apenas se nenhuma frase mudou; qualquer mudança passa pelo patch.
+    """
+    with etapa("similares"):
+        parecido = similares.buscar(descricao, contexto, similares.limiar_adaptacao)
+    if parecido is None:
+        contar("similares", resultado="falha")
+        return None
+    mudancas = descrever_mudancas(diferenca_descricoes(parecido.descricao, descricao))
+    if not mudancas:
+        contar("similares", resultado="reuso")
+        return parecido.dados
+
+    try:
+        patch = gerar_patch_bpmn(
+            mudancas, parecido.dados, modelo, temp, api_key,
+            registro=registro, llm=llm, agendador=agendador, prioridade=prioridade
+        )
+        data = aplicar_patch(parecido.dados, patch)
+    except ValueError as e:
+        logger.warning("Não deu para adaptar a descrição parecida (%.2f), gerando do zero: %s",
+                       parecido.similaridade, e)
+        contar("similares", resultado="falha")
+        return None
+    contar("similares", resultado="adaptado")
+    similares.adicionar(descricao, data, contexto)
+    return data
+
+
+def _gerar_sem_cache(
+    descricao: str,
+    modelo: str,
+    temp: float,
+    api_key: Optional[str],
+    registro: Optional[RegistroClientes],
+    llm,
+    ao_parcial: Optional[Callable[[dict], None]],
+    agendador: Optional[Agendador],
+    prioridade: int,
+    estruturado: bool
+) -> dict:
+    injetado = llm is not None
+    llm_texto = _obter_llm(llm, api_key, modelo, temp, registro)
+    if estruturado:
+        llm = _obter_llm(llm, api_key, modelo, temp, registro, esquema=ESQUEMA_BPMN)
+    else:
+        llm = llm_texto
+    messages = _mensagens(PROMPT_SYSTEM, f"Descrição: {descricao}", injetado)
+    texto = _chamar_modelo(
+        llm, messages, api_key, agendador, prioridade,
+        estimar_tokens(PROMPT_SYSTEM, descricao) + TOKENS_SAIDA_ESTIMADOS,
+        ao_parcial
+    )
+    
+    # No streaming, o texto completo continua sendo a fonte oficial do resultado
+    data = _extrair(texto)
+    if estruturado:
+        data = _corrigir_esquema(data, llm_texto, api_key, agendador, prioridade, injetado)
+    return data
+
+
+def _gerar_compacto(
+    descricao: str,
+    modelo: str,
+    temp: float,
+    api_key: Optional[str],
+    registro: Optional[RegistroClientes],
+    llm,
+    agendador: Optional[Agendador],
+    prioridade: int
+) -> dict:
+    messages = _mensagens(PROMPT_COMPACTO, f"Descrição: {descricao}", llm is not None)
+    texto = _chamar_modelo(
+        _obter_llm(llm, api_key, modelo, temp, registro), messages, api_key, agendador, prioridade,
+        estimar_tokens(PROMPT_COMPACTO, descricao) + TOKENS_SAIDA_COMPACTO
+    )
+    data = _extrair(texto)
+    # Se o modelo ignorar o formato e responder no verboso, expandir devolve como está
+    with etapa("expansao"):
+        return expandir(data)
+
+
+def _corrigir_esquema(
+    data: dict,
+    llm,
+    api_key: Optional[str],
+    agendador: Optional[Agendador],
+    prioridade: int,
+    injetado: bool = False
+) -> dict:
+    """Valida contra ESQUEMA_BPMN e pede ao modelo um patch só com a correção dos erros"""
+    for tentativa in range(MAX_REPAROS_ESQUEMA + 1):
+        erros = validar_esquema(data)
+        if not erros:
+            return data
+        # A raiz precisa ter o formato certo para um patch poder ser aplicado
+        if not isinstance(data, dict) or any(
+            not isinstance(data.get(campo) or [], list) for campo in ("elementos", "fluxos")
+        ):
+            break
+        if tentativa == MAX_REPAROS_ESQUEMA:
+            break
+        logger.warning("Resposta fora do esquema (%d erros), pedindo correção", len(erros))
+        contar("reparos_esquema")
+        atual = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        lista = "\n".join(f"- {erro}" for erro in erros)
+        entrada = f"JSON atual: {atual}\n\nErros de validação:\n{lista}"
+        messages = _mensagens(PROMPT_REPARO, entrada, injetado)
+        texto = _chamar_modelo(
+            llm, messages, api_key, agendador, prioridade,
+            estimar_tokens(PROMPT_REPARO, entrada) + TOKENS_SAIDA_PATCH
+        )
+        patch = _extrair(texto)
+        if patch_vazio(patch):
+            break
+        data = aplicar_patch(data, patch)
+    raise ValueError("Resposta fora do esquema: " + "; ".join(erros[:5]))
+
+
+def gerar_patch_bpmn(
+    mudancas: str,
+    anterior: dict,
+    modelo: str,
+    temp: float,
+    api_key: Optional[str] = None,
+    cache: Optional[CacheRespostas] = None,
+    registro: Optional[RegistroClientes] = None,
+    llm=None,
+    agendador: Optional[Agendador] = None,
+    prioridade: int = PRIORIDADE_INTERATIVA,
+    coalescedor: Optional[Coalescedor] = None
+) -> dict:
+    """Pede ao modelo só as alterações no JSON `anterior` causadas pelas `mudancas` na descrição
+
+    `mudancas` é o diff textual da descrição (ver incremental.descrever_mudancas).
+    O resultado segue o formato de PROMPT_PATCH e é aplicado com
+    incremental.aplicar_patch.
+    """
+    atual = json.dumps(anterior, ensure_ascii=False, separators=(",", ":"))
+    entrada = f"JSON atual: {atual}\n\nMudanças na descrição:\n{mudancas}"
+    chave = chave_cache(entrada, PROMPT_PATCH, modelo, temp)
+    em_cache = _consultar_cache(cache, chave, "patch")
+    if em_cache is not None:
+        return em_cache
+    
+    def _gerar() -> dict:
+        messages = _mensagens(PROMPT_PATCH, entrada, llm is not None)
+        texto = _chamar_modelo(
+            _obter_llm(llm, api_key, modelo, temp, registro), messages, api_key, agendador, prioridade,
+            estimar_tokens(PROMPT_PATCH, entrada) + TOKENS_SAIDA_PATCH
+        )
+        patch = _extrair(texto)
+        if cache is not None:
+            cache.set(chave, patch)
+        return patch
+    
+    if coalescedor is None:
+        return _gerar()
+    return coalescedor.executar(("patch", chave), _gerar)
@@ -0,0 +1,191 @@
+"""Regeneração incremental: diff da descrição, patch do JSON e reaproveitamento do diagrama
+
+Fluxo de refinamento:
+1. `diferenca_descricoes` compara a descrição nova com a anterior, frase a frase.
+2. Se a mudança for pequena, geracao.gerar_patch_bpmn pede ao modelo só as
+   alterações, que `aplicar_patch` aplica sobre o JSON anterior.
+3. `montar_diagrama` normaliza o JSON (validacao.py), refaz o layout preservando a ordem das células que não
+   mudaram e reaproveita as rotas cujos nós não se moveram.
+
+A cada patch, validação, camadas/ordenação do layout e XML são recalculados
+para o processo inteiro, não só para as raias afetadas: o patch pode mudar
+ligações que deslocam camadas em qualquer raia, e o custo é pequeno perto
+da chamada ao modelo (com o layout anterior: ~1 ms com 30 nós, ~3 ms com
+100, ~10 ms com 300, mais 1-6 ms do XML). O ganho vem de estabilidade: a
+ordem das células e as rotas que não mudaram são mantidas.
+"""
+
+import copy
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .conversao import json_to_bpmn_xml
+from .layout import Layout, calcular_layout, ordem_celulas
+from .modelo import ModeloProcesso
+from .rastreio import etapa
+from .renderizacao import renderizar_svg
+from .roteamento import rotear_fluxos
+from .validacao import normalizar_processo
+
+# Abaixo desta similaridade entre descrições, vale mais gerar tudo de novo
+LIMIAR_SIMILARIDADE = 0.5
+
+CHAVES_PATCH = (
+    "remover_elementos", "adicionar_elementos", "alterar_elementos",
+    "remover_fluxos", "adicionar_fluxos", "alterar_fluxos",
+)
+
+
+def dividir_frases(texto: str) -> list:
+    """Linhas e frases não vazias, com espaços normalizados"""
+    frases = []
+    for linha in texto.splitlines():
+        for frase in re.split(r"(?<=[.!?;])\s+", linha):
+            frase = " ".join(frase.split())
+            if frase:
+                frases.append(frase)
+    return frases
+
+
+def diferenca_descricoes(anterior: str, nova: str) -> dict:
+    """Frases removidas/adicionadas e a similaridade (0 a 1) entre as descrições"""
+    a, b = dividir_frases(anterior), dividir_frases(nova)
+    matcher = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+    removidas, adicionadas = [], []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op in ("replace", "delete"):
+            removidas.extend(a[i1:i2])
+        if op in ("replace", "insert"):
+            adicionadas.extend(b[j1:j2])
+    return {
+        "removidas": removidas,
+        "adicionadas": adicionadas,
+        "similaridade": matcher.ratio(),
+    }
+
+
+def descrever_mudancas(diferenca: dict) -> str:
+    """Diff em texto para o prompt de patch ("- " removida, "+ " adicionada)"""
+    linhas = [f"- {f}" for f in diferenca["removidas"]]
+    linhas += [f"+ {f}" for f in diferenca["adicionadas"]]
+    return "\n".join(linhas)
+
+
+def aplicar_patch(data: dict, patch: dict) -> dict:
+    """Novo JSON com as alterações do patch aplicadas (o original não é modificado)
+
+    Fluxos ligados a elementos removidos saem junto, a menos que o próprio
+    patch os altere para outro elemento. Itens "adicionados" com id já
+    existente são tratados como alteração.
+    """
+    if not isinstance(patch, dict):
+        raise ValueError("O patch deve ser um objeto JSON")
+    for chave in CHAVES_PATCH:
+        if not isinstance(patch.get(chave) or [], list):
+            raise ValueError(f'"{chave}" deve ser uma lista')
+    for chave in ("remover_elementos", "remover_fluxos"):
+        for iid in patch.get(chave) or []:
+            if not isinstance(iid, str):
+                raise ValueError(f'"{chave}" deve conter só ids (texto), veio {iid!r:.40}')
+    for chave in ("alterar_elementos", "alterar_fluxos"):
+        for item in patch.get(chave) or []:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                raise ValueError(f'"{chave}" deve conter objetos com "id" (texto), veio {item!r:.40}')
+
+    novo = copy.deepcopy(data)
+    elementos = {e.get("id"): e for e in novo.get("elementos") or []}
+    fluxos = {f.get("id"): f for f in novo.get("fluxos") or []}
+
+    def _aplicar(itens: dict, remover: list, adicionar: list, alterar: list):
+        for iid in remover:
+            itens.pop(iid, None)
+        for item in list(adicionar) + list(alterar):
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str) or not item["id"]:
+                continue
+            existente = itens.get(item["id"])
+            if existente is None:
+                itens[item["id"]] = dict(item)
+            else:
+                existente.update(item)
+
+    _aplicar(
+        elementos,
+        patch.get("remover_elementos") or [],
+        patch.get("adicionar_elementos") or [],
+        patch.get("alterar_elementos") or [],
+    )
+    _aplicar(
+        fluxos,
+        patch.get("remover_fluxos") or [],
+        patch.get("adicionar_fluxos") or [],
+        patch.get("alterar_fluxos") or [],
+    )
+
+    novo["elementos"] = list(elementos.values())
+    novo["fluxos"] = [
+        f for f in fluxos.values()
+        if f.get("origem") in elementos and f.get("destino") in elementos
+    ]
+    if patch.get("processo"):
+        novo["processo"] = patch["processo"]
+    return novo
+
+
+def patch_vazio(patch: dict) -> bool:
+    return not any(patch.get(chave) for chave in CHAVES_PATCH) and not patch.get("processo")
+
+
+@dataclass(slots=True)
+class Diagrama:
+    """JSON normalizado, modelo, layout e rotas de uma geração (guardado entre refinamentos)"""
+    data: dict
+    modelo: ModeloProcesso
+    layout: Layout
+    rotas: list
+    celulas_reaproveitadas: int = 0
+    rotas_reaproveitadas: int = 0
+    problemas: list = field(default_factory=list)  # validacao.Problema corrigidos no JSON
+
+    def xml(self, compacto: bool = False) -> str:
+        with etapa("xml", nos=len(self.modelo.nos)):
+            return json_to_bpmn_xml(self.modelo, compacto, self.layout, self.rotas)
+
+    def svg(self, largura_max: Optional[int] = None, rotulos: bool = True) -> str:
+        with etapa("svg", nos=len(self.modelo.nos)):
+            return renderizar_svg(self.modelo, self.layout, self.rotas, largura_max, rotulos)
+
+
+def montar_diagrama(data: dict, anterior: Optional[Diagrama] = None) -> Diagrama:
+    """Normaliza o JSON e calcula layout e rotas, reaproveitando o que não mudou em `anterior`"""
+    with etapa("validacao") as span:
+        data, problemas = normalizar_processo(data)
+        modelo = ModeloProcesso.from_dict(data)
+        span.atributos["problemas"] = len(problemas)
+    if anterior is None:
+        with etapa("layout", nos=len(modelo.nos)):
+            layout = calcular_layout(modelo)
+        with etapa("roteamento", fluxos=len(modelo.fluxos)):
+            rotas = rotear_fluxos(modelo, layout)
+        return Diagrama(data, modelo, layout, rotas, problemas=problemas)
+
+    ordem = ordem_celulas(anterior.modelo, anterior.layout)
+    with etapa("layout", nos=len(modelo.nos), incremental=True):
+        layout = calcular_layout(modelo, ordem_anterior=ordem)
+    rotas_anteriores = {
+        f.id: pontos for f, pontos in zip(anterior.modelo.fluxos, anterior.rotas) if pontos
+    }
+    with etapa("roteamento", fluxos=len(modelo.fluxos), incremental=True):
+        rotas = rotear_fluxos(modelo, layout, anteriores=rotas_anteriores)
+
+    celulas_atuais = ordem_celulas(modelo, layout)
+    return Diagrama(
+        data, modelo, layout, rotas,
+        celulas_reaproveitadas=sum(1 for chave, ids in celulas_atuais.items() if ordem.get(chave) == ids),
+        rotas_reaproveitadas=sum(
+            1 for f, pontos in zip(modelo.fluxos, rotas)
+            if pontos is not None and rotas_anteriores.get(f.id) == pontos
+        ),
+        problemas=problemas,
+    )
@@ -0,0 +1,337 @@
+"""Layout em camadas (BPMNDI) sobre o ModeloProcesso, em colunas indexadas por nó
+
+Etapas, todas em tempo ~linear no tamanho do grafo:
+1. Quebra de ciclos: DFS a partir dos eventos de início; arestas de retorno
+   (loops de retrabalho) saem do cálculo de níveis.
+2. Camadas: caminho mais longo sobre o DAG restante (eixo X).
+3. Ordenação: nós da mesma raia e camada são empilhados e ordenados pelo
+   baricentro dos vizinhos (varreduras para frente e para trás), reduzindo
+   cruzamentos dentro da raia.
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+from .modelo import SEM_NO, ModeloProcesso
+
+# Configurações
+LANE_HEIGHT = 200
+LANE_HEADER_WIDTH = 30
+START_X = 150  # Margem esquerda
+ITEM_WIDTH = 100
+ITEM_SPACING = 160
+SLOT_HEIGHT = 120  # Altura reservada por nó empilhado na mesma raia/camada
+
+VARREDURAS_BARICENTRO = 3
+
+
+def dimensoes(tipo: str) -> tuple[int, int]:
+    """Dimensões baseadas no tipo"""
+    if "Event" in tipo:
+        return 36, 36
+    if "Gateway" in tipo:
+        return 50, 50
+    return 100, 80
+
+
+@dataclass(slots=True)
+class Layout:
+    """Coordenadas por índice de nó (x/y/largura/altura) e geometria das raias"""
+    x: array
+    y: array
+    largura: array
+    altura: array
+    nivel: array
+    raia_y: list
+    raia_altura: list
+    largura_total: float
+    altura_total: float
+    fluxos_retorno: frozenset  # índices dos fluxos que fecham ciclos
+
+    def cy(self, i: int) -> float:
+        return self.y[i] + self.altura[i] / 2
+
+
+def _adjacencias(modelo: ModeloProcesso) -> list:
+    """Saídas por nó como pares (destino, índice do fluxo)"""
+    adj = [[] for _ in modelo.nos]
+    for fi, f in enumerate(modelo.fluxos):
+        if f.origem != SEM_NO and f.destino != SEM_NO:
+            adj[f.origem].append((f.destino, fi))
+    return adj
+
+
+def quebrar_ciclos(modelo: ModeloProcesso, adj: list) -> set:
+    """Conjunto de arcos de retorno (feedback arcs) encontrados por DFS iterativa
+
+    A busca começa pelos eventos de início e pelas fontes, então o arco
+    escolhido para fechar um loop é o que volta no sentido do processo
+    (ex.: "rejeitado -> reenviar -> enviar"), e não um arco do caminho feliz.
+    """
+    n = len(modelo.nos)
+    grau_entrada = [0] * n
+    for saidas in adj:
+        for v, _ in saidas:
+            grau_entrada[v] += 1
+
+    representantes = list(modelo.indice.values())
+    raizes = [i for i in representantes if modelo.nos[i].tipo == "startEvent"]
+    raizes += [i for i in representantes if grau_entrada[i] == 0]
+    raizes += representantes
+
+    cor = bytearray(n)  # 0 = não visitado, 1 = na pilha, 2 = concluído
+    retorno = set()
+    for raiz in raizes:
+        if cor[raiz]:
+            continue
+        cor[raiz] = 1
+        pilha = [(raiz, iter(adj[raiz]))]
+        while pilha:
+            u, filhos = pilha[-1]
+            for v, fi in filhos:
+                if cor[v] == 0:
+                    cor[v] = 1
+                    pilha.append((v, iter(adj[v])))
+                    break
+                if cor[v] == 1:
+                    retorno.add(fi)
+            else:
+                cor[u] = 2
+                pilha.pop()
+    return retorno
+
+
+def calcular_niveis(modelo: ModeloProcesso, adj: list, retorno: set) -> array:
+    """Camada de cada nó pelo caminho mais longo no DAG (sem os arcos de retorno)"""
+    n = len(modelo.nos)
+    grau_entrada = [0] * n
+    for saidas in adj:
+        for v, fi in saidas:
+            if fi not in retorno:
+                grau_entrada[v] += 1
+
+    niveis = array("i", bytes(4 * n))
+    fila = [i for i in modelo.indice.values() if grau_entrada[i] == 0]
+    while fila:
+        u = fila.pop()
+        for v, fi in adj[u]:
+            if fi in retorno:
+                continue
+            if niveis[u] + 1 > niveis[v]:
+                niveis[v] = niveis[u] + 1
+            grau_entrada[v] -= 1
+            if grau_entrada[v] == 0:
+                fila.append(v)
+
+    # Ids repetidos compartilham o nível da ocorrência indexada
+    for i, no in enumerate(modelo.nos):
+        niveis[i] = niveis[modelo.indice[no.id]]
+    return niveis
+
+
+def ordem_celulas(modelo: ModeloProcesso, layout: Layout) -> dict:
+    """Ordem vertical dos ids em cada célula: (papel normalizado, ids) -> ids de cima para baixo
+
+    A chave não usa o nível, então a ordem sobrevive a mudanças que só
+    deslocam a célula no eixo X (ex.: uma tarefa inserida antes dela).
+    """
+    celulas = {}
+    for i, no in enumerate(modelo.nos):
+        celulas.setdefault((no.raia, layout.nivel[i]), []).append(i)
+    ordem = {}
+    for (raia, _), membros in celulas.items():
+        membros.sort(key=lambda i: layout.y[i])
+        ids = tuple(modelo.nos[i].id for i in membros)
+        ordem[(modelo.raias[raia].nome.lower(), frozenset(ids))] = ids
+    return ordem
+
+
+def ordenar_celulas(
+    modelo: ModeloProcesso,
+    adj: list,
+    retorno: set,
+    niveis: array,
+    ordem_anterior: Optional[dict] = None
+) -> dict:
+    """Agrupa nós por (raia, nível) e ordena cada célula por baricentro
+
+    Com `ordem_anterior` (ver ordem_celulas), células com os mesmos nós de um
+    layout anterior mantêm a ordem dele e ficam de fora das varreduras.
+    """
+    n = len(modelo.nos)
+    celulas = {}
+    for i, no in enumerate(modelo.nos):
+        celulas.setdefault((no.raia, niveis[i]), []).append(i)
+
+    # Só há o que ordenar com duas ou mais formas na mesma célula
+    if all(len(c) == 1 for c in celulas.values()):
+        return celulas
+
+    fixas = set()
+    if ordem_anterior:
+        for chave, membros in celulas.items():
+            if len(membros) < 2:
+                continue
+            ids = frozenset(modelo.nos[i].id for i in membros)
+            anterior = ordem_anterior.get((modelo.raias[chave[0]].nome.lower(), ids))
+            if anterior is not None:
+                posicao_anterior = {eid: s for s, eid in enumerate(anterior)}
+                membros.sort(key=lambda i: posicao_anterior[modelo.nos[i].id])
+                fixas.add(chave)
+
+    antecessores = [[] for _ in range(n)]
+    sucessores = [[] for _ in range(n)]
+    for u, saidas in enumerate(adj):
+        for v, fi in saidas:
+            if fi not in retorno:
+                sucessores[u].append(v)
+                antecessores[v].append(u)
+
+    # Posição vertical global: raia + fração da célula
+    posicao = [0.0] * n
+    for (raia, _), membros in celulas.items():
+        for s, i in enumerate(membros):
+            posicao[i] = raia + (s + 0.5) / len(membros)
+
+    por_nivel = {}
+    for chave in celulas:
+        por_nivel.setdefault(chave[1], []).append(chave)
+    ordem_niveis = sorted(por_nivel)
+
+    for varredura in range(VARREDURAS_BARICENTRO):
+        para_frente = varredura % 2 == 0
+        vizinhos = antecessores if para_frente else sucessores
+        for nivel in (ordem_niveis if para_frente else reversed(ordem_niveis)):
+            for chave in por_nivel[nivel]:
+                membros = celulas[chave]
+                if len(membros) < 2 or chave in fixas:
+                    continue
+
+                def _baricentro(i):
+                    viz = vizinhos[i]
+                    if not viz:
+                        return posicao[i]
+                    return sum(posicao[v] for v in viz) / len(viz)
+
+                membros.sort(key=_baricentro)
+                for s, i in enumerate(membros):
+                    posicao[i] = chave[0] + (s + 0.5) / len(membros)
+    return celulas
+
+
+def calcular_layout(modelo: ModeloProcesso, ordem_anterior: Optional[dict] = None) -> Layout:
+    """Camadas no eixo X, raias por papel no eixo Y, nós empilhados sem sobreposição"""
+    n = len(modelo.nos)
+    adj = _adjacencias(modelo)
+    retorno = quebrar_ciclos(modelo, adj)
+    niveis = calcular_niveis(modelo, adj, retorno)
+    celulas = ordenar_celulas(modelo, adj, retorno, niveis, ordem_anterior)
+
+    # Altura de cada raia: cresce com a célula mais cheia
+    n_raias = len(modelo.raias)
+    pilha_max = [1] * n_raias
+    for (raia, _), membros in celulas.items():
+        if len(membros) > pilha_max[raia]:
+            pilha_max[raia] = len(membros)
+    raia_altura = [max(LANE_HEIGHT, k * SLOT_HEIGHT) for k in pilha_max]
+    raia_y = []
+    acumulado = 0
+    for altura in raia_altura:
+        raia_y.append(acumulado)
+        acumulado += altura
+
+    # Calcular coordenadas dos elementos
+    xs = array("d", bytes(8 * n))
+    ys = array("d", bytes(8 * n))
+    larguras = array("i", bytes(4 * n))
+    alturas = array("i", bytes(4 * n))
+    for (raia, nivel), membros in celulas.items():
+        faixa = raia_altura[raia] / len(membros)
+        for s, i in enumerate(membros):
+            largura, altura = dimensoes(modelo.nos[i].tipo)
+            # Posição X baseada no nível (sequência)
+            xs[i] = START_X + (nivel * ITEM_SPACING)
+            # Posição Y: centro da faixa do nó dentro da raia
+            ys[i] = raia_y[raia] + faixa * (s + 0.5) - altura / 2
+            larguras[i] = largura
+            alturas[i] = altura
+
+    max_level = max(niveis, default=0)
+    return Layout(
+        x=xs,
+        y=ys,
+        largura=larguras,
+        altura=alturas,
+        nivel=niveis,
+        raia_y=raia_y,
+        raia_altura=raia_altura,
+        largura_total=START_X + ((max_level + 1) * ITEM_SPACING) + 100,
+        altura_total=acumulado,
+        fluxos_retorno=frozenset(retorno),
+    )
+
+
+def _segmentos_cruzam(a, b, c, d) -> bool:
+    """Cruzamento próprio entre os segmentos ab e cd (extremidades comuns não contam)"""
+    def _orient(p, q, r):
+        v = (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+        return (v > 0) - (v < 0)
+
+    if a in (c, d) or b in (c, d):
+        return False
+    o1, o2 = _orient(a, b, c), _orient(a, b, d)
+    o3, o4 = _orient(c, d, a), _orient(c, d, b)
+    return o1 * o2 < 0 and o3 * o4 < 0
+
+
+def avaliar_layout(modelo: ModeloProcesso, layout: Layout, celula: float = 200.0) -> dict:
+    """Métricas de qualidade: sobreposições de formas, cruzamentos e arcos de retorno
+
+    Usa um hash espacial (grade de `celula` px), então o custo acompanha o
+    número de pares realmente próximos, não todos os pares.
+    """
+    def _celulas(x0, y0, x1, y1):
+        for gx in range(int(x0 // celula), int(x1 // celula) + 1):
+            for gy in range(int(y0 // celula), int(y1 // celula) + 1):
+                yield gx, gy
+
+    # Sobreposições entre formas
+    grade = {}
+    sobreposicoes = set()
+    for i in range(len(modelo.nos)):
+        x0, y0 = layout.x[i], layout.y[i]
+        x1, y1 = x0 + layout.largura[i], y0 + layout.altura[i]
+        for chave in _celulas(x0, y0, x1, y1):
+            for j in grade.get(chave, ()):
+                if (j, i) in sobreposicoes:
+                    continue
+                if x0 < layout.x[j] + layout.largura[j] and layout.x[j] < x1 \
+                        and y0 < layout.y[j] + layout.altura[j] and layout.y[j] < y1:
+                    sobreposicoes.add((j, i))
+            grade.setdefault(chave, []).append(i)
+
+    # Cruzamentos entre fluxos (segmento centro a centro)
+    grade = {}
+    cruzamentos = set()
+    for fi, f in enumerate(modelo.fluxos):
+        if f.origem == SEM_NO or f.destino == SEM_NO:
+            continue
+        a = (layout.x[f.origem] + layout.largura[f.origem] / 2, layout.cy(f.origem))
+        b = (layout.x[f.destino] + layout.largura[f.destino] / 2, layout.cy(f.destino))
+        for chave in _celulas(min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1])):
+            for fj, c, d in grade.get(chave, ()):
+                if (fj, fi) not in cruzamentos and _segmentos_cruzam(a, b, c, d):
+                    cruzamentos.add((fj, fi))
+            grade.setdefault(chave, []).append((fi, a, b))
+
+    return {
+        "nos": len(modelo.nos),
+        "fluxos": len(modelo.fluxos),
+        "sobreposicoes": len(sobreposicoes),
+        "cruzamentos": len(cruzamentos),
+        "arcos_retorno": len(layout.fluxos_retorno),
+        "niveis": (max(layout.nivel) + 1) if len(layout.nivel) else 0,
+        "largura": layout.largura_total,
+        "altura": layout.altura_total,
+    }
@@ -0,0 +1,120 @@
+"""Modelo de processo tipado e compacto usado por layout, validação e exportadores"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+# Índice usado em Fluxo.origem/destino quando o id referenciado não existe
+SEM_NO = -1
+
+
+@dataclass(slots=True)
+class No:
+    """Elemento de fluxo (evento, tarefa ou gateway)"""
+    id: str
+    tipo: str
+    nome: Optional[str]
+    raia: int
+
+
+@dataclass(slots=True)
+class Fluxo:
+    """Sequence flow; origem/destino são índices em ModeloProcesso.nos"""
+    id: str
+    origem_id: str
+    destino_id: str
+    origem: int = SEM_NO
+    destino: int = SEM_NO
+    nome: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Raia:
+    """Lane: nome exibido e índices dos nós que pertencem a ela"""
+    nome: str
+    membros: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ModeloProcesso:
+    processo: str
+    nos: list
+    fluxos: list
+    raias: list
+    indice: dict  # id -> índice do nó (última ocorrência, se repetido)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ModeloProcesso":
+        """Converte o JSON do modelo (processo/elementos/fluxos) sem modificá-lo"""
+        if not isinstance(data, dict):
+            raise ValueError("O JSON do processo deve ser um objeto")
+        elementos = data.get("elementos") or []
+        fluxos = data.get("fluxos") or []
+        if not isinstance(elementos, list) or not isinstance(fluxos, list):
+            raise ValueError('"elementos" e "fluxos" devem ser listas')
+
+        nos = []
+        raias = []
+        raia_por_chave = {}  # papel normalizado -> índice da raia
+        indice = {}
+
+        for i, elem in enumerate(elementos):
+            papel = (elem.get("papel") or "Geral").strip()
+            chave = papel.lower()
+            r = raia_por_chave.get(chave)
+            if r is None:
+                r = raia_por_chave[chave] = len(raias)
+                raias.append(Raia(sys.intern(papel)))
+            raias[r].membros.append(i)
+
+            eid = elem.get("id")
+            nos.append(No(eid, sys.intern(elem.get("tipo") or "task"), elem.get("nome"), r))
+            indice[eid] = i
+
+        # Se não houver papéis, cria um padrão
+        if not raias:
+            raias.append(Raia("Processo Principal"))
+
+        lista_fluxos = []
+        for f in fluxos:
+            origem_id, destino_id = f.get("origem"), f.get("destino")
+            lista_fluxos.append(Fluxo(
+                f.get("id"),
+                origem_id,
+                destino_id,
+                indice.get(origem_id, SEM_NO),
+                indice.get(destino_id, SEM_NO),
+                f.get("nome"),
+            ))
+
+        return cls(data.get("processo", "Processo de Negócio"), nos, lista_fluxos, raias, indice)
+
+    def to_dict(self) -> dict:
+        """Volta ao formato JSON usado pelo prompt e pelos downloads"""
+        elementos = []
+        for no in self.nos:
+            elem = {"id": no.id, "tipo": no.tipo}
+            if no.nome is not None:
+                elem["nome"] = no.nome
+            elem["papel"] = self.raias[no.raia].nome
+            elementos.append(elem)
+        fluxos = []
+        for f in self.fluxos:
+            fluxo = {"id": f.id, "origem": f.origem_id, "destino": f.destino_id}
+            if f.nome is not None:
+                fluxo["nome"] = f.nome
+            fluxos.append(fluxo)
+        return {"processo": self.processo, "elementos": elementos, "fluxos": fluxos}
+
+    def saidas(self) -> list:
+        """Lista de adjacência por índice de nó (destinos dos fluxos válidos)"""
+        adj = [[] for _ in self.nos]
+        for f in self.fluxos:
+            if f.origem != SEM_NO and f.destino != SEM_NO:
+                adj[f.origem].append(f.destino)
+        return adj
+
+
+def como_modelo(data: Union[dict, ModeloProcesso]) -> ModeloProcesso:
+    """Aceita tanto o JSON cru quanto um modelo já construído"""
+    return data if isinstance(data, ModeloProcesso) else ModeloProcesso.from_dict(data)
@@ -0,0 +1,217 @@
+"""Rastreio do pipeline: spans por etapa, contadores e exportação (Prometheus e logs JSON)
+
+Cada etapa roda dentro de `etapa("nome")`, que mede a duração, alimenta o
+histograma da etapa em `Metricas` e, com o logger "gerador_bpmn.rastreio"
+habilitado em INFO, escreve uma linha JSON por span. Spans abertos dentro
+de `rastreio()` compartilham o mesmo trace_id e ficam disponíveis no
+objeto `Rastro`, para mostrar o detalhamento de uma requisição.
+
+As durações ficam numa janela deslizante por etapa (p50/p95/p99 sobre as
+últimas JANELA observações); contagem e soma são acumuladas desde o início.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+JANELA = 2048
+QUANTIS = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger("gerador_bpmn.rastreio")
+
+
+def percentil(ordenados: list, q: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+class Metricas:
+    """Histogramas de duração por etapa e contadores com rótulos; seguro entre threads"""
+
+    def __init__(self, janela: int = JANELA):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._duracoes: dict = {}   # etapa -> deque de segundos
+        self._totais: dict = {}     # etapa -> [contagem, soma]
+        self._contadores: dict = {}  # (nome, rótulos ordenados) -> valor
+
+    def observar(self, etapa: str, segundos: float) -> None:
+        with self._lock:
+            janela = self._duracoes.get(etapa)
+            if janela is None:
+                janela = self._duracoes[etapa] = deque(maxlen=self.janela)
+                self._totais[etapa] = [0, 0.0]
+            janela.append(segundos)
+            totais = self._totais[etapa]
+            totais[0] += 1
+            totais[1] += segundos
+
+    def contar(self, nome: str, valor: float = 1, **rotulos) -> None:
+        chave = (nome, tuple(sorted((k, str(v)) for k, v in rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._duracoes.clear()
+            self._totais.clear()
+            self._contadores.clear()
+
+    def resumo(self) -> dict:
+        """{"etapas": {etapa: contagem, soma e quantis em s}, "contadores": {"nome{rótulos}": valor}}"""
+        with self._lock:
+            janelas = {etapa: sorted(d) for etapa, d in self._duracoes.items()}
+            totais = {etapa: tuple(t) for etapa, t in self._totais.items()}
+            contadores = dict(self._contadores)
+        etapas = {}
+        for etapa, ordenados in sorted(janelas.items()):
+            contagem, soma = totais[etapa]
+            etapas[etapa] = {
+                "contagem": contagem,
+                "soma_s": round(soma, 6),
+                **{f"p{int(q * 100)}_s": round(percentil(ordenados, q), 6) for q in QUANTIS},
+            }
+        return {
+            "etapas": etapas,
+            "contadores": {_nome_com_rotulos(n, r): v for (n, r), v in sorted(contadores.items())},
+        }
+
+    def prometheus(self, prefixo: str = "gerador_bpmn") -> str:
+        """Formato texto do Prometheus: summary por etapa e counters *_total"""
+        with self._lock:
+            janelas = {etapa: sorted(d) for etapa, d in self._duracoes.items()}
+            totais = {etapa: tuple(t) for etapa, t in self._totais.items()}
+            contadores = dict(self._contadores)
+
+        linhas = []
+        if janelas:
+            nome = f"{prefixo}_etapa_segundos"
+            linhas += [f"# HELP {nome} Duração das etapas do pipeline", f"# TYPE {nome} summary"]
+            for etapa, ordenados in sorted(janelas.items()):
+                rotulo = f'etapa="{_escapar(etapa)}"'
+                for q in QUANTIS:
+                    linhas.append(f'{nome}{{{rotulo},quantile="{q}"}} {percentil(ordenados, q):.6f}')
+                contagem, soma = totais[etapa]
+                linhas.append(f"{nome}_sum{{{rotulo}}} {soma:.6f}")
+                linhas.append(f"{nome}_count{{{rotulo}}} {contagem}")
+
+        por_nome: dict = {}
+        for (n, r), v in contadores.items():
+            por_nome.setdefault(n, []).append((r, v))
+        for n, series in sorted(por_nome.items()):
+            nome = f"{prefixo}_{n}_total"
+            linhas.append(f"# TYPE {nome} counter")
+            for r, v in sorted(series):
+                rotulos = ",".join(f'{k}="{_escapar(val)}"' for k, val in r)
+                linhas.append(f"{nome}{{{rotulos}}} {v:g}" if rotulos else f"{nome} {v:g}")
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _nome_com_rotulos(nome: str, rotulos: tuple) -> str:
+    if not rotulos:
+        return nome
+    return nome + "{" + ",".join(f"{k}={v}" for k, v in rotulos) + "}"
+
+
+_metricas_padrao = Metricas()
+
+
+def metricas_padrao() -> Metricas:
+    """Registro global do processo (o mesmo para UI, CLI e serviço)"""
+    return _metricas_padrao
+
+
+@dataclass(slots=True)
+class Span:
+    nome: str
+    inicio: float
+    duracao: float = 0.0
+    pai: Optional[str] = None
+    atributos: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class Rastro:
+    """Spans de uma requisição, na ordem em que terminaram"""
+    trace_id: str
+    spans: list = field(default_factory=list)
+
+    def duracoes(self) -> dict:
+        """Tempo total por etapa neste rastro (etapas repetidas somam)"""
+        total = {}
+        for span in self.spans:
+            total[span.nome] = total.get(span.nome, 0.0) + span.duracao
+        return total
+
+
+_rastro_atual: contextvars.ContextVar = contextvars.ContextVar("rastro_atual", default=None)
+_span_atual: contextvars.ContextVar = contextvars.ContextVar("span_atual", default=None)
+
+
+@contextmanager
+def rastreio(trace_id: Optional[str] = None):
+    """Agrupa os spans abertos dentro do bloco (inclusive em asyncio.to_thread) num Rastro"""
+    rastro = Rastro(trace_id or os.urandom(16).hex())
+    token = _rastro_atual.set(rastro)
+    try:
+        yield rastro
+    finally:
+        _rastro_atual.reset(token)
+
+
+@contextmanager
+def etapa(nome: str, metricas: Optional[Metricas] = None, **atributos):
+    """Mede o bloco como uma etapa; atributos extras podem ser adicionados ao span durante o bloco"""
+    span = Span(nome, time.perf_counter(), pai=_span_atual.get(), atributos=atributos)
+    token = _span_atual.set(nome)
+    erro = None
+    try:
+        yield span
+    except BaseException as e:
+        erro = type(e).__name__
+        raise
+    finally:
+        _span_atual.reset(token)
+        span.duracao = time.perf_counter() - span.inicio
+        (metricas or _metricas_padrao).observar(nome, span.duracao)
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.spans.append(span)
+        if erro is not None:
+            (metricas or _metricas_padrao).contar("erros_etapa", etapa=nome, tipo=erro)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "trace_id": rastro.trace_id if rastro is not None else None,
+                "span": nome,
+                "pai": span.pai,
+                "duracao_ms": round(span.duracao * 1000, 3),
+                "erro": erro,
+                **span.atributos,
+            }, ensure_ascii=False, default=str))
+
+
+def contar(nome: str, valor: float = 1, **rotulos) -> None:
+    """Incrementa um contador do registro global"""
+    _metricas_padrao.contar(nome, valor, **rotulos)
+
+
+def configurar_log_json(nivel: int = logging.INFO, destino=None) -> logging.Handler:
+    """Liga os logs de span em JSON (uma linha por span) no stderr ou em `destino`"""
+    handler = logging.StreamHandler(destino)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(nivel)
+    logger.propagate = False
+    return handler
@@ -0,0 +1,265 @@
+"""Renderização do diagrama em SVG (e PNG, opcional) sem navegador
+
+Desenha as mesmas formas e waypoints que vão para o BPMNDI: a partir do
+modelo com layout e rotas já calculados (`renderizar_svg`, o caminho
+rápido, sem XML no meio) ou a partir de um XML BPMN qualquer com DI
+(`svg_de_xml`). O SVG é montado como texto, numa passada pelas formas e
+arestas; o PNG depende do pacote opcional cairosvg.
+"""
+
+from typing import Optional, Union
+
+from .conversao import escapar_texto
+from .layout import LANE_HEADER_WIDTH, Layout, calcular_layout
+from .modelo import ModeloProcesso, como_modelo
+from .roteamento import rotear_fluxos
+
+MARGEM = 10
+FONTE = 12
+FONTE_RAIA = 13
+LARGURA_CARACTERE = 0.55  # em "em": média para fontes sans-serif
+MAX_LINHAS = 4
+
+COR_TRACO = "#222"
+COR_FUNDO = "#fff"
+COR_RAIA = "#fafafa"
+
+_NS_MODELO = "{http://www.omg.org/spec/BPMN/20100524/MODEL}"
+_NS_DI = "{http://www.omg.org/spec/BPMN/20100524/DI}"
+_NS_DC = "{http://www.omg.org/spec/DD/20100524/DC}"
+_NS_DDI = "{http://www.omg.org/spec/DD/20100524/DI}"
+
+_ESTILO = (
+    f"<style>text{{font-family:Arial,Helvetica,sans-serif;font-size:{FONTE}px;fill:{COR_TRACO}}}"
+    f".r{{font-size:{FONTE_RAIA}px;font-weight:bold}}"
+    f".f{{fill:none;stroke:{COR_TRACO};stroke-width:1.5;marker-end:url(#seta)}}"
+    f".s{{fill:{COR_FUNDO};stroke:{COR_TRACO};stroke-width:2}}"
+    f".l{{fill:{COR_RAIA};stroke:{COR_TRACO};stroke-width:1}}</style>"
+    '<defs><marker id="seta" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" '
+    f'orient="auto"><path d="M0,0L10,5L0,10z" fill="{COR_TRACO}"/></marker></defs>'
+)
+
+
+def _n(v: float) -> str:
+    """Número curto para o SVG (inteiro quando possível)"""
+    return str(int(v)) if v == int(v) else f"{v:.1f}"
+
+
+def quebrar_texto(texto: str, largura: float, fonte: int = FONTE, max_linhas: int = MAX_LINHAS) -> list:
+    """Quebra em palavras para caber em `largura` px (estimativa pela largura média do caractere)"""
+    cabem = max(1, int(largura / (fonte * LARGURA_CARACTERE)))
+    linhas, atual = [], ""
+    for palavra in texto.split():
+        candidata = f"{atual} {palavra}" if atual else palavra
+        if len(candidata) <= cabem or not atual:
+            atual = candidata
+        else:
+            linhas.append(atual)
+            atual = palavra
+    if atual:
+        linhas.append(atual)
+    if len(linhas) > max_linhas:
+        linhas = linhas[:max_linhas]
+        linhas[-1] = linhas[-1][:max(1, cabem - 1)] + "…"
+    return [l if len(l) <= cabem else l[:max(1, cabem - 1)] + "…" for l in linhas]
+
+
+def _texto(partes: list, linhas: list, cx: float, cy: float, classe: str = "") -> None:
+    """Bloco de linhas centralizado verticalmente em (cx, cy)"""
+    if not linhas:
+        return
+    atributo = f' class="{classe}"' if classe else ""
+    y0 = cy - (len(linhas) - 1) * FONTE * 0.6 + FONTE * 0.35
+    for k, linha in enumerate(linhas):
+        partes.append(
+            f'<text x="{_n(cx)}" y="{_n(y0 + k * FONTE * 1.2)}" text-anchor="middle"{atributo}>'
+            f"{escapar_texto(linha)}</text>"
+        )
+
+
+def _forma(partes: list, tipo: str, nome: Optional[str], x: float, y: float,
+           w: float, h: float, rotulos: bool) -> None:
+    cx, cy = x + w / 2, y + h / 2
+    if tipo in ("startEvent", "endEvent"):
+        r = min(w, h) / 2
+        espessura = 4 if tipo == "endEvent" else 2
+        partes.append(f'<circle class="s" cx="{_n(cx)}" cy="{_n(cy)}" r="{_n(r)}" style="stroke-width:{espessura}"/>')
+        if rotulos and nome:
+            _texto(partes, quebrar_texto(nome, 90, max_linhas=2), cx, y + h + FONTE + 2)
+    elif tipo.endswith("Gateway"):
+        partes.append(
+            f'<path class="s" d="M{_n(cx)},{_n(y)}L{_n(x + w)},{_n(cy)}L{_n(cx)},{_n(y + h)}L{_n(x)},{_n(cy)}z"/>'
+        )
+        d = min(w, h) / 5
+        if tipo == "parallelGateway":
+            marca = f"M{_n(cx)},{_n(cy - d)}V{_n(cy + d)}M{_n(cx - d)},{_n(cy)}H{_n(cx + d)}"
+        else:
+            marca = f"M{_n(cx - d)},{_n(cy - d)}L{_n(cx + d)},{_n(cy + d)}M{_n(cx + d)},{_n(cy - d)}L{_n(cx - d)},{_n(cy + d)}"
+        partes.append(f'<path d="{marca}" stroke="{COR_TRACO}" stroke-width="4"/>')
+        if rotulos and nome:
+            _texto(partes, quebrar_texto(nome, 120, max_linhas=2), cx, y + h + FONTE + 2)
+    else:
+        partes.append(
+            f'<rect class="s" x="{_n(x)}" y="{_n(y)}" width="{_n(w)}" height="{_n(h)}" rx="10"/>'
+        )
+        # Marcadores simples de tarefa de usuário (pessoa) e de serviço (engrenagem)
+        if tipo == "userTask":
+            partes.append(
+                f'<path d="M{_n(x + 8)},{_n(y + 22)}a7,7 0 0 1 14,0z" fill="none" stroke="{COR_TRACO}"/>'
+                f'<circle cx="{_n(x + 15)}" cy="{_n(y + 11)}" r="4" fill="none" stroke="{COR_TRACO}"/>'
+            )
+        elif tipo == "serviceTask":
+            partes.append(
+                f'<circle cx="{_n(x + 15)}" cy="{_n(y + 15)}" r="6" fill="none" stroke="{COR_TRACO}" '
+                'stroke-width="3" stroke-dasharray="2.5,1.5"/>'
+            )
+        if rotulos and nome:
+            _texto(partes, quebrar_texto(nome, w - 10), cx, cy)
+
+
+def _montar_svg(processo: str, pool: Optional[tuple], raias: list, formas: list, arestas: list,
+                largura_max: Optional[int], rotulos: bool) -> str:
+    """SVG a partir de geometria neutra
+
+    pool: (x, y, w, h); raias: (nome, x, y, w, h); formas: (tipo, nome, x, y, w, h);
+    arestas: (nome, pontos).
+    """
+    caixas = [f[2:] for f in formas] + [r[1:] for r in raias]
+    if pool:
+        caixas.append(pool)
+    x0 = min((c[0] for c in caixas), default=0)
+    y0 = min((c[1] for c in caixas), default=0)
+    x1 = max((c[0] + c[2] for c in caixas), default=0)
+    y1 = max((c[1] + c[3] for c in caixas), default=0)
+    for _, pontos in arestas:
+        for px, py in pontos:
+            x0, y0, x1, y1 = min(x0, px), min(y0, py), max(x1, px), max(y1, py)
+    # Rótulos de eventos/gateways ficam abaixo das formas
+    y1 += 2 * FONTE + 4 if rotulos else 0
+    x0, y0, x1, y1 = x0 - MARGEM, y0 - MARGEM, x1 + MARGEM, y1 + MARGEM
+    largura, altura = x1 - x0, y1 - y0
+
+    escala = min(1.0, largura_max / largura) if largura_max and largura > 0 else 1.0
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_n(round(largura * escala))}" '
+        f'height="{_n(round(altura * escala))}" viewBox="{_n(x0)} {_n(y0)} {_n(largura)} {_n(altura)}">',
+        f"<title>{escapar_texto(processo)}</title>",
+        _ESTILO,
+        f'<rect x="{_n(x0)}" y="{_n(y0)}" width="{_n(largura)}" height="{_n(altura)}" fill="{COR_FUNDO}"/>',
+    ]
+
+    if pool:
+        px, py, pw, ph = pool
+        partes.append(f'<rect class="l" x="{_n(px)}" y="{_n(py)}" width="{_n(pw)}" height="{_n(ph)}"/>')
+        if rotulos:
+            cx, cy = px + LANE_HEADER_WIDTH / 2, py + ph / 2
+            partes.append(
+                f'<text class="r" x="{_n(cx)}" y="{_n(cy)}" text-anchor="middle" dominant-baseline="middle" '
+                f'transform="rotate(-90 {_n(cx)} {_n(cy)})">{escapar_texto(processo)}</text>'
+            )
+    for nome, rx, ry, rw, rh in raias:
+        partes.append(f'<rect class="l" x="{_n(rx)}" y="{_n(ry)}" width="{_n(rw)}" height="{_n(rh)}"/>')
+        if rotulos and nome:
+            cx, cy = rx + LANE_HEADER_WIDTH / 2, ry + rh / 2
+            linha = quebrar_texto(nome, rh - 10, FONTE_RAIA, 1)[0]
+            partes.append(
+                f'<text class="r" x="{_n(cx)}" y="{_n(cy)}" text-anchor="middle" dominant-baseline="middle" '
+                f'transform="rotate(-90 {_n(cx)} {_n(cy)})">{escapar_texto(linha)}</text>'
+            )
+
+    for nome, pontos in arestas:
+        if len(pontos) < 2:
+            continue
+        caminho = "M" + "L".join(f"{_n(px)},{_n(py)}" for px, py in pontos)
+        partes.append(f'<path class="f" d="{caminho}"/>')
+        if rotulos and nome:
+            (ax, ay), (bx, by) = pontos[0], pontos[1]
+            _texto(partes, [quebrar_texto(nome, 100, max_linhas=1)[0]], (ax + bx) / 2 + 4, (ay + by) / 2 - FONTE)
+
+    for tipo, nome, fx, fy, fw, fh in formas:
+        _forma(partes, tipo, nome, fx, fy, fw, fh, rotulos)
+
+    partes.append("</svg>")
+    return "".join(partes)
+
+
+def renderizar_svg(
+    data: Union[dict, ModeloProcesso],
+    layout: Optional[Layout] = None,
+    rotas: Optional[list] = None,
+    largura_max: Optional[int] = None,
+    rotulos: bool = True
+) -> str:
+    """SVG do diagrama, reaproveitando layout e rotas quando já calculados
+
+    `largura_max` reduz o tamanho de exibição (miniaturas) sem mudar o
+    viewBox; `rotulos=False` omite os textos, o que deixa miniaturas
+    menores e mais rápidas.
+    """
+    modelo = como_modelo(data)
+    if layout is None:
+        layout = calcular_layout(modelo)
+    if rotas is None:
+        rotas = rotear_fluxos(modelo, layout)
+
+    # Mesma geometria escrita no BPMNDI por conversao.iter_bpmn_xml
+    pool = (50, 0, int(layout.largura_total), int(layout.altura_total))
+    raias = [
+        (raia.nome, 50 + LANE_HEADER_WIDTH, int(layout.raia_y[i]),
+         int(layout.largura_total - LANE_HEADER_WIDTH), int(layout.raia_altura[i]))
+        for i, raia in enumerate(modelo.raias)
+    ]
+    formas = [
+        (no.tipo, no.nome, int(layout.x[i]), int(layout.y[i]), layout.largura[i], layout.altura[i])
+        for i, no in enumerate(modelo.nos)
+    ]
+    arestas = [(f.nome, pontos) for f, pontos in zip(modelo.fluxos, rotas) if pontos]
+    return _montar_svg(modelo.processo, pool, raias, formas, arestas, largura_max, rotulos)
+
+
+def svg_de_xml(xml: str, largura_max: Optional[int] = None, rotulos: bool = True) -> str:
+    """SVG a partir de um XML BPMN com DI (o de json_to_bpmn_xml ou de outra ferramenta)"""
+    # Só este caminho faz parse de XML: o ElementTree fica fora do import do módulo
+    import xml.etree.ElementTree as ET
+
+    raiz = ET.fromstring(xml.encode("utf-8") if isinstance(xml, str) else xml)
+
+    elementos = {}  # id -> (tipo, nome)
+    processo = "Processo"
+    for el in raiz.iter():
+        if not el.tag.startswith(_NS_MODELO) or "id" not in el.attrib:
+            continue
+        tipo = el.tag[len(_NS_MODELO):]
+        elementos[el.attrib["id"]] = (tipo, el.attrib.get("name"))
+        if tipo == "participant" and el.attrib.get("name"):
+            processo = el.attrib["name"]
+
+    pool = None
+    raias, formas, arestas = [], [], []
+    for forma in raiz.iter(f"{_NS_DI}BPMNShape"):
+        bounds = forma.find(f"{_NS_DC}Bounds")
+        if bounds is None:
+            continue
+        caixa = tuple(float(bounds.attrib.get(k, 0)) for k in ("x", "y", "width", "height"))
+        tipo, nome = elementos.get(forma.attrib.get("bpmnElement"), ("task", None))
+        if tipo == "participant":
+            pool = caixa
+        elif tipo == "lane":
+            raias.append((nome,) + caixa)
+        else:
+            formas.append((tipo, nome) + caixa)
+    for aresta in raiz.iter(f"{_NS_DI}BPMNEdge"):
+        pontos = [(float(p.attrib["x"]), float(p.attrib["y"])) for p in aresta.iter(f"{_NS_DDI}waypoint")]
+        _, nome = elementos.get(aresta.attrib.get("bpmnElement"), (None, None))
+        arestas.append((nome, pontos))
+    return _montar_svg(processo, pool, raias, formas, arestas, largura_max, rotulos)
+
+
+def svg_para_png(svg: str, escala: float = 1.0) -> bytes:
+    """PNG do SVG via cairosvg (dependência opcional: pip install cairosvg)"""
+    try:
+        import cairosvg
+    except (ImportError, OSError) as e:
+        # OSError: cairosvg instalado, mas sem a biblioteca nativa libcairo
+        raise RuntimeError("Exportar PNG requer o pacote cairosvg e a libcairo (pip install cairosvg)") from e
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"), scale=escala)
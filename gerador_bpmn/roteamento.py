@@ -0,0 +1,456 @@
+"""Roteamento ortogonal de fluxos (waypoints BPMNDI) com desvio de obstáculos
+
+Cada fluxo sai pela lateral direita da origem e entra pela esquerda do
+destino. Os candidatos são testados do mais barato para o mais caro (reto,
+em "Z" com um canal vertical, em "U" por um corredor horizontal) contra um
+índice de faixas com as caixas dos nós; o primeiro sem colisões vence. Canais
+usados por fluxos sem extremidade em comum são deslocados para não se
+sobreporem. Mover um nó re-roteia só os fluxos afetados.
+
+Cada consulta custa O(log n + formas próximas), independente do comprimento
+do segmento, então o roteamento completo fica em ~O(F log n).
+"""
+
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+from .layout import Layout
+from .modelo import SEM_NO, ModeloProcesso
+
+CELULA = 120.0      # Tamanho da célula da grade espacial (px)
+MARGEM = 6          # Folga exigida ao redor de nós que não são extremidades do fluxo
+CANAL = 20          # Distância entre a lateral do nó e o primeiro canal vertical
+AFASTAMENTO = 16    # Distância entre um corredor horizontal e as formas que ele contorna
+ESPACAMENTO = 8     # Deslocamento entre canais paralelos
+MAX_DESLOCAMENTOS = 6
+
+CUSTO_CURVA = 40
+CUSTO_COLISAO = 100_000
+CUSTO_CONFLITO = 500
+
+
+class IndiceFaixas:
+    """Caixas dos nós em faixas horizontais e verticais, ordenadas por início
+
+    Um segmento horizontal só consulta a(s) faixa(s) horizontal(is) em que está
+    e faz uma busca binária pelo trecho [x0, x1]; o vertical, o mesmo nas
+    faixas verticais. Segmentos longos não percorrem célula por célula.
+    """
+
+    def __init__(self, faixa: float = CELULA):
+        self.faixa = faixa
+        self._horizontais: dict = {}  # gy -> [(x0, x1, chave)]
+        self._verticais: dict = {}    # gx -> [(y0, y1, chave)]
+        self._caixas: dict = {}
+        self._maior = 0.0  # maior largura/altura já inserida
+
+    def _faixas(self, ini, fim):
+        return range(int(ini // self.faixa), int(fim // self.faixa) + 1)
+
+    def inserir(self, chave, caixa: tuple) -> None:
+        x0, y0, x1, y1 = caixa
+        self._caixas[chave] = caixa
+        self._maior = max(self._maior, x1 - x0, y1 - y0)
+        for gy in self._faixas(y0, y1):
+            insort(self._horizontais.setdefault(gy, []), (x0, x1, chave))
+        for gx in self._faixas(x0, x1):
+            insort(self._verticais.setdefault(gx, []), (y0, y1, chave))
+
+    def remover(self, chave) -> None:
+        x0, y0, x1, y1 = self._caixas.pop(chave)
+        for faixas, ini, fim, item in (
+            (self._horizontais, y0, y1, (x0, x1, chave)),
+            (self._verticais, x0, x1, (y0, y1, chave)),
+        ):
+            for g in self._faixas(ini, fim):
+                lista = faixas[g]
+                del lista[bisect_left(lista, item)]
+
+    def consultar(self, x0, y0, x1, y1) -> set:
+        """Chaves cujas caixas podem tocar o retângulo (fino) dado"""
+        if x1 - x0 >= y1 - y0:
+            faixas, ini, fim, a, b = self._horizontais, y0, y1, x0, x1
+        else:
+            faixas, ini, fim, a, b = self._verticais, x0, x1, y0, y1
+        encontrados = set()
+        for g in self._faixas(ini, fim):
+            lista = faixas.get(g)
+            if not lista:
+                continue
+            k = bisect_left(lista, (a - self._maior,))
+            while k < len(lista) and lista[k][0] <= b:
+                if lista[k][1] >= a:
+                    encontrados.add(lista[k][2])
+                k += 1
+        return encontrados
+
+    def caixa(self, chave) -> tuple:
+        return self._caixas[chave]
+
+
+class GradeEspacial:
+    """Grade hierárquica: chave -> caixas (x0, y0, x1, y1), consultada por retângulo
+
+    Cada caixa vai para o nível cuja célula (CELULA * 2^k) comporta seu maior
+    lado, ocupando no máximo 4 células; segmentos longos não custam mais que
+    curtos. A consulta visita as poucas células de cada nível em uso.
+    """
+
+    def __init__(self, celula: float = CELULA):
+        self.celula = celula
+        self._celulas: dict = {}  # (nível, gx, gy) -> chaves
+        self._caixas: dict = {}
+        self._niveis: dict = {}   # nível -> quantidade de caixas
+
+    def _nivel(self, x0, y0, x1, y1) -> int:
+        lado = max(x1 - x0, y1 - y0)
+        k = 0
+        while self.celula * (1 << k) < lado:
+            k += 1
+        return k
+
+    def _cobertura(self, k, x0, y0, x1, y1):
+        c = self.celula * (1 << k)
+        for gx in range(int(x0 // c), int(x1 // c) + 1):
+            for gy in range(int(y0 // c), int(y1 // c) + 1):
+                yield k, gx, gy
+
+    def inserir(self, chave, caixas: Iterable[tuple]) -> None:
+        caixas = list(caixas)
+        self._caixas[chave] = caixas
+        for caixa in caixas:
+            k = self._nivel(*caixa)
+            self._niveis[k] = self._niveis.get(k, 0) + 1
+            for cel in self._cobertura(k, *caixa):
+                self._celulas.setdefault(cel, set()).add(chave)
+
+    def remover(self, chave) -> None:
+        for caixa in self._caixas.pop(chave, ()):
+            k = self._nivel(*caixa)
+            self._niveis[k] -= 1
+            if not self._niveis[k]:
+                del self._niveis[k]
+            for cel in self._cobertura(k, *caixa):
+                membros = self._celulas.get(cel)
+                if membros is not None:
+                    membros.discard(chave)
+                    if not membros:
+                        del self._celulas[cel]
+
+    def consultar(self, x0, y0, x1, y1) -> set:
+        """Chaves com alguma caixa que toca o retângulo"""
+        candidatos = set()
+        for k in self._niveis:
+            for cel in self._cobertura(k, x0, y0, x1, y1):
+                membros = self._celulas.get(cel)
+                if membros:
+                    candidatos |= membros
+        return {
+            chave for chave in candidatos
+            if any(cx0 <= x1 and cx1 >= x0 and cy0 <= y1 and cy1 >= y0
+                   for cx0, cy0, cx1, cy1 in self._caixas[chave])
+        }
+
+    def caixas(self, chave) -> list:
+        return self._caixas.get(chave, [])
+
+
+def _segmentos(pontos: list):
+    return zip(pontos, pontos[1:])
+
+
+def _caixa_segmento(a, b) -> tuple:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1])
+
+
+def _custo_base(pontos: list) -> float:
+    """Comprimento (Manhattan) mais uma penalidade por curva"""
+    custo = CUSTO_CURVA * (len(pontos) - 2)
+    ax, ay = pontos[0]
+    for bx, by in pontos[1:]:
+        custo += abs(ax - bx) + abs(ay - by)
+        ax, ay = bx, by
+    return custo
+
+
+def _simplificar(pontos: list) -> list:
+    """Remove pontos repetidos e colineares"""
+    limpos = [pontos[0]]
+    for p in pontos[1:]:
+        if p != limpos[-1]:
+            limpos.append(p)
+    resultado = [limpos[0]]
+    for i in range(1, len(limpos) - 1):
+        a, b, c = resultado[-1], limpos[i], limpos[i + 1]
+        if (a[0] == b[0] == c[0]) or (a[1] == b[1] == c[1]):
+            continue
+        resultado.append(b)
+    if len(limpos) > 1:
+        resultado.append(limpos[-1])
+    return resultado
+
+
+class Roteador:
+    """Mantém as rotas de todos os fluxos e os índices espaciais para re-roteamento"""
+
+    def __init__(self, modelo: ModeloProcesso, layout: Layout, celula: float = CELULA):
+        self.modelo = modelo
+        self.layout = layout
+        self.nos = IndiceFaixas(celula)
+        self.arestas = None  # índice das rotas, montado no primeiro mover_no
+        self._celula = celula
+        self.rotas: list = [None] * len(modelo.fluxos)
+        self._canais_v: dict = {}  # x -> [(y0, y1, fi)]
+        self._canais_h: dict = {}  # y -> [(x0, x1, fi)]
+        self._incidentes = [[] for _ in modelo.nos]
+
+        for i in range(len(modelo.nos)):
+            self.nos.inserir(i, self._caixa_no(i))
+        for fi, f in enumerate(modelo.fluxos):
+            if f.origem != SEM_NO and f.destino != SEM_NO:
+                self._incidentes[f.origem].append(fi)
+                if f.destino != f.origem:
+                    self._incidentes[f.destino].append(fi)
+
+    def _caixa_no(self, i: int) -> tuple:
+        L = self.layout
+        return L.x[i], L.y[i], L.x[i] + L.largura[i], L.y[i] + L.altura[i]
+
+    # --- Geração de candidatos ---
+
+    def _extremos(self, fi: int) -> tuple:
+        """Caixas da origem e do destino, porta de saída (direita) e de entrada (esquerda)"""
+        f = self.modelo.fluxos[fi]
+        ox0, oy0, ox1, oy1 = caixa_o = self._caixa_no(f.origem)
+        dx0, dy0, dx1, dy1 = caixa_d = self._caixa_no(f.destino)
+        return caixa_o, caixa_d, (ox1, (oy0 + oy1) / 2), (dx0, (dy0 + dy1) / 2)
+
+    def _diretos(self, fi: int) -> list:
+        """Reto e em "Z" (só quando o destino está à direita da origem)"""
+        _, (dx0, dy0, dx1, dy1), (x1, y1), (x2, y2) = self._extremos(fi)
+        if x2 - x1 < 2 * CANAL:
+            return []
+        candidatos = []
+        # Reto, se a saída estiver na altura do destino
+        if dy0 < y1 < dy1:
+            candidatos.append([(x1, y1), (x2, y1)])
+        # "Z": um canal vertical entre as duas colunas
+        for mx in (x2 - CANAL, x1 + CANAL, (x1 + x2) / 2):
+            candidatos.append(_simplificar([(x1, y1), (mx, y1), (mx, y2), (x2, y2)]))
+        return candidatos
+
+    def _contornos(self, fi: int) -> list:
+        """"U": sai pela direita, percorre um corredor horizontal e entra pela esquerda"""
+        (_, oy0, _, oy1), (_, dy0, _, dy1), (x1, y1), (x2, y2) = self._extremos(fi)
+        f = self.modelo.fluxos[fi]
+        L = self.layout
+        xa, xb = x1 + CANAL, x2 - CANAL
+        corredores = [
+            min(oy0, dy0) - AFASTAMENTO,
+            max(oy1, dy1) + AFASTAMENTO,
+        ]
+        for r in {self.modelo.nos[f.origem].raia, self.modelo.nos[f.destino].raia}:
+            corredores.append(L.raia_y[r] + AFASTAMENTO / 2)
+            corredores.append(L.raia_y[r] + L.raia_altura[r] - AFASTAMENTO / 2)
+        return [
+            _simplificar([(x1, y1), (xa, y1), (xa, yc), (xb, yc), (xb, y2), (x2, y2)])
+            for yc in corredores
+        ]
+
+    # --- Avaliação ---
+
+    def _colisoes(self, fi: int, pontos: list) -> int:
+        f = self.modelo.fluxos[fi]
+        extremos = (f.origem, f.destino)
+        total = 0
+        for a, b in _segmentos(pontos):
+            sx0, sy0, sx1, sy1 = _caixa_segmento(a, b)
+            for i in self.nos.consultar(sx0 - MARGEM, sy0 - MARGEM, sx1 + MARGEM, sy1 + MARGEM):
+                m = 0 if i in extremos else MARGEM
+                bx0, by0, bx1, by1 = self._caixa_no(i)
+                # Interseção estrita com o interior (tocar a borda de origem/destino é esperado)
+                if sx0 < bx1 + m and sx1 > bx0 - m and sy0 < by1 + m and sy1 > by0 - m:
+                    total += 1
+        return total
+
+    def _compartilha_extremo(self, fi: int, fj: int) -> bool:
+        a, b = self.modelo.fluxos[fi], self.modelo.fluxos[fj]
+        return a.origem == b.origem or a.destino == b.destino
+
+    def _conflito(self, fi: int, a, b) -> bool:
+        """Segmento intermediário sobreposto a um canal de outro fluxo"""
+        if a[0] == b[0]:
+            canais, pos, ini, fim = self._canais_v, a[0], min(a[1], b[1]), max(a[1], b[1])
+        else:
+            canais, pos, ini, fim = self._canais_h, a[1], min(a[0], b[0]), max(a[0], b[0])
+        for c0, c1, fj in canais.get(round(pos), ()):
+            if c0 < fim and ini < c1 and not self._compartilha_extremo(fi, fj):
+                return True
+        return False
+
+    def _espalhar(self, fi: int, pontos: list) -> tuple[list, int]:
+        """Desloca segmentos intermediários que colidem com canais já ocupados"""
+        pontos = list(pontos)
+        conflitos = 0
+        for j in range(1, len(pontos) - 2):
+            a, b = pontos[j], pontos[j + 1]
+            if not self._conflito(fi, a, b):
+                continue
+            vertical = a[0] == b[0]
+            resolvido = False
+            for k in range(1, MAX_DESLOCAMENTOS + 1):
+                delta = ESPACAMENTO * ((k + 1) // 2) * (1 if k % 2 else -1)
+                if vertical:
+                    na, nb = (a[0] + delta, a[1]), (b[0] + delta, b[1])
+                else:
+                    na, nb = (a[0], a[1] + delta), (b[0], b[1] + delta)
+                if not self._conflito(fi, na, nb):
+                    pontos[j], pontos[j + 1] = na, nb
+                    resolvido = True
+                    break
+            if not resolvido:
+                conflitos += 1
+        return pontos, conflitos
+
+    # --- Registro das rotas escolhidas ---
+
+    def _registrar(self, fi: int, pontos: list) -> None:
+        self.rotas[fi] = pontos
+        if self.arestas is not None:
+            self.arestas.inserir(fi, (_caixa_segmento(a, b) for a, b in _segmentos(pontos)))
+        for j in range(1, len(pontos) - 2):
+            a, b = pontos[j], pontos[j + 1]
+            if a[0] == b[0]:
+                self._canais_v.setdefault(round(a[0]), []).append((min(a[1], b[1]), max(a[1], b[1]), fi))
+            else:
+                self._canais_h.setdefault(round(a[1]), []).append((min(a[0], b[0]), max(a[0], b[0]), fi))
+
+    def _desregistrar(self, fi: int) -> None:
+        pontos = self.rotas[fi]
+        if not pontos:
+            return
+        if self.arestas is not None:
+            self.arestas.remover(fi)
+        for j in range(1, len(pontos) - 2):
+            a, b = pontos[j], pontos[j + 1]
+            canais, pos = (self._canais_v, a[0]) if a[0] == b[0] else (self._canais_h, a[1])
+            lista = canais.get(round(pos))
+            if lista:
+                lista[:] = [c for c in lista if c[2] != fi]
+        self.rotas[fi] = None
+
+    # --- API ---
+
+    def _reaproveitavel(self, fi: int, pontos: list) -> bool:
+        """Rota anterior ainda sai/entra pelas mesmas portas e continua limpa"""
+        _, _, (x1, y1), (x2, y2) = self._extremos(fi)
+        if pontos[0] != (int(x1), int(y1)) or pontos[-1] != (int(x2), int(y2)):
+            return False
+        if self._colisoes(fi, pontos):
+            return False
+        return not any(self._conflito(fi, pontos[j], pontos[j + 1]) for j in range(1, len(pontos) - 2))
+
+    def rotear(self, fi: int, anterior: Optional[list] = None) -> Optional[list]:
+        """(Re)calcula a rota de um fluxo; None se alguma extremidade não existir
+
+        `anterior` (rota de um diagrama anterior) é mantida se ainda for válida.
+        """
+        f = self.modelo.fluxos[fi]
+        self._desregistrar(fi)
+        if f.origem == SEM_NO or f.destino == SEM_NO:
+            return None
+        if anterior and self._reaproveitavel(fi, anterior):
+            self._registrar(fi, anterior)
+            return anterior
+
+        # Os contornos só são gerados se nenhuma rota direta sair limpa
+        melhor, melhor_custo, limpo = None, float("inf"), False
+        for gerar in (self._diretos, self._contornos):
+            for base, candidato in sorted((_custo_base(c), c) for c in gerar(fi)):
+                if base >= melhor_custo:
+                    break
+                pontos, conflitos = self._espalhar(fi, candidato)
+                colisoes = self._colisoes(fi, pontos)
+                custo = (_custo_base(pontos)
+                         + CUSTO_COLISAO * colisoes
+                         + CUSTO_CONFLITO * conflitos)
+                if custo < melhor_custo:
+                    melhor, melhor_custo = pontos, custo
+                    limpo = not colisoes and not conflitos
+            if limpo:
+                break
+
+        self._registrar(fi, melhor)
+        return melhor
+
+    def rotear_todos(self, anteriores: Optional[dict] = None) -> list:
+        """Roteia todos os fluxos; `anteriores` (id do fluxo -> pontos) é reaproveitado quando possível"""
+        anteriores = anteriores or {}
+        for fi, f in enumerate(self.modelo.fluxos):
+            self.rotear(fi, anteriores.get(f.id))
+        return self.rotas
+
+    def indexar_rotas(self) -> None:
+        """Monta o índice espacial das rotas (usado só no re-roteamento incremental)"""
+        self.arestas = GradeEspacial(self._celula)
+        for fi, pontos in enumerate(self.rotas):
+            if pontos:
+                self.arestas.inserir(fi, (_caixa_segmento(a, b) for a, b in _segmentos(pontos)))
+
+    def mover_no(self, i: int, x: float, y: float) -> set:
+        """Move um nó e re-roteia só os fluxos afetados; devolve seus índices
+
+        Afetados são os fluxos incidentes ao nó, os que passam pela área nova
+        e os que colidiam com a área antiga (podem ter ficado livres). Rotas
+        que já desviavam do nó continuam válidas e não são recalculadas.
+        """
+        if self.arestas is None:
+            self.indexar_rotas()
+        antiga = self._caixa_no(i)
+        self.layout.x[i] = x
+        self.layout.y[i] = y
+        nova = self._caixa_no(i)
+        self.nos.remover(i)
+        self.nos.inserir(i, nova)
+
+        afetados = set(self._incidentes[i])
+        afetados |= self.arestas.consultar(*nova)
+        afetados |= self.arestas.consultar(*antiga)
+        for fi in sorted(afetados):
+            self.rotear(fi)
+        return afetados
+
+
+def rotear_fluxos(modelo: ModeloProcesso, layout: Layout, anteriores: Optional[dict] = None) -> list:
+    """Waypoints inteiros de cada fluxo (None para fluxos com extremidade inexistente)"""
+    rotas = Roteador(modelo, layout).rotear_todos(anteriores)
+    return [
+        [(int(x), int(y)) for x, y in pontos] if pontos else None
+        for pontos in rotas
+    ]
+
+
+def avaliar_rotas(modelo: ModeloProcesso, layout: Layout, rotas: list) -> dict:
+    """Quantos fluxos atravessam formas que não são suas extremidades"""
+    indice = IndiceFaixas()
+    for i in range(len(modelo.nos)):
+        indice.inserir(i, (layout.x[i], layout.y[i],
+                           layout.x[i] + layout.largura[i], layout.y[i] + layout.altura[i]))
+    atravessam = 0
+    segmentos = 0
+    for fi, pontos in enumerate(rotas):
+        if not pontos:
+            continue
+        f = modelo.fluxos[fi]
+        colidiu = False
+        for a, b in _segmentos(pontos):
+            segmentos += 1
+            sx0, sy0, sx1, sy1 = _caixa_segmento(a, b)
+            for i in indice.consultar(sx0, sy0, sx1, sy1):
+                if i in (f.origem, f.destino):
+                    continue
+                bx0, by0, bx1, by1 = indice.caixa(i)
+                if sx0 < bx1 and sx1 > bx0 and sy0 < by1 and sy1 > by0:
+                    colidiu = True
+        atravessam += colidiu
+    return {"fluxos_atravessando_formas": atravessam, "segmentos": segmentos}
@@ -0,0 +1,529 @@
+"""Serviço HTTP texto -> BPMN (sem Streamlit), com fila de jobs e workers assíncronos
+
+Uso:
+    export GOOGLE_API_KEYS=chave1,chave2
+    python -m gerador_bpmn.servico --porta 8080 --concorrencia 4
+    python -m gerador_bpmn.servico --stub          # LLM falso local, sem rede
+
+Endpoints:
+    POST /gerar               {"descricao", "modelo"?, "temperatura"?} -> JSON, XML e correções
+                              (?formato=bpmn devolve só o XML)
+    POST /jobs                mesmo corpo -> 202 {"id", "status", ...}
+    GET  /jobs/<id>           status do job
+    GET  /jobs/<id>/bpmn      XML do diagrama (também /json e /svg)
+    GET  /saude               estado da fila, do cache, do índice de similares, do agendador e das etapas
+    GET  /metricas            métricas no formato texto do Prometheus
+
+As chaves de API ficam só no servidor (GOOGLE_API_KEYS ou GOOGLE_API_KEY) e
+são usadas em rodízio. Descrições idênticas em andamento compartilham o
+mesmo job. Com BPMN_API_TOKEN definido, toda requisição precisa de
+"Authorization: Bearer <token>".
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .agendador import PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, RPM_PADRAO, TPM_PADRAO, Agendador
+from .cache import CacheRespostas
+from .esquema import suporta_saida_estruturada
+from .geracao import gerar_bpmn
+from .incremental import Diagrama, montar_diagrama
+from .rastreio import configurar_log_json, metricas_padrao, rastreio
+from .similaridade import CAMINHO_PADRAO as CAMINHO_SIMILARES, LIMIAR_ADAPTACAO, IndiceSimilaridade
+from .stub import LLMStub
+
+MODELO_PADRAO = "gemini-2.5-flash"
+TEMPERATURA_PADRAO = 0.1
+MAX_CORPO = 1_000_000       # bytes aceitos no corpo de uma requisição
+MAX_DESCRICAO = 50_000      # caracteres
+MAX_FILA = 1000             # jobs aguardando; acima disso responde 503
+MAX_JOBS_GUARDADOS = 1000   # jobs terminados mantidos para consulta
+TIMEOUT_SINCRONO = 120.0
+
+FILA, PROCESSANDO, CONCLUIDO, ERRO = "fila", "processando", "concluido", "erro"
+
+
+class ErroRequisicao(Exception):
+    """Erro com status HTTP, devolvido ao cliente como {"erro": ...}"""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def chaves_do_ambiente() -> list:
+    """GOOGLE_API_KEYS (separadas por vírgula) ou, na falta, GOOGLE_API_KEY"""
+    valor = os.environ.get("GOOGLE_API_KEYS") or os.environ.get("GOOGLE_API_KEY") or ""
+    return [chave.strip() for chave in valor.split(",") if chave.strip()]
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    chave: str
+    descricao: str
+    modelo: str
+    temperatura: float
+    prioridade: int
+    status: str = FILA
+    criado: float = field(default_factory=time.time)
+    iniciado: Optional[float] = None
+    concluido: Optional[float] = None
+    diagrama: Optional[Diagrama] = None
+    xml: Optional[str] = None
+    erro: Optional[str] = None
+    etapas: dict = field(default_factory=dict)  # etapa -> ms gastos neste job
+    pronto: threading.Event = field(default_factory=threading.Event)
+
+    def resumo(self) -> dict:
+        dados = {
+            "id": self.id,
+            "status": self.status,
+            "modelo": self.modelo,
+            "criado": self.criado,
+            "iniciado": self.iniciado,
+            "concluido": self.concluido,
+        }
+        if self.etapas:
+            dados["etapas_ms"] = self.etapas
+        if self.status == CONCLUIDO:
+            dados["elementos"] = len(self.diagrama.modelo.nos)
+            dados["fluxos"] = len(self.diagrama.modelo.fluxos)
+            dados["correcoes"] = [p.to_dict() for p in self.diagrama.problemas]
+            dados["links"] = {fmt: f"/jobs/{self.id}/{fmt}" for fmt in ("bpmn", "json", "svg")}
+        elif self.status == ERRO:
+            dados["erro"] = self.erro
+        return dados
+
+
+def chave_job(descricao: str, modelo: str, temperatura: float) -> str:
+    bruto = json.dumps([descricao.strip(), modelo, temperatura], ensure_ascii=False)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+class Servico:
+    """Fila de jobs atendida por `concorrencia` workers num loop asyncio próprio
+
+    As threads do servidor HTTP só enfileiram e esperam: todo o trabalho
+    (modelo, validação, layout, XML) roda nos workers.
+    """
+
+    def __init__(
+        self,
+        concorrencia: int = 4,
+        api_keys: Optional[list] = None,
+        llm=None,
+        cache: Optional[CacheRespostas] = None,
+        agendador: Optional[Agendador] = None,
+        estruturado: bool = True,
+        compacto: bool = False,
+        similares: Optional[IndiceSimilaridade] = None,
+        max_fila: int = MAX_FILA,
+        max_guardados: int = MAX_JOBS_GUARDADOS,
+    ):
+        if llm is None and not api_keys:
+            raise ValueError("Configure GOOGLE_API_KEYS/GOOGLE_API_KEY ou use um LLM local (--stub)")
+        self.concorrencia = concorrencia
+        self.llm = llm
+        self.cache = cache
+        self.agendador = agendador
+        self.estruturado = estruturado
+        self.compacto = compacto
+        self.similares = similares
+        self.max_fila = max_fila
+        self.max_guardados = max_guardados
+        self._chaves = itertools.cycle(api_keys or [None])
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._em_andamento: dict = {}  # chave_job -> Job na fila ou processando
+        self._na_fila = 0
+        self._contadores = {"submetidos": 0, "deduplicados": 0, "concluidos": 0, "erros": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fila: Optional[asyncio.PriorityQueue] = None
+        self._ordem = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- ciclo de vida ---
+
+    def iniciar(self) -> None:
+        pronto = threading.Event()
+
+        def _rodar():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            # O executor padrão limitaria os workers a min(32, CPUs + 4) threads
+            self._loop.set_default_executor(ThreadPoolExecutor(self.concorrencia))
+            self._fila = asyncio.PriorityQueue()
+            tarefas = [self._loop.create_task(self._worker()) for _ in range(self.concorrencia)]
+            pronto.set()
+            self._loop.run_forever()
+            # parar(): cancela os workers e fecha o loop (jobs em execução terminam na thread)
+            for tarefa in tarefas:
+                tarefa.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tarefas, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_rodar, name="servico-bpmn", daemon=True)
+        self._thread.start()
+        pronto.wait()
+
+    def parar(self) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    # --- jobs ---
+
+    def submeter(self, descricao: str, modelo: str = MODELO_PADRAO,
+                 temperatura: float = TEMPERATURA_PADRAO, prioridade: int = PRIORIDADE_LOTE) -> tuple:
+        """(job, novo): descrições idênticas em andamento devolvem o job existente
+
+        Se quem chega tem prioridade maior (ex.: /gerar sobre um job de lote
+        ainda na fila), o job é promovido: entra de novo na fila com a nova
+        prioridade e a entrada antiga é ignorada pelo worker.
+        """
+        chave = chave_job(descricao, modelo, temperatura)
+        with self._lock:
+            existente = self._em_andamento.get(chave)
+            if existente is not None:
+                self._contadores["deduplicados"] += 1
+                if prioridade >= existente.prioridade:
+                    return existente, False
+                existente.prioridade = prioridade
+                if existente.status != FILA:
+                    return existente, False
+                item = (prioridade, next(self._ordem), existente)
+                self._loop.call_soon_threadsafe(self._fila.put_nowait, item)
+                return existente, False
+            if self._na_fila >= self.max_fila:
+                raise ErroRequisicao(503, "Fila cheia, tente novamente mais tarde")
+            job = Job(uuid.uuid4().hex, chave, descricao, modelo, temperatura, prioridade)
+            self._jobs[job.id] = job
+            self._em_andamento[chave] = job
+            self._na_fila += 1
+            self._contadores["submetidos"] += 1
+            self._descartar_antigos()
+            item = (prioridade, next(self._ordem), job)
+        self._loop.call_soon_threadsafe(self._fila.put_nowait, item)
+        return job, True
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _descartar_antigos(self) -> None:
+        # Só jobs terminados saem, dos mais antigos para os mais novos (ordem de inserção)
+        excesso = len(self._jobs) - self.max_guardados
+        if excesso <= 0:
+            return
+        terminados = []
+        for job_id, job in self._jobs.items():
+            if job.status in (CONCLUIDO, ERRO):
+                terminados.append(job_id)
+                if len(terminados) == excesso:
+                    break
+        for job_id in terminados:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._fila.get()
+            await asyncio.to_thread(self._processar, job)
+
+    def _processar(self, job: Job) -> None:
+        with self._lock:
+            if job.status != FILA:
+                return  # entrada antiga de um job promovido, que já saiu da fila
+            self._na_fila -= 1
+            job.status = PROCESSANDO
+            job.iniciado = time.time()
+        metricas_padrao().observar("fila_servico", job.iniciado - job.criado)
+        try:
+            with rastreio(trace_id=job.id) as rastro:
+                self._executar(job, rastro)
+        finally:
+            job.pronto.set()
+
+    def _executar(self, job: Job, rastro) -> None:
+        try:
+            data = gerar_bpmn(
+                job.descricao,
+                job.modelo,
+                job.temperatura,
+                api_key=next(self._chaves),
+                cache=self.cache,
+                llm=self.llm,
+                agendador=self.agendador,
+                prioridade=job.prioridade,
+                estruturado=self.estruturado and suporta_saida_estruturada(job.modelo),
+                compacto=self.compacto,
+                similares=self.similares,
+            )
+            diagrama = montar_diagrama(data)
+            xml = diagrama.xml()
+        except Exception as e:
+            with self._lock:
+                job.status, job.erro = ERRO, f"{type(e).__name__}: {e}"
+                self._contadores["erros"] += 1
+        else:
+            with self._lock:
+                job.status, job.diagrama, job.xml = CONCLUIDO, diagrama, xml
+                self._contadores["concluidos"] += 1
+        finally:
+            with self._lock:
+                job.concluido = time.time()
+                job.etapas = {nome: round(s * 1000, 2) for nome, s in rastro.duracoes().items()}
+                self._em_andamento.pop(job.chave, None)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            dados = dict(self._contadores, na_fila=self._na_fila, em_andamento=len(self._em_andamento),
+                         guardados=len(self._jobs), concorrencia=self.concorrencia)
+        if self.agendador is not None:
+            dados["agendador"] = self.agendador.metricas()
+        if self.cache is not None:
+            dados["cache"] = self.cache.estatisticas()
+        if self.similares is not None:
+            dados["similares"] = self.similares.estatisticas()
+        dados["etapas"] = metricas_padrao().resumo()["etapas"]
+        return dados
+
+
+def _ler_pedido(corpo: bytes) -> dict:
+    try:
+        pedido = json.loads(corpo or b"{}")
+    except ValueError:
+        raise ErroRequisicao(400, "Corpo não é JSON válido")
+    if not isinstance(pedido, dict):
+        raise ErroRequisicao(400, "O corpo deve ser um objeto JSON")
+    descricao = pedido.get("descricao")
+    if not isinstance(descricao, str) or not descricao.strip():
+        raise ErroRequisicao(400, '"descricao" é obrigatória')
+    if len(descricao) > MAX_DESCRICAO:
+        raise ErroRequisicao(413, f'"descricao" maior que {MAX_DESCRICAO} caracteres')
+    modelo = pedido.get("modelo") or MODELO_PADRAO
+    temperatura = pedido.get("temperatura", TEMPERATURA_PADRAO)
+    if not isinstance(modelo, str):
+        raise ErroRequisicao(400, '"modelo" deve ser texto')
+    if isinstance(temperatura, bool) or not isinstance(temperatura, (int, float)) or not 0 <= temperatura <= 2:
+        raise ErroRequisicao(400, '"temperatura" deve ser um número entre 0 e 2')
+    return {"descricao": descricao, "modelo": modelo, "temperatura": float(temperatura)}
+
+
+class ManipuladorHTTP(BaseHTTPRequestHandler):
+    """Rotas do serviço; `server.servico`, `server.token` e `server.timeout_sincrono` vêm do servidor"""
+
+    server_version = "GeradorBPMN/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        if not self.server.silencioso:
+            super().log_message(formato, *args)
+
+    def log_error(self, formato, *args):
+        # Erros aparecem mesmo com --silencioso
+        super().log_message(formato, *args)
+
+    def _responder(self, status: int, corpo, tipo: str = "application/json; charset=utf-8") -> None:
+        if not isinstance(corpo, (str, bytes)):
+            corpo = json.dumps(corpo, ensure_ascii=False)
+        if isinstance(corpo, str):
+            corpo = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _autorizado(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        enviado = self.headers.get("Authorization", "")
+        return hmac.compare_digest(enviado.encode(), f"Bearer {token}".encode())
+
+    def _corpo(self) -> bytes:
+        bruto = (self.headers.get("Content-Length") or "0").strip()
+        # Só dígitos: int() aceitaria "-1", e rfile.read(-1) prenderia a thread até o cliente fechar
+        if not (bruto.isascii() and bruto.isdigit()):
+            raise ErroRequisicao(400, "Content-Length inválido")
+        tamanho = int(bruto)
+        if tamanho > MAX_CORPO:
+            raise ErroRequisicao(413, "Corpo da requisição grande demais")
+        return self.rfile.read(tamanho)
+
+    def _tratar(self, metodo: str) -> None:
+        try:
+            if not self._autorizado():
+                raise ErroRequisicao(401, "Token ausente ou inválido")
+            url = urlsplit(self.path)
+            partes = [p for p in url.path.split("/") if p]
+            consulta = parse_qs(url.query)
+            if metodo == "GET" and partes == ["saude"]:
+                self._responder(200, {"status": "ok", **self.server.servico.metricas()})
+            elif metodo == "GET" and partes == ["metricas"]:
+                self._responder(200, metricas_padrao().prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+            elif metodo == "POST" and partes == ["gerar"]:
+                self._gerar_sincrono(consulta)
+            elif metodo == "POST" and partes == ["jobs"]:
+                job, novo = self.server.servico.submeter(**_ler_pedido(self._corpo()))
+                self._responder(202, dict(job.resumo(), deduplicado=not novo))
+            elif metodo == "GET" and len(partes) in (2, 3) and partes[0] == "jobs":
+                self._job(partes[1], partes[2] if len(partes) == 3 else None)
+            else:
+                raise ErroRequisicao(404, "Rota não encontrada")
+        except ErroRequisicao as e:
+            # O corpo pode não ter sido lido: não dá para reaproveitar a conexão
+            self.close_connection = True
+            self._responder(e.status, {"erro": str(e)})
+        except Exception as e:
+            self.log_error("Erro interno em %s %s: %r", metodo, self.path, e)
+            self.close_connection = True
+            self._responder(500, {"erro": f"Erro interno: {type(e).__name__}"})
+
+    def _gerar_sincrono(self, consulta: dict) -> None:
+        pedido = _ler_pedido(self._corpo())
+        job, _ = self.server.servico.submeter(prioridade=PRIORIDADE_INTERATIVA, **pedido)
+        if not job.pronto.wait(self.server.timeout_sincrono):
+            # O job continua na fila; o cliente pode acompanhar por /jobs/<id>
+            self._responder(504, {"erro": "Tempo esgotado", "id": job.id, "status": job.status})
+            return
+        if job.status == ERRO:
+            self._responder(502, {"erro": job.erro, "id": job.id})
+        elif consulta.get("formato") == ["bpmn"]:
+            self._responder(200, job.xml, "application/xml; charset=utf-8")
+        else:
+            self._responder(200, dict(job.resumo(), processo=job.diagrama.data, bpmn=job.xml))
+
+    def _job(self, job_id: str, formato: Optional[str]) -> None:
+        job = self.server.servico.obter(job_id)
+        if job is None:
+            raise ErroRequisicao(404, "Job não encontrado")
+        if formato is None:
+            self._responder(200, job.resumo())
+            return
+        if formato not in ("bpmn", "json", "svg"):
+            raise ErroRequisicao(404, "Formato desconhecido (use bpmn, json ou svg)")
+        if job.status != CONCLUIDO:
+            raise ErroRequisicao(409, f"Job ainda não concluído (status: {job.status})")
+        if formato == "bpmn":
+            self._responder(200, job.xml, "application/xml; charset=utf-8")
+        elif formato == "json":
+            self._responder(200, job.diagrama.data)
+        else:
+            self._responder(200, job.diagrama.svg(), "image/svg+xml; charset=utf-8")
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
+
+
+def criar_servidor(servico: Servico, host: str = "127.0.0.1", porta: int = 8080,
+                   token: Optional[str] = None, timeout_sincrono: float = TIMEOUT_SINCRONO,
+                   silencioso: bool = False) -> ThreadingHTTPServer:
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorHTTP)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    servidor.token = token
+    servidor.timeout_sincrono = timeout_sincrono
+    servidor.silencioso = silencioso
+    return servidor
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m gerador_bpmn.servico",
+        description="Serviço HTTP que converte descrições de processos em BPMN"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--concorrencia", type=int, default=4, help="Workers processando jobs ao mesmo tempo")
+    parser.add_argument("--rpm", type=int, default=None,
+                        help=f"Requisições por minuto por chave (padrão: {RPM_PADRAO}; sem limite com --stub)")
+    parser.add_argument("--tpm", type=int, default=TPM_PADRAO, help="Tokens por minuto por chave")
+    parser.add_argument("--timeout-sincrono", type=float, default=TIMEOUT_SINCRONO,
+                        help="Espera máxima de POST /gerar, em segundos")
+    parser.add_argument("--stub", action="store_true", help="Usa um LLM falso local (sem rede)")
+    parser.add_argument("--stub-latencia", type=float, default=0.0, help="Latência simulada do stub (s)")
+    parser.add_argument("--sem-cache", action="store_true", help="Não consulta nem grava o cache de respostas")
+    parser.add_argument("--sem-esquema", action="store_true", help="Não usa saída estruturada (esquema JSON)")
+    parser.add_argument("--saida-compacta-modelo", action="store_true",
+                        help="Pede ao modelo o formato compacto (menos tokens de saída; sem esquema estruturado)")
+    parser.add_argument("--similares", action="store_true",
+                        help="Reaproveita (ou adapta) o resultado de descrições parecidas já geradas")
+    parser.add_argument("--limiar-similares", type=float, default=LIMIAR_ADAPTACAO,
+                        help="Similaridade (0 a 1) a partir da qual o resultado parecido é adaptado")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Escreve no stderr uma linha JSON por etapa (span) de cada job")
+    parser.add_argument("--silencioso", action="store_true", help="Não registra cada requisição")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    if args.concorrencia < 1:
+        print("--concorrencia deve ser >= 1", file=sys.stderr)
+        return 2
+
+    if args.log_json:
+        configurar_log_json()
+
+    chaves = chaves_do_ambiente()
+    if not args.stub and not chaves:
+        print("Defina GOOGLE_API_KEYS (ou GOOGLE_API_KEY) ou use --stub", file=sys.stderr)
+        return 2
+
+    agendador = None
+    if args.rpm or not args.stub:
+        agendador = Agendador(rpm=args.rpm or RPM_PADRAO, tpm=args.tpm)
+    servico = Servico(
+        concorrencia=args.concorrencia,
+        api_keys=chaves,
+        llm=LLMStub(latencia=args.stub_latencia) if args.stub else None,
+        cache=None if args.sem_cache or args.stub else CacheRespostas(),
+        agendador=agendador,
+        estruturado=not args.sem_esquema,
+        compacto=args.saida_compacta_modelo,
+        similares=IndiceSimilaridade(
+            caminho=None if args.stub else CAMINHO_SIMILARES, limiar_adaptacao=args.limiar_similares
+        ) if args.similares else None,
+    )
+    servico.iniciar()
+    servidor = criar_servidor(
+        servico, args.host, args.porta,
+        token=os.environ.get("BPMN_API_TOKEN"),
+        timeout_sincrono=args.timeout_sincrono,
+        silencioso=args.silencioso,
+    )
+    print(f"Servindo em http://{args.host}:{servidor.server_port} "
+          f"({len(chaves)} chave(s), {args.concorrencia} worker(s){', stub' if args.stub else ''})",
+          file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.parar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Índice de descrições parecidas (MinHash + LSH), para reaproveitar gerações anteriores
+
+O cache de respostas só acerta com o mesmo texto; aqui descrições
+reescritas ("O funcionário cria o pedido" / "Funcionário cria um pedido")
+também se encontram. Cada descrição vira um conjunto de palavras e pares
+de palavras, resumido numa assinatura MinHash de TAMANHO_ASSINATURA valores;
+a fração de valores iguais entre duas assinaturas estima a similaridade
+de Jaccard dos conjuntos. A assinatura é cortada em faixas (LSH): só as
+descrições que caem no mesmo balde em alguma faixa são comparadas, então a
+busca não depende do tamanho do índice.
+
+Cada termo vira TAMANHO_ASSINATURA hashes de 32 bits de uma vez só (saída
+do shake_128), e o mínimo por posição sai de zip/min, sem laço em Python
+por hash. Tudo é local e determinístico, então as assinaturas gravadas no
+SQLite (opcional) continuam válidas entre execuções.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from .cache import normalizar_descricao
+
+TAMANHO_ASSINATURA = 64
+FAIXAS = 16          # 16 faixas de 4 valores: pares com Jaccard ~0.5 já viram candidatos
+LIMIAR_ADAPTACAO = 0.6
+MAX_ITENS = 5_000
+
+CAMINHO_PADRAO = os.environ.get("BPMN_SIMILARES_PATH", os.path.join(".cache", "similares.sqlite3"))
+
+_PALAVRA = re.compile(r"\w+")
+_MARCADOR = re.compile(r"^(\d+[.)]|[-*•])\s*")  # numeração de lista não é conteúdo
+# Palavras que quase nunca mudam o processo; "se", "não" e "ou" ficam
+_IRRELEVANTES = frozenset(
+    "a o as os um uma uns umas de da do das dos em na no nas nos e para pra por pelo pela "
+    "com que é ao aos à às então depois".split()
+)
+
+
+def termos(texto: str) -> set:
+    """Palavras (sem acento, minúsculas, sem as irrelevantes) e pares de palavras vizinhas"""
+    texto = unicodedata.normalize("NFKD", normalizar_descricao(texto).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = "\n".join(_MARCADOR.sub("", linha) for linha in texto.splitlines())
+    palavras = [p for p in _PALAVRA.findall(texto) if p not in _IRRELEVANTES]
+    return set(palavras) | {f"{a} {b}" for a, b in zip(palavras, palavras[1:])}
+
+
+def assinatura(texto: str) -> Optional[array]:
+    """MinHash de `termos(texto)`: TAMANHO_ASSINATURA valores de 32 bits; None se não há termos
+
+    Sem termos (só pontuação ou palavras irrelevantes) não há o que comparar:
+    uma assinatura fixa faria todos esses textos parecerem iguais entre si.
+    """
+    linhas = [
+        array("I", hashlib.shake_128(t.encode("utf-8")).digest(4 * TAMANHO_ASSINATURA))
+        for t in termos(texto)
+    ]
+    if not linhas:
+        return None
+    return array("I", map(min, zip(*linhas)))
+
+
+def similaridade(a: array, b: array) -> float:
+    """Estimativa da similaridade de Jaccard entre duas assinaturas"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+@dataclass(slots=True)
+class Parecido:
+    similaridade: float
+    descricao: str
+    dados: dict
+
+
+class IndiceSimilaridade:
+    """Descrição -> JSON gerado, buscável por similaridade; limitado a `max_itens` (sai o mais antigo)"""
+
+    def __init__(
+        self,
+        caminho: Optional[str] = CAMINHO_PADRAO,
+        max_itens: int = MAX_ITENS,
+        limiar_adaptacao: float = LIMIAR_ADAPTACAO,
+    ):
+        self.max_itens = max_itens
+        self.limiar_adaptacao = limiar_adaptacao
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (contexto, descrição, assinatura, dados)
+        self._exatos: dict = {}   # (contexto, descrição normalizada) -> id
+        self._baldes = [{} for _ in range(FAIXAS)]  # por faixa: hash dos valores -> id ou set de ids
+        self._proximo_id = 0
+        self._buscas = 0
+        self._acertos = 0
+        self._db = None
+
+        if caminho:
+            import sqlite3
+
+            pasta = os.path.dirname(caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            self._db = sqlite3.connect(caminho, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS similares (
+                    id INTEGER PRIMARY KEY,
+                    contexto TEXT NOT NULL,
+                    descricao TEXT NOT NULL,
+                    assinatura BLOB NOT NULL,
+                    dados TEXT NOT NULL
+                )"""
+            )
+            self._db.commit()
+            linhas = self._db.execute(
+                "SELECT id, contexto, descricao, assinatura, dados FROM similares ORDER BY id DESC LIMIT ?",
+                (max_itens,),
+            ).fetchall()
+            for id_, contexto, descricao, bruta, dados in reversed(linhas):
+                sig = array("I")
+                sig.frombytes(bruta)
+                if len(sig) == TAMANHO_ASSINATURA and any(sig):  # zeros: texto sem termos, gravado por versões anteriores
+                    self._inserir(id_, contexto, descricao, sig, dados)
+            self._proximo_id = max((l[0] for l in linhas), default=-1) + 1
+            self._db.execute("DELETE FROM similares WHERE id < ?", (min(self._itens, default=0),))
+            self._db.commit()
+
+    def _faixas(self, sig: array):
+        """(baldes da faixa, chave) para cada faixa
+
+        A chave é um int (hash da tupla), bem menor que a tupla guardada; uma
+        colisão só acrescenta um candidato, que a comparação descarta.
+        """
+        linhas = TAMANHO_ASSINATURA // FAIXAS
+        for f, baldes in enumerate(self._baldes):
+            yield baldes, hash(tuple(sig[f * linhas:(f + 1) * linhas]))
+
+    def _inserir(self, id_: int, contexto: str, descricao: str, sig: array, dados: str) -> None:
+        self._itens[id_] = (contexto, descricao, sig, dados)
+        self._exatos[(contexto, descricao)] = id_
+        for baldes, chave in self._faixas(sig):
+            atual = baldes.get(chave)
+            if atual is None:
+                baldes[chave] = id_  # a maioria dos baldes tem um item só
+            elif isinstance(atual, set):
+                atual.add(id_)
+            else:
+                baldes[chave] = {atual, id_}
+
+    def _remover(self, id_: int) -> None:
+        contexto, descricao, sig, _ = self._itens.pop(id_)
+        self._exatos.pop((contexto, descricao), None)
+        for baldes, chave in self._faixas(sig):
+            atual = baldes.get(chave)
+            if isinstance(atual, set):
+                atual.discard(id_)
+                if len(atual) == 1:
+                    baldes[chave] = next(iter(atual))
+            elif atual == id_:
+                del baldes[chave]
+        if self._db is not None:
+            self._db.execute("DELETE FROM similares WHERE id = ?", (id_,))
+
+    def adicionar(self, descricao: str, dados: dict, contexto: str = "") -> None:
+        """Indexa a descrição com o JSON gerado; a mesma descrição no mesmo contexto é substituída
+
+        Descrições sem termos não são indexadas.
+        """
+        descricao = normalizar_descricao(descricao)
+        sig = assinatura(descricao)
+        if sig is None:
+            return
+        bruto = json.dumps(dados, ensure_ascii=False)
+        with self._lock:
+            anterior = self._exatos.get((contexto, descricao))
+            if anterior is not None:
+                self._remover(anterior)
+            id_ = self._proximo_id
+            self._proximo_id += 1
+            self._inserir(id_, contexto, descricao, sig, bruto)
+            while len(self._itens) > self.max_itens:
+                self._remover(next(iter(self._itens)))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO similares (id, contexto, descricao, assinatura, dados) VALUES (?, ?, ?, ?, ?)",
+                    (id_, contexto, descricao, sig.tobytes(), bruto),
+                )
+                self._db.commit()
+
+    def buscar(self, descricao: str, contexto: str = "", limiar: float = 0.0) -> Optional[Parecido]:
+        """A descrição indexada mais parecida no mesmo contexto, se a similaridade for >= `limiar`"""
+        sig = assinatura(descricao)
+        with self._lock:
+            self._buscas += 1
+            if sig is None:
+                return None
+            candidatos = set()
+            for baldes, chave in self._faixas(sig):
+                atual = baldes.get(chave)
+                if isinstance(atual, set):
+                    candidatos |= atual
+                elif atual is not None:
+                    candidatos.add(atual)
+            melhor, melhor_id = limiar, None
+            for id_ in candidatos:
+                item = self._itens[id_]
+                if item[0] != contexto:
+                    continue
+                valor = similaridade(sig, item[2])
+                if valor >= melhor:
+                    melhor, melhor_id = valor, id_
+            if melhor_id is None:
+                return None
+            self._acertos += 1
+            _, anterior, _, dados = self._itens[melhor_id]
+        # Cada busca recebe o seu dicionário
+        return Parecido(melhor, anterior, json.loads(dados))
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._exatos.clear()
+            for baldes in self._baldes:
+                baldes.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM similares")
+                self._db.commit()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "buscas": self._buscas,
+                "acertos": self._acertos,
+                "taxa_acerto": self._acertos / self._buscas if self._buscas else 0.0,
+            }
+
+    def fechar(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,130 @@
+"""Parser JSON incremental para pré-visualização durante o streaming do modelo"""
+
+import json
+from typing import Iterator
+
+from .extracao import extrair_json_com_reparos
+
+# Listas do JSON cujos objetos são emitidos assim que se fecham
+LISTAS_EMITIDAS = {"elementos": "elemento", "fluxos": "fluxo"}
+
+
+class ParserIncremental:
+    """Consome pedaços de texto e emite elementos/fluxos completos à medida que chegam
+
+    Mantém apenas o estado léxico (pilha de contêineres, string aberta, última
+    chave) e processa cada caractere uma única vez, independentemente de como
+    o modelo fatia os tokens.
+    """
+
+    def __init__(self):
+        self.texto = ""
+        self._pos = 0
+        self._pilha: list[str] = []  # "{" ou "[" por nível
+        self._chaves: list = []      # última chave vista em cada objeto aberto
+        self._em_string = False
+        self._escape = False
+        self._inicio_string = 0
+        self._inicio_item = -1
+        self._tipo_item = None
+        self._esperando_valor = False
+        self.processo = None
+
+    def feed(self, pedaco: str) -> list[tuple[str, object]]:
+        """Adiciona texto e retorna eventos ("processo"|"elemento"|"fluxo", valor)"""
+        self.texto += pedaco
+        eventos = []
+        texto = self.texto
+        for i in range(self._pos, len(texto)):
+            c = texto[i]
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+                    self._fim_string(texto[self._inicio_string:i + 1], eventos)
+                continue
+
+            if not self._pilha:
+                # Ignora cercas ```json e prosa antes do objeto raiz
+                if c == "{":
+                    self._abrir("{", i)
+                continue
+
+            if c == '"':
+                self._em_string = True
+                self._inicio_string = i
+            elif c in "{[":
+                self._abrir(c, i)
+            elif c in "}]":
+                self._fechar(i, eventos)
+            elif c == ":":
+                self._esperando_valor = True
+            elif c == ",":
+                self._esperando_valor = False
+        self._pos = len(texto)
+        return eventos
+
+    def _abrir(self, c: str, i: int) -> None:
+        # Objeto direto dentro de raiz["elementos"] ou raiz["fluxos"]
+        if (
+            c == "{"
+            and len(self._pilha) == 2
+            and self._pilha[1] == "["
+            and self._chaves[0] in LISTAS_EMITIDAS
+        ):
+            self._inicio_item = i
+            self._tipo_item = LISTAS_EMITIDAS[self._chaves[0]]
+        self._pilha.append(c)
+        if c == "{":
+            self._chaves.append(None)
+        self._esperando_valor = False
+
+    def _fechar(self, i: int, eventos: list) -> None:
+        if not self._pilha:
+            return
+        c = self._pilha.pop()
+        if c == "{":
+            self._chaves.pop()
+            if len(self._pilha) == 2 and self._inicio_item >= 0:
+                bruto = self.texto[self._inicio_item:i + 1]
+                self._inicio_item = -1
+                item = _carregar_item(bruto)
+                if item is not None:
+                    eventos.append((self._tipo_item, item))
+        self._esperando_valor = False
+
+    def _fim_string(self, bruto: str, eventos: list) -> None:
+        if not self._pilha or self._pilha[-1] != "{":
+            return
+        try:
+            valor = json.loads(bruto)
+        except json.JSONDecodeError:
+            return
+        if self._esperando_valor:
+            if len(self._pilha) == 1 and self._chaves[0] == "processo" and self.processo is None:
+                self.processo = valor
+                eventos.append(("processo", valor))
+            self._esperando_valor = False
+        else:
+            self._chaves[-1] = valor
+
+
+def _carregar_item(bruto: str):
+    try:
+        item = json.loads(bruto)
+    except json.JSONDecodeError:
+        try:
+            item, _ = extrair_json_com_reparos(bruto)
+        except ValueError:
+            return None
+    return item if isinstance(item, dict) else None
+
+
+def iterar_eventos(pedacos: Iterator[str]) -> Iterator[tuple[str, object]]:
+    """Atalho para consumir um iterador de pedaços de texto"""
+    parser = ParserIncremental()
+    for pedaco in pedacos:
+        yield from parser.feed(pedaco)
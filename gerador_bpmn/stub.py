@@ -0,0 +1,91 @@
+"""LLM falso e determinístico para rodar o pipeline offline (testes, benchmarks, CLI)"""
+
+import json
+import re
+import time
+
+from .compacto import PROMPT_COMPACTO, compactar
+
+# Palavras que indicam tarefa automática / decisão nas descrições
+_PALAVRAS_SISTEMA = ("sistema", "automátic", "automatic")
+_PALAVRAS_DECISAO = ("se ", "decisão", "caso ")
+
+
+class _Resposta:
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+def _conteudo(mensagem) -> str:
+    if isinstance(mensagem, tuple):
+        return mensagem[1]
+    return getattr(mensagem, "content", str(mensagem))
+
+
+def processo_da_descricao(descricao: str) -> dict:
+    """Monta um JSON de processo sequencial, uma tarefa por linha da descrição"""
+    linhas = [l.strip() for l in descricao.splitlines() if l.strip()]
+    titulo = linhas[0].rstrip(":") if linhas else "Processo"
+    passos = [re.sub(r"^(\d+[.)]|[-*•])\s*", "", l) for l in linhas[1:]] or [titulo]
+
+    elementos = []
+    for i, passo in enumerate(passos, start=1):
+        palavras = passo.split()
+        papel = palavras[0].strip(":,").capitalize() if palavras else "Sistema"
+        texto = passo.lower()
+        if any(p in texto for p in _PALAVRAS_DECISAO):
+            tipo, eid = "exclusiveGateway", f"Gateway_{i}"
+        elif any(p in texto for p in _PALAVRAS_SISTEMA):
+            tipo, eid = "serviceTask", f"Task_{i}"
+        else:
+            tipo, eid = "userTask", f"Task_{i}"
+        elementos.append({"id": eid, "tipo": tipo, "nome": passo[:60], "papel": papel})
+
+    papel_inicial = elementos[0]["papel"]
+    elementos.insert(0, {"id": "StartEvent_1", "tipo": "startEvent", "nome": "Início", "papel": papel_inicial})
+    elementos.append({"id": "EndEvent_1", "tipo": "endEvent", "nome": "Fim", "papel": elementos[-1]["papel"]})
+
+    fluxos = [
+        {"id": f"Flow_{i}", "origem": a["id"], "destino": b["id"]}
+        for i, (a, b) in enumerate(zip(elementos, elementos[1:]), start=1)
+    ]
+    return {"processo": titulo, "elementos": elementos, "fluxos": fluxos}
+
+
+class LLMStub:
+    """Imita a interface invoke/stream dos chat models do LangChain
+
+    A resposta vem cercada por ```json, como o Gemini costuma fazer, para
+    exercitar também a extração. Com o prompt de compacto.py, responde no
+    formato compacto.
+    """
+
+    def __init__(self, latencia: float = 0.0, tamanho_chunk: int = 24):
+        self.latencia = latencia
+        self.tamanho_chunk = tamanho_chunk
+        self.chamadas = 0
+
+    def _texto(self, messages) -> str:
+        self.chamadas += 1
+        descricao = _conteudo(messages[-1])
+        descricao = descricao.split("Descrição:", 1)[-1].strip()
+        data = processo_da_descricao(descricao)
+        if _conteudo(messages[0]) == PROMPT_COMPACTO:
+            return "```json\n" + json.dumps(compactar(data), ensure_ascii=False) + "\n```"
+        return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+
+    def invoke(self, messages):
+        if self.latencia:
+            time.sleep(self.latencia)
+        return _Resposta(self._texto(messages))
+
+    def stream(self, messages):
+        texto = self._texto(messages)
+        passos = range(0, len(texto), self.tamanho_chunk)
+        pausa = self.latencia / max(len(passos), 1)
+        for i in passos:
+            if pausa:
+                time.sleep(pausa)
+            yield _Resposta(texto[i:i + self.tamanho_chunk])
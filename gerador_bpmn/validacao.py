@@ -0,0 +1,290 @@
+"""Validação semântica do JSON do processo, com correção automática antes do layout
+
+`normalizar_processo` indexa os ids uma única vez e resolve, em tempo
+linear, o que impediria o XML de renderizar ou deixaria o diagrama
+incoerente: ids ausentes ou repetidos, tipos desconhecidos, papéis
+vazios, fluxos para elementos inexistentes, nós soltos e eventos de
+início/fim faltando. Cada ocorrência vira um `Problema`, corrigido ou não.
+"""
+
+from dataclasses import dataclass
+
+from .esquema import TIPOS_PERMITIDOS
+
+# Código do problema -> descrição (para logs e para a interface)
+PROBLEMAS = {
+    "processo_sem_nome": "processo sem nome",
+    "item_invalido": "item que não é objeto removido",
+    "id_ausente": "elemento ou fluxo sem id",
+    "id_numerico": "id numérico convertido em texto",
+    "nome_invalido": "nome que não é texto convertido",
+    "id_duplicado": "id repetido renomeado",
+    "tipo_desconhecido": "tipo de elemento fora do padrão corrigido",
+    "papel_ausente": "elemento sem papel (raia)",
+    "fluxo_sem_origem": "fluxo com origem inexistente removido",
+    "fluxo_sem_destino": "fluxo com destino inexistente removido",
+    "fluxo_repetido": "fluxo repetido entre os mesmos elementos removido",
+    "no_isolado": "elemento sem fluxos",
+    "sem_entrada": "elemento sem fluxo de entrada ligado ao início",
+    "sem_saida": "elemento sem fluxo de saída ligado ao fim",
+    "inicio_ausente": "evento de início criado",
+    "fim_ausente": "evento de fim criado",
+    "processo_vazio": "processo sem elementos",
+}
+
+PAPEL_PADRAO = "Geral"
+
+# Nomes que o modelo às vezes usa no lugar dos tipos BPMN aceitos
+_APELIDOS_TIPO = {
+    "start": "startEvent", "inicio": "startEvent", "início": "startEvent",
+    "end": "endEvent", "fim": "endEvent",
+    "gateway": "exclusiveGateway", "decisao": "exclusiveGateway", "decisão": "exclusiveGateway",
+    "xor": "exclusiveGateway", "and": "parallelGateway", "paralelo": "parallelGateway",
+    "manualtask": "userTask", "scripttask": "serviceTask", "sendtask": "serviceTask",
+    "receivetask": "task", "businessruletask": "serviceTask", "subprocess": "task",
+}
+_TIPOS_MINUSCULOS = {t.lower(): t for t in TIPOS_PERMITIDOS}
+_EVENTOS = ("startEvent", "endEvent")
+
+
+@dataclass(slots=True)
+class Problema:
+    codigo: str
+    mensagem: str
+    ids: tuple = ()
+    corrigido: bool = True
+
+    def to_dict(self) -> dict:
+        return {"codigo": self.codigo, "mensagem": self.mensagem, "ids": list(self.ids),
+                "corrigido": self.corrigido}
+
+
+def _tipo_normalizado(tipo) -> str:
+    """Tipo aceito mais próximo de `tipo` ("task" se nada combinar)"""
+    bruto = str(tipo or "").strip()
+    chave = bruto.lower().replace("_", "").replace(" ", "")
+    if chave in _TIPOS_MINUSCULOS:
+        return _TIPOS_MINUSCULOS[chave]
+    if chave in _APELIDOS_TIPO:
+        return _APELIDOS_TIPO[chave]
+    if "gateway" in chave:
+        return "parallelGateway" if "parallel" in chave else "exclusiveGateway"
+    if chave.endswith("event"):
+        if chave.startswith("start"):
+            return "startEvent"
+        if chave.startswith("end"):
+            return "endEvent"
+    if "service" in chave:
+        return "serviceTask"
+    if "user" in chave:
+        return "userTask"
+    return "task"
+
+
+def _como_id(valor):
+    """Ids numéricos (1, 2.0) viram texto; o resto fica como está"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return str(valor)
+    return valor
+
+
+def _corrigir_nome(item: dict, _problema) -> None:
+    nome = item.get("nome")
+    if nome is not None and not isinstance(nome, str):
+        item["nome"] = str(nome)
+        _problema("nome_invalido", (item.get("id"),), detalhe=repr(nome)[:40])
+
+
+class _Ids:
+    """Gera ids únicos frente aos já usados no processo"""
+
+    def __init__(self):
+        self.usados = set()
+
+    def novo(self, base: str) -> str:
+        eid, n = base, 2
+        while eid in self.usados:
+            eid = f"{base}_{n}"
+            n += 1
+        self.usados.add(eid)
+        return eid
+
+
+def normalizar_processo(data: dict) -> tuple[dict, list]:
+    """JSON corrigido (o original não é modificado) e a lista de `Problema` encontrados"""
+    if not isinstance(data, dict):
+        raise ValueError("O JSON do processo deve ser um objeto")
+    problemas = []
+
+    def _problema(codigo, ids=(), corrigido=True, detalhe=""):
+        mensagem = PROBLEMAS[codigo] + (f": {detalhe}" if detalhe else "")
+        problemas.append(Problema(codigo, mensagem, tuple(ids), corrigido))
+
+    processo = data.get("processo")
+    if not isinstance(processo, str) or not processo.strip():
+        _problema("processo_sem_nome")
+        processo = "Processo de Negócio"
+
+    ids = _Ids()
+    elementos = []
+    indice = {}  # id -> posição em `elementos` (primeira ocorrência)
+    for item in data.get("elementos") or []:
+        if not isinstance(item, dict):
+            _problema("item_invalido", detalhe=repr(item)[:40])
+            continue
+        elem = dict(item)
+
+        tipo = _tipo_normalizado(elem.get("tipo"))
+        eid = elem.get("id")
+        if not isinstance(eid, str) and _como_id(eid) != eid:
+            eid = elem["id"] = _como_id(eid)
+            _problema("id_numerico", (eid,))
+        if not isinstance(eid, str) or not eid.strip():
+            elem["id"] = ids.novo(f"{tipo[0].upper()}{tipo[1:]}_{len(elementos) + 1}")
+            _problema("id_ausente", (elem["id"],))
+        elif eid in ids.usados:
+            elem["id"] = ids.novo(eid)
+            _problema("id_duplicado", (eid, elem["id"]))
+        else:
+            ids.usados.add(eid)
+
+        if tipo != elem.get("tipo"):
+            _problema("tipo_desconhecido", (elem["id"],), detalhe=f"{elem.get('tipo')!r} -> {tipo}")
+            elem["tipo"] = tipo
+        _corrigir_nome(elem, _problema)
+
+        indice.setdefault(elem["id"], len(elementos))
+        elementos.append(elem)
+
+    if not elementos:
+        _problema("processo_vazio", corrigido=False)
+        return {"processo": processo, "elementos": [], "fluxos": []}, problemas
+
+    fluxos = []
+    pares = set()
+    entradas = [0] * len(elementos)
+    saidas = [0] * len(elementos)
+    for item in data.get("fluxos") or []:
+        if not isinstance(item, dict):
+            _problema("item_invalido", detalhe=repr(item)[:40])
+            continue
+        fluxo = dict(item)
+        origem, destino = fluxo.get("origem"), fluxo.get("destino")
+        if not (isinstance(origem, str) and isinstance(destino, str) and isinstance(fluxo.get("id"), str)):
+            for campo in ("id", "origem", "destino"):
+                valor = _como_id(fluxo.get(campo))
+                if valor != fluxo.get(campo):
+                    fluxo[campo] = valor
+                    if campo == "id":
+                        _problema("id_numerico", (valor,))
+            origem, destino = fluxo.get("origem"), fluxo.get("destino")
+        # Listas/dicts não são ids: contam como origem/destino ausentes
+        origem = indice.get(origem) if isinstance(origem, str) else None
+        destino = indice.get(destino) if isinstance(destino, str) else None
+        if origem is None:
+            _problema("fluxo_sem_origem", (fluxo.get("id"),), detalhe=str(fluxo.get("origem"))[:40])
+            continue
+        if destino is None:
+            _problema("fluxo_sem_destino", (fluxo.get("id"),), detalhe=str(fluxo.get("destino"))[:40])
+            continue
+        if (origem, destino) in pares:
+            _problema("fluxo_repetido", (fluxo.get("id"),))
+            continue
+        pares.add((origem, destino))
+
+        fid = fluxo.get("id")
+        if not isinstance(fid, str) or not fid.strip():
+            fluxo["id"] = ids.novo(f"Flow_{len(fluxos) + 1}")
+            _problema("id_ausente", (fluxo["id"],))
+        elif fid in ids.usados:
+            # Ids de fluxos e elementos compartilham o mesmo espaço no XML
+            fluxo["id"] = ids.novo(fid)
+            _problema("id_duplicado", (fid, fluxo["id"]))
+        else:
+            ids.usados.add(fid)
+        _corrigir_nome(fluxo, _problema)
+        saidas[origem] += 1
+        entradas[destino] += 1
+        fluxos.append(fluxo)
+
+    # Papel: herda o do primeiro vizinho que tiver um, senão o padrão
+    vizinho = [None] * len(elementos)
+    for fluxo in fluxos:
+        o, d = indice[fluxo["origem"]], indice[fluxo["destino"]]
+        if vizinho[d] is None:
+            vizinho[d] = o
+        if vizinho[o] is None:
+            vizinho[o] = d
+    for i, elem in enumerate(elementos):
+        papel = elem.get("papel")
+        if not isinstance(papel, str) or not papel.strip():
+            v = vizinho[i]
+            papel_vizinho = elementos[v].get("papel") if v is not None else None
+            elem["papel"] = papel_vizinho if isinstance(papel_vizinho, str) and papel_vizinho.strip() \
+                else PAPEL_PADRAO
+            _problema("papel_ausente", (elem["id"],), detalhe=elem["papel"])
+
+    # Pontas soltas: quem não tem entrada sai do início, quem não tem saída vai ao fim
+    inicio = next((i for i, e in enumerate(elementos) if e["tipo"] == "startEvent"), None)
+    fim = next((i for i, e in enumerate(elementos) if e["tipo"] == "endEvent"), None)
+    sem_entrada = [i for i, e in enumerate(elementos) if not entradas[i] and e["tipo"] not in _EVENTOS]
+    sem_saida = [i for i, e in enumerate(elementos) if not saidas[i] and e["tipo"] not in _EVENTOS]
+
+    for i in set(sem_entrada) & set(sem_saida):
+        _problema("no_isolado", (elementos[i]["id"],))
+
+    def _ligar(o: int, d: int):
+        fluxo = {"id": ids.novo(f"Flow_auto_{len(fluxos) + 1}"),
+                 "origem": elementos[o]["id"], "destino": elementos[d]["id"]}
+        pares.add((o, d))
+        fluxos.append(fluxo)
+
+    def _evento(tipo: str, nome: str, papel: str) -> int:
+        elementos.append({"id": ids.novo(f"{tipo[0].upper()}{tipo[1:]}_auto"), "tipo": tipo,
+                          "nome": nome, "papel": papel})
+        return len(elementos) - 1
+
+    originais = len(elementos)
+    if sem_entrada:
+        if inicio is None:
+            inicio = _evento("startEvent", "Início", elementos[sem_entrada[0]]["papel"])
+            _problema("inicio_ausente", (elementos[inicio]["id"],))
+        for i in sem_entrada:
+            if (inicio, i) not in pares:
+                _ligar(inicio, i)
+                _problema("sem_entrada", (elementos[i]["id"],))
+    if sem_saida:
+        if fim is None:
+            fim = _evento("endEvent", "Fim", elementos[sem_saida[-1]]["papel"])
+            _problema("fim_ausente", (elementos[fim]["id"],))
+        for i in sem_saida:
+            if (i, fim) not in pares:
+                _ligar(i, fim)
+                _problema("sem_saida", (elementos[i]["id"],))
+
+    # Um ciclo fechado (A -> B -> A) não deixa pontas soltas, mas ainda precisa de início e fim
+    if inicio is None:
+        inicio = _evento("startEvent", "Início", elementos[0]["papel"])
+        _ligar(inicio, 0)
+        _problema("inicio_ausente", (elementos[inicio]["id"], elementos[0]["id"]))
+    if fim is None:
+        ultimo = originais - 1
+        fim = _evento("endEvent", "Fim", elementos[ultimo]["papel"])
+        _ligar(ultimo, fim)
+        _problema("fim_ausente", (elementos[ultimo]["id"], elementos[fim]["id"]))
+
+    novo = dict(data)
+    novo.update(processo=processo, elementos=elementos, fluxos=fluxos)
+    return novo, problemas
+
+
+def validar_processo(data: dict) -> list:
+    """Só os problemas, sem usar o JSON corrigido"""
+    return normalizar_processo(data)[1]
+
+
+def descrever_problemas(problemas: list) -> str:
+    return "; ".join(
+        p.mensagem + (f" ({', '.join(str(i) for i in p.ids if i)})" if any(p.ids) else "")
+        for p in problemas
+    )
@@ -2,14 +2,22 @@ import warnings
 warnings.filterwarnings('ignore')
 
 import streamlit as st
-import streamlit.components.v1 as components
 import json
-import re
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
 import time
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from typing import Callable, Optional
+from gerador_bpmn import geracao
+from gerador_bpmn.agendador import Agendador
+from gerador_bpmn.cache import CacheRespostas
+from gerador_bpmn.clientes import RegistroClientes, registro_padrao
+from gerador_bpmn.coalescencia import Coalescedor
+from gerador_bpmn.esquema import suporta_saida_estruturada
+from gerador_bpmn.rastreio import metricas_padrao, rastreio
+from gerador_bpmn.renderizacao import renderizar_svg
+from gerador_bpmn.similaridade import IndiceSimilaridade
+from gerador_bpmn.incremental import (
+    LIMIAR_SIMILARIDADE, aplicar_patch, descrever_mudancas, diferenca_descricoes, montar_diagrama,
+)
+from visualizador import visualizador_bpmn
 
 # Configuração da Página
 st.set_page_config(
@@ -64,6 +72,13 @@ st.markdown("""
         border-color: #667eea;
         box-shadow: 0 2px 8px rgba(0,0,0,0.1);
     }
+    .previa-bpmn {
+        max-height: 500px;
+        overflow: auto;
+        background: #fafafa;
+        border: 1px solid #e0e0e0;
+        border-radius: 8px;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -75,6 +90,37 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def obter_cache_respostas() -> CacheRespostas:
+    """Cache compartilhado entre reruns e sessões"""
+    return CacheRespostas()
+
+@st.cache_resource
+def obter_registro_clientes() -> RegistroClientes:
+    """Clientes LLM mantidos abertos entre reruns e sessões"""
+    return registro_padrao()
+
+@st.cache_resource
+def obter_agendador() -> Agendador:
+    """Fila única por API Key para todas as sessões (limites via BPMN_RPM/BPMN_TPM)"""
+    return Agendador()
+
+@st.cache_resource
+def obter_coalescedor() -> Coalescedor:
+    """Gerações idênticas simultâneas (ex.: a turma toda no mesmo exemplo) viram uma só chamada"""
+    return Coalescedor()
+
+@st.cache_resource
+def obter_indice_similares() -> IndiceSimilaridade:
+    """Descrições já geradas, para reaproveitar o resultado de uma parecida"""
+    return IndiceSimilaridade()
+
+cache_respostas = obter_cache_respostas()
+registro_clientes = obter_registro_clientes()
+agendador = obter_agendador()
+coalescedor = obter_coalescedor()
+indice_similares = obter_indice_similares()
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.image("https://img.icons8.com/fluency/96/artificial-intelligence.png", width=80)
@@ -107,12 +153,110 @@ with st.sidebar:
         help="0 = preciso, 1 = criativo"
     )
     
+    estruturado_disponivel = suporta_saida_estruturada(modelo_selecionado)
+    usar_esquema = st.checkbox(
+        "🧩 Saída estruturada",
+        value=estruturado_disponivel,
+        disabled=not estruturado_disponivel,
+        help="Restringe a resposta da IA ao esquema JSON do processo e corrige só o que vier fora dele"
+    )
+    
+    usar_compacto = st.checkbox(
+        "⚡ Formato compacto",
+        value=False,
+        help="A IA responde num JSON enxuto (bem menos tokens, geração mais rápida), expandido aqui. "
+             "Não usa saída estruturada nem pré-visualização progressiva"
+    )
+    
+    modo_incremental = st.checkbox(
+        "✏️ Refinamento incremental",
+        value=True,
+        help="Ao editar a descrição, pede à IA só as alterações no diagrama anterior"
+    )
+    
     st.divider()
     
     # Opções avançadas
     with st.expander("🎨 Opções de Visualização"):
         mostrar_json = st.checkbox("Exibir JSON intermediário", value=False)
         mostrar_xml = st.checkbox("Exibir código XML", value=False)
+        usar_streaming = st.checkbox(
+            "Pré-visualização progressiva",
+            value=True,
+            help="Desenha o diagrama à medida que a IA gera os elementos"
+        )
+    
+    # Cache de respostas
+    with st.expander("♻️ Cache de Respostas"):
+        usar_cache = st.checkbox(
+            "Reutilizar respostas anteriores",
+            value=True,
+            help="Mesma descrição, modelo e temperatura retornam o resultado salvo sem chamar a IA"
+        )
+        stats_cache = cache_respostas.estatisticas()
+        st.caption(
+            f"Acertos: {stats_cache['hits_memoria'] + stats_cache['hits_disco']} · "
+            f"Falhas: {stats_cache['misses']} · "
+            f"Salvos: {stats_cache['itens_disco']}"
+        )
+        usar_similares = st.checkbox(
+            "Aproveitar descrições parecidas",
+            value=False,
+            help="Uma descrição quase igual a outra já gerada reutiliza aquele diagrama, "
+                 "ou pede à IA só as alterações das frases que mudaram"
+        )
+        stats_similares = indice_similares.estatisticas()
+        st.caption(
+            f"Parecidas encontradas: {stats_similares['acertos']} de {stats_similares['buscas']} · "
+            f"Indexadas: {stats_similares['itens']}"
+        )
+        if st.button("🗑️ Limpar cache", use_container_width=True):
+            cache_respostas.limpar()
+            indice_similares.limpar()
+            st.rerun()
+    
+    # Fila de requisições ao modelo
+    with st.expander("🚦 Fila de Requisições"):
+        metricas_fila = agendador.metricas()
+        st.caption(f"Limites: {agendador.rpm} req/min · {agendador.tpm:,} tokens/min")
+        st.caption(
+            f"Na fila: {metricas_fila['fila_total']} · "
+            f"Espera média: {metricas_fila['espera_media_s']:.1f}s · "
+            f"p95: {metricas_fila['espera_p95_s']:.1f}s"
+        )
+        st.caption(
+            f"Requisições: {metricas_fila['requisicoes']} · "
+            f"Retentativas: {metricas_fila['retentativas']} · "
+            f"429: {metricas_fila['erros_429']}"
+        )
+        metricas_coalescencia = coalescedor.metricas()
+        st.caption(
+            f"Pedidos idênticos simultâneos aproveitados: {metricas_coalescencia['coalescidas']} · "
+            f"Em andamento: {metricas_coalescencia['em_andamento']}"
+        )
+    
+    # Latência por etapa do pipeline (todas as sessões deste servidor)
+    with st.expander("📈 Desempenho por Etapa"):
+        resumo_metricas = metricas_padrao().resumo()
+        if resumo_metricas["etapas"]:
+            st.dataframe(
+                [
+                    {
+                        "etapa": nome,
+                        "n": dados["contagem"],
+                        "p50 (ms)": round(dados["p50_s"] * 1000, 1),
+                        "p95 (ms)": round(dados["p95_s"] * 1000, 1),
+                        "p99 (ms)": round(dados["p99_s"] * 1000, 1),
+                    }
+                    for nome, dados in resumo_metricas["etapas"].items()
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("Nenhuma geração ainda")
+        for nome, valor in resumo_metricas["contadores"].items():
+            st.caption(f"{nome}: {valor:g}")
     
     st.divider()
     
@@ -143,461 +287,64 @@ with st.sidebar:
 
 # --- FUNÇÕES AUXILIARES ---
 
-def extrair_json(texto: str) -> dict:
-    """Extrai JSON de texto com múltiplas estratégias"""
-    if not texto:
-        raise ValueError("Texto vazio retornado pelo modelo")
-    
-    texto_limpo = re.sub(r'```json', '', texto, flags=re.IGNORECASE)
-    texto_limpo = re.sub(r'```', '', texto_limpo)
-    
-    inicio = texto_limpo.find('{')
-    fim = texto_limpo.rfind('}')
-    
-    if inicio == -1 or fim == -1:
-        raise ValueError("JSON não encontrado na resposta")
-    
-    json_str = texto_limpo[inicio : fim + 1]
+def gerar_bpmn(
+    descricao: str,
+    modelo: str,
+    temp: float,
+    usar_cache: bool = True,
+    ao_parcial: Optional[Callable[[dict], None]] = None
+):
+    """Gera BPMN com a API Key, o cache e os clientes compartilhados da aplicação"""
+    if not api_key:
+        raise Exception("Configure a API Key na barra lateral!")
     
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        json_str_fixed = re.sub(r',\s*}', '}', json_str)
-        json_str_fixed = re.sub(r',\s*]', ']', json_str_fixed)
-        return json.loads(json_str_fixed)
+    return geracao.gerar_bpmn(
+        descricao,
+        modelo,
+        temp,
+        api_key=api_key,
+        cache=cache_respostas if usar_cache else None,
+        registro=registro_clientes,
+        ao_parcial=ao_parcial,
+        agendador=agendador,
+        estruturado=usar_esquema and suporta_saida_estruturada(modelo),
+        coalescedor=coalescedor,
+        compacto=usar_compacto,
+        similares=indice_similares if usar_similares else None
+    )
 
-def json_to_bpmn_xml(data: dict) -> str:
-    """Converte JSON em XML BPMN 2.0 com suporte a Pools e Lanes"""
+def gerar_patch(mudancas: str, anterior: dict, modelo: str, temp: float, usar_cache: bool = True) -> dict:
+    """Pede só as alterações no JSON anterior, com os recursos compartilhados da aplicação"""
+    if not api_key:
+        raise Exception("Configure a API Key na barra lateral!")
     
-    # Namespaces
-    ns = {
-        "bpmn": "http://www.omg.org/spec/BPMN/20100524/MODEL",
-        "bpmndi": "http://www.omg.org/spec/BPMN/20100524/DI",
-        "dc": "http://www.omg.org/spec/DD/20100524/DC",
-        "di": "http://www.omg.org/spec/DD/20100524/DI"
-    }
+    return geracao.gerar_patch_bpmn(
+        mudancas,
+        anterior,
+        modelo,
+        temp,
+        api_key=api_key,
+        cache=cache_respostas if usar_cache else None,
+        registro=registro_clientes,
+        agendador=agendador,
+        coalescedor=coalescedor
+    )
 
-    # Criar Root
-    root = ET.Element("bpmn:definitions")
-    for prefix, uri in ns.items():
-        root.set(f"xmlns:{prefix}", uri)
-    
-    root.set("id", "Definitions_1")
-    root.set("targetNamespace", "http://bpmn.io/schema/bpmn")
-    
-    elementos = data.get("elementos", [])
-    fluxos = data.get("fluxos", [])
-    
-    # 1. Identificar Papéis (Lanes) únicos
-    papeis = []
-    seen_roles = set()
-    
-    # Normalizar papéis para evitar duplicatas por case sensitive
-    for elem in elementos:
-        raw_role = elem.get("papel", "Geral").strip()
-        role_key = raw_role.lower()
-        elem['_role_normalized'] = role_key  # Guardar para uso posterior
-        elem['_role_display'] = raw_role
-        
-        if role_key not in seen_roles:
-            papeis.append(raw_role)
-            seen_roles.add(role_key)
-    
-    # Se não houver papéis, cria um padrão
-    if not papeis: 
-        papeis = ["Processo Principal"]
-
-    # Mapa de Papel -> Índice (para calcular Y)
-    role_map = {p.lower(): i for i, p in enumerate(papeis)}
-    
-    # 2. Estrutura de Colaboração
-    collaboration = ET.SubElement(root, "bpmn:collaboration")
-    collaboration.set("id", "Collaboration_1")
-    
-    participant = ET.SubElement(collaboration, "bpmn:participant")
-    participant.set("id", "Participant_1")
-    participant.set("name", data.get("processo", "Processo de Negócio"))
-    participant.set("processRef", "Process_1")
-    
-    # 3. Processo e LaneSet
-    process = ET.SubElement(root, "bpmn:process")
-    process.set("id", "Process_1")
-    process.set("isExecutable", "false")
-    
-    lane_set = ET.SubElement(process, "bpmn:laneSet")
-    lane_set.set("id", "LaneSet_1")
-    
-    lane_ids = {} # Map role -> lane_id
-    
-    for i, papel in enumerate(papeis):
-        lane_id = f"Lane_{i}"
-        lane = ET.SubElement(lane_set, "bpmn:lane")
-        lane.set("id", lane_id)
-        lane.set("name", papel)
-        lane_ids[papel.lower()] = lane_id
-        
-        # Adicionar flowNodeRef para elementos deste papel
-        for elem in elementos:
-            if elem.get('_role_normalized') == papel.lower():
-                ref = ET.SubElement(lane, "bpmn:flowNodeRef")
-                ref.text = elem.get("id")
-    
-    # 4. Criar Elementos no Processo
-    node_map = {}
-    
-    tag_map = {
-        "startEvent": "bpmn:startEvent",
-        "endEvent": "bpmn:endEvent",
-        "task": "bpmn:task",
-        "userTask": "bpmn:userTask",
-        "serviceTask": "bpmn:serviceTask",
-        "exclusiveGateway": "bpmn:exclusiveGateway",
-        "parallelGateway": "bpmn:parallelGateway"
-    }
+def memo_sessao(etapa: str, chave, calcular: Callable[[], object]):
+    """Resultado de `calcular()` guardado na sessão enquanto a chave da etapa não mudar
 
-    for elem in elementos:
-        tipo = elem.get("tipo", "task")
-        bpmn_tag = tag_map.get(tipo, "bpmn:task")
-        
-        node = ET.SubElement(process, bpmn_tag)
-        node.set("id", elem.get("id"))
-        if elem.get("nome"):
-            node.set("name", elem.get("nome"))
-            
-        node_map[elem.get("id")] = node
-
-    # 5. Criar Fluxos
-    for fluxo in fluxos:
-        flow = ET.SubElement(process, "bpmn:sequenceFlow")
-        flow.set("id", fluxo.get("id"))
-        flow.set("sourceRef", fluxo.get("origem"))
-        flow.set("targetRef", fluxo.get("destino"))
-        
-        # Conectar nos nós
-        src = node_map.get(fluxo.get("origem"))
-        tgt = node_map.get(fluxo.get("destino"))
-        if src is not None:
-            out_node = ET.SubElement(src, "bpmn:outgoing")
-            out_node.text = fluxo.get("id")
-        if tgt is not None:
-            in_node = ET.SubElement(tgt, "bpmn:incoming")
-            in_node.text = fluxo.get("id")
-
-    # === CÁLCULO DE LAYOUT (DI) ===
-    
-    # Configurações
-    LANE_HEIGHT = 200
-    LANE_HEADER_WIDTH = 30
-    START_X = 150  # Margem esquerda
-    ITEM_WIDTH = 100
-    ITEM_SPACING = 160
-    
-    # Construir grafo para definir eixo X (níveis)
-    graph_out = {e['id']: [] for e in elementos}
-    in_degree = {e['id']: 0 for e in elementos}
-    
-    for f in fluxos:
-        if f['origem'] in graph_out and f['destino'] in in_degree:
-            graph_out[f['origem']].append(f['destino'])
-            in_degree[f['destino']] += 1
-            
-    # Níveis (Topological Sort simplificado)
-    levels = {}
-    queue = [eid for eid, deg in in_degree.items() if deg == 0]
-    curr_level = 0
-    
-    while queue:
-        next_queue = []
-        for node in queue:
-            levels[node] = curr_level
-            for neighbor in graph_out[node]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    next_queue.append(neighbor)
-        queue = next_queue
-        curr_level += 1
-        
-    # Calcular coordenadas dos elementos
-    max_level = 0
-    for elem in elementos:
-        eid = elem['id']
-        level = levels.get(eid, 0)
-        max_level = max(max_level, level)
-        
-        role_idx = role_map.get(elem['_role_normalized'], 0)
-        
-        # Dimensões baseadas no tipo
-        if "Event" in elem.get("tipo", ""):
-            w, h = 36, 36
-        elif "Gateway" in elem.get("tipo", ""):
-            w, h = 50, 50
-        else:
-            w, h = 100, 80
-            
-        # Posição X baseada no nível (sequência)
-        x = START_X + (level * ITEM_SPACING)
-        
-        # Posição Y baseada na Lane (Papel)
-        # Centralizar verticalmente na lane
-        lane_y_start = role_idx * LANE_HEIGHT
-        y = lane_y_start + (LANE_HEIGHT - h) / 2
-        
-        elem['_x'] = x
-        elem['_y'] = y
-        elem['_width'] = w
-        elem['_height'] = h
-        elem['_cx'] = x + w/2
-        elem['_cy'] = y + h/2
-
-    # Calcular tamanho total do diagrama
-    total_width = START_X + ((max_level + 1) * ITEM_SPACING) + 100
-    total_height = len(papeis) * LANE_HEIGHT
-
-    # === GERAR DIAGRAMA (BPMNDI) ===
-    diagram = ET.SubElement(root, "bpmndi:BPMNDiagram")
-    diagram.set("id", "BPMNDiagram_1")
-    plane = ET.SubElement(diagram, "bpmndi:BPMNPlane")
-    plane.set("id", "BPMNPlane_1")
-    plane.set("bpmnElement", "Collaboration_1")
-
-    # 1. Shapes das Lanes e Participant
-    # Participant (Pool inteira)
-    shape_pool = ET.SubElement(plane, "bpmndi:BPMNShape")
-    shape_pool.set("id", "Participant_1_di")
-    shape_pool.set("bpmnElement", "Participant_1")
-    shape_pool.set("isHorizontal", "true")
-    
-    bounds_pool = ET.SubElement(shape_pool, "dc:Bounds")
-    bounds_pool.set("x", "50")
-    bounds_pool.set("y", "0")
-    bounds_pool.set("width", str(int(total_width)))
-    bounds_pool.set("height", str(int(total_height)))
-    
-    # Shapes individuais das Lanes (Opcional em alguns renderizadores, mas bom para compatibilidade)
-    for i, papel in enumerate(papeis):
-        lid = lane_ids[papel.lower()]
-        shape_lane = ET.SubElement(plane, "bpmndi:BPMNShape")
-        shape_lane.set("id", f"{lid}_di")
-        shape_lane.set("bpmnElement", lid)
-        shape_lane.set("isHorizontal", "true")
-        
-        b_lane = ET.SubElement(shape_lane, "dc:Bounds")
-        b_lane.set("x", "80") # 30px offset para o header da pool
-        b_lane.set("y", str(i * LANE_HEIGHT))
-        b_lane.set("width", str(int(total_width - 30)))
-        b_lane.set("height", str(LANE_HEIGHT))
-
-    # 2. Shapes dos Elementos
-    for elem in elementos:
-        shape = ET.SubElement(plane, "bpmndi:BPMNShape")
-        shape.set("id", f"{elem['id']}_di")
-        shape.set("bpmnElement", elem['id'])
-        
-        b = ET.SubElement(shape, "dc:Bounds")
-        b.set("x", str(int(elem['_x'])))
-        b.set("y", str(int(elem['_y'])))
-        b.set("width", str(int(elem['_width'])))
-        b.set("height", str(int(elem['_height'])))
-
-    # 3. Edges (Fluxos)
-    elem_dict = {e['id']: e for e in elementos}
-    
-    for fluxo in fluxos:
-        edge = ET.SubElement(plane, "bpmndi:BPMNEdge")
-        edge.set("id", f"{fluxo['id']}_di")
-        edge.set("bpmnElement", fluxo['id'])
-        
-        origem = elem_dict.get(fluxo['origem'])
-        destino = elem_dict.get(fluxo['destino'])
-        
-        if origem and destino:
-            # Lógica simples de waypoint: Centro-Direita -> Centro-Esquerda
-            x1 = int(origem['_x'] + origem['_width'])
-            y1 = int(origem['_cy'])
-            x2 = int(destino['_x'])
-            y2 = int(destino['_cy'])
-            
-            # Ponto 1: Saída
-            wp1 = ET.SubElement(edge, "di:waypoint")
-            wp1.set("x", str(x1))
-            wp1.set("y", str(y1))
-            
-            # Pontos intermediários para troca de Lane (se necessário)
-            # Se a diferença de altura for grande, faz um degrau
-            if abs(y1 - y2) > 20:
-                mid_x = x1 + (x2 - x1) // 2
-                
-                wpm1 = ET.SubElement(edge, "di:waypoint")
-                wpm1.set("x", str(mid_x))
-                wpm1.set("y", str(y1))
-                
-                wpm2 = ET.SubElement(edge, "di:waypoint")
-                wpm2.set("x", str(mid_x))
-                wpm2.set("y", str(y2))
-            
-            # Ponto Final: Entrada
-            wp2 = ET.SubElement(edge, "di:waypoint")
-            wp2.set("x", str(x2))
-            wp2.set("y", str(y2))
-
-    xml_string = ET.tostring(root, encoding='unicode')
-    dom = minidom.parseString(xml_string)
-    return '\n'.join([line for line in dom.toprettyxml(indent="  ").split('\n') if line.strip()])
-
-def create_bpmn_viewer(xml_content: str) -> str:
-    """Cria visualizador BPMN interativo"""
-    xml_escaped = xml_content.replace('\\', '\\\\').replace('`', '\\`').replace('$', '\\$')
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <script src="https://unpkg.com/bpmn-js@17.11.1/dist/bpmn-viewer.production.min.js"></script>
-        <style>
-            body {{ margin: 0; padding: 0; font-family: 'Segoe UI', sans-serif; }}
-            #canvas {{ width: 100%; height: 650px; background: #fafafa; border-radius: 8px; border: 1px solid #e0e0e0; }}
-            .controls {{
-                position: absolute;
-                top: 15px;
-                right: 15px;
-                background: white;
-                padding: 10px;
-                border-radius: 8px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                display: flex;
-                gap: 8px;
-                z-index: 1000;
-            }}
-            button {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 500;
-                transition: all 0.2s;
-            }}
-            button:hover {{
-                transform: translateY(-2px);
-                box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-            }}
-            .zoom-display {{
-                background: #f8f9fa;
-                padding: 8px 12px;
-                border-radius: 6px;
-                font-size: 13px;
-                color: #333;
-                font-weight: 500;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="controls">
-            <button onclick="zoomIn()">🔍 +</button>
-            <button onclick="zoomOut()">🔍 −</button>
-            <button onclick="zoomFit()">⚡ Ajustar</button>
-            <button onclick="downloadSVG()">📥 SVG</button>
-            <div class="zoom-display" id="zoom">100%</div>
-        </div>
-        <div id="canvas"></div>
-        <script>
-            const viewer = new BpmnJS({{ container: '#canvas' }});
-            
-            viewer.importXML(`{xml_escaped}`).then(() => {{
-                viewer.get('canvas').zoom('fit-viewport');
-                updateZoom();
-            }}).catch(err => {{
-                console.error('Erro:', err);
-                document.getElementById('canvas').innerHTML = 
-                    '<div style="padding: 50px; text-align: center; color: #d32f2f;">❌ Erro ao renderizar diagrama</div>';
-            }});
-            
-            function zoomIn() {{
-                const canvas = viewer.get('canvas');
-                canvas.zoom(canvas.zoom() + 0.1);
-                updateZoom();
-            }}
-            
-            function zoomOut() {{
-                const canvas = viewer.get('canvas');
-                canvas.zoom(canvas.zoom() - 0.1);
-                updateZoom();
-            }}
-            
-            function zoomFit() {{
-                viewer.get('canvas').zoom('fit-viewport');
-                updateZoom();
-            }}
-            
-            function updateZoom() {{
-                const zoom = Math.round(viewer.get('canvas').zoom() * 100);
-                document.getElementById('zoom').textContent = zoom + '%';
-            }}
-            
-            async function downloadSVG() {{
-                try {{
-                    const {{ svg }} = await viewer.saveSVG();
-                    const blob = new Blob([svg], {{ type: 'image/svg+xml' }});
-                    const url = URL.createObjectURL(blob);
-                    const a = document.createElement('a');
-                    a.href = url;
-                    a.download = 'diagrama-bpmn.svg';
-                    a.click();
-                    URL.revokeObjectURL(url);
-                }} catch (err) {{
-                    console.error('Erro ao baixar:', err);
-                }}
-            }}
-        </script>
-    </body>
-    </html>
+    Um valor por etapa: a memória da sessão não cresce a cada geração.
     """
+    memo = st.session_state.setdefault('memo', {})
+    guardado = memo.get(etapa)
+    if guardado is not None and guardado[0] == chave:
+        return guardado[1]
+    valor = calcular()
+    memo[etapa] = (chave, valor)
+    return valor
 
-PROMPT_SYSTEM = """Você é um especialista em BPMN 2.0. Converta a descrição em JSON estruturado com foco em POOLS e LANES.
-
-ESTRUTURA OBRIGATÓRIA:
-{
-  "processo": "Nome do Processo",
-  "elementos": [
-    {"id": "StartEvent_1", "tipo": "startEvent", "nome": "Início", "papel": "Cliente"},
-    {"id": "Task_1", "tipo": "task", "nome": "Solicitar Pedido", "papel": "Cliente"},
-    {"id": "Task_2", "tipo": "userTask", "nome": "Aprovar Pedido", "papel": "Gerente"},
-    {"id": "EndEvent_1", "tipo": "endEvent", "nome": "Fim", "papel": "Cliente"}
-  ],
-  "fluxos": [
-    {"id": "Flow_1", "origem": "StartEvent_1", "destino": "Task_1"},
-    {"id": "Flow_2", "origem": "Task_1", "destino": "Task_2"}
-  ]
-}
-
-REGRAS:
-1. "papel" é OBRIGATÓRIO (Ex: Cliente, Sistema, Gerente, RH). Agrupe tarefas do mesmo ator.
-2. TIPOS PERMITIDOS: startEvent, endEvent, task, userTask, serviceTask, exclusiveGateway, parallelGateway.
-3. Se o papel não estiver claro, use "Sistema".
-RETORNE APENAS O JSON."""
-
-def gerar_bpmn(descricao: str, modelo: str, temp: float):
-    """Gera BPMN usando Gemini via LangChain"""
-    if not api_key:
-        raise Exception("Configure a API Key na barra lateral!")
-    
-    llm = ChatGoogleGenerativeAI(
-        model=modelo,
-        temperature=temp,
-        google_api_key=api_key,
-        convert_system_message_to_human=True
-    )
-    
-    messages = [
-        SystemMessage(content=PROMPT_SYSTEM),
-        HumanMessage(content=f"Descrição: {descricao}")
-    ]
-    
-    response = llm.invoke(messages)
-    return extrair_json(response.content)
+def memo_sessao_descartar(etapa: str) -> None:
+    st.session_state.get('memo', {}).pop(etapa, None)
 
 # --- EXEMPLOS ---
 EXEMPLOS = {
@@ -647,6 +394,30 @@ EXEMPLOS = {
     }
 }
 
+def preview_parcial(placeholder, intervalo: float = 0.4) -> Callable[[dict], None]:
+    """Callback que redesenha o diagrama parcial no placeholder (com limite de frequência)"""
+    ultimo = [0.0]
+    
+    def _render(parcial: dict):
+        agora = time.time()
+        if ultimo[0] and agora - ultimo[0] < intervalo:
+            return
+        ultimo[0] = agora
+        ids = {e.get("id") for e in parcial["elementos"]}
+        data = {
+            "processo": parcial["processo"] or "Gerando...",
+            "elementos": parcial["elementos"],
+            # Fluxos cujo destino ainda não chegou ficam de fora da prévia
+            "fluxos": [f for f in parcial["fluxos"] if f.get("origem") in ids and f.get("destino") in ids]
+        }
+        with placeholder.container():
+            st.caption(f"⏳ {len(data['elementos'])} elementos · {len(data['fluxos'])} fluxos recebidos...")
+            # SVG local em vez do componente: dentro de uma execução o Streamlit não aceita a mesma
+            # key duas vezes, e uma key por prévia criava um iframe (e recarregava o bpmn-js) a cada render
+            st.markdown(f'<div class="previa-bpmn">{renderizar_svg(data)}</div>', unsafe_allow_html=True)
+    
+    return _render
+
 # --- INTERFACE PRINCIPAL ---
 
 # Seção de Exemplos
@@ -679,6 +450,9 @@ with col_btn1:
 with col_btn2:
     if st.button("🔄 Limpar", use_container_width=True):
         st.session_state['texto_processo'] = ''
+        st.session_state.pop('diagrama_anterior', None)
+        st.session_state.pop('resultado', None)
+        st.session_state.pop('memo', None)
         st.rerun()
 
 with col_btn3:
@@ -687,70 +461,73 @@ with col_btn3:
 # Processamento
 if btn_gerar and texto_input and api_key:
     
-    with st.spinner("🤖 IA trabalhando..."):
+    with st.spinner("🤖 IA trabalhando..."), rastreio() as rastro:
         inicio = time.time()
         
         try:
-            # Gerar JSON
-            json_data = gerar_bpmn(texto_input, modelo_selecionado, temperatura)
-            
-            # Converter para XML
-            xml_data = json_to_bpmn_xml(json_data)
+            # Refinamento: só vale para uma edição pequena da última descrição, no mesmo modelo
+            anterior = st.session_state.get('diagrama_anterior')
+            diferenca = None
+            if modo_incremental and anterior is not None \
+                    and st.session_state.get('modelo_anterior') == modelo_selecionado:
+                diferenca = diferenca_descricoes(st.session_state['descricao_anterior'], texto_input)
+                if diferenca['similaridade'] < LIMIAR_SIMILARIDADE:
+                    diferenca = None
             
-            tempo_total = time.time() - inicio
-            
-            # Métricas
-            st.success(f"✅ Diagrama gerado em {tempo_total:.2f} segundos!")
-            
-            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-            col_m1.metric("⏱️ Tempo", f"{tempo_total:.1f}s")
-            col_m2.metric("📦 Elementos", len(json_data.get("elementos", [])))
-            col_m3.metric("➡️ Fluxos", len(json_data.get("fluxos", [])))
-            col_m4.metric("📄 Linhas XML", len(xml_data.split('\n')))
-            
-            st.divider()
-            
-            # Visualização
-            st.markdown("### 🎨 Diagrama Interativo")
-            html_viewer = create_bpmn_viewer(xml_data)
-            components.html(html_viewer, height=700, scrolling=False)
-            
-            # Debug opcional
-            if mostrar_json:
-                st.divider()
-                with st.expander("🔍 JSON Intermediário"):
-                    st.json(json_data)
-            
-            if mostrar_xml:
-                st.divider()
-                with st.expander("📄 Código XML BPMN 2.0"):
-                    st.code(xml_data, language="xml", line_numbers=True)
-            
-            # Downloads
-            st.divider()
-            st.markdown("### 📥 Downloads")
-            col_d1, col_d2, col_d3 = st.columns(3)
-            
-            with col_d1:
-                st.download_button(
-                    "⬇️ Baixar .bpmn",
-                    xml_data,
-                    "processo.bpmn",
-                    "application/xml",
-                    use_container_width=True
+            if diferenca is not None:
+                # Gerar só o patch (ou nada, se a descrição não mudou)
+                json_data = anterior.data
+                if diferenca['removidas'] or diferenca['adicionadas']:
+                    patch = gerar_patch(
+                        descrever_mudancas(diferenca),
+                        anterior.data,
+                        modelo_selecionado,
+                        temperatura,
+                        usar_cache
+                    )
+                    json_data = aplicar_patch(anterior.data, patch)
+            else:
+                # Gerar JSON (mesmas entradas de antes na sessão: nenhuma chamada ao modelo)
+                estruturado = usar_esquema and suporta_saida_estruturada(modelo_selecionado)
+                chave_geracao = (
+                    texto_input, modelo_selecionado, temperatura, estruturado, usar_compacto, usar_similares
                 )
+                
+                def _gerar():
+                    placeholder_preview = st.empty()
+                    data = gerar_bpmn(
+                        texto_input,
+                        modelo_selecionado,
+                        temperatura,
+                        usar_cache,
+                        ao_parcial=preview_parcial(placeholder_preview) if usar_streaming else None
+                    )
+                    placeholder_preview.empty()
+                    return data
+                
+                # Sem cache, "Gerar" sempre pede uma resposta nova
+                if not usar_cache:
+                    memo_sessao_descartar("geracao")
+                json_data = memo_sessao("geracao", chave_geracao, _gerar)
+                anterior = None
             
-            with col_d2:
-                st.download_button(
-                    "⬇️ Baixar JSON",
-                    json.dumps(json_data, indent=2, ensure_ascii=False),
-                    "processo.json",
-                    "application/json",
-                    use_container_width=True
-                )
+            # Layout, rotas e XML só são refeitos se o JSON mudou
+            chave_json = json.dumps(json_data, sort_keys=True, ensure_ascii=False)
+            diagrama = memo_sessao("diagrama", chave_json, lambda: montar_diagrama(json_data, anterior))
+            xml_data = memo_sessao("xml", chave_json, diagrama.xml)
             
-            with col_d3:
-                st.info(f"🎯 Modelo: {modelo_selecionado}")
+            st.session_state['diagrama_anterior'] = diagrama
+            st.session_state['descricao_anterior'] = texto_input
+            st.session_state['modelo_anterior'] = modelo_selecionado
+            st.session_state['resultado'] = {
+                'chave': chave_json,
+                'diagrama': diagrama,
+                'xml': xml_data,
+                'tempo': time.time() - inicio,
+                'etapas': rastro.duracoes(),
+                'diferenca': diferenca,
+                'modelo': modelo_selecionado,
+            }
             
         except Exception as e:
             st.error(f"❌ Erro: {str(e)}")
@@ -763,6 +540,95 @@ elif btn_gerar and not api_key:
 elif btn_gerar and not texto_input:
     st.warning("⚠️ Descreva o processo antes de gerar o diagrama!")
 
+# Resultado: desenhado a cada rerun a partir do que ficou na sessão
+# (alternar "Exibir JSON/XML" não chama o modelo nem refaz o XML)
+resultado = st.session_state.get('resultado')
+if resultado is not None:
+    diagrama = resultado['diagrama']
+    diferenca = resultado['diferenca']
+    json_data = diagrama.data
+    xml_data = resultado['xml']
+    tempo_total = resultado['tempo']
+    
+    # Métricas
+    st.success(f"✅ Diagrama gerado em {tempo_total:.2f} segundos!")
+    if diferenca is not None:
+        st.caption(
+            f"✏️ Atualização incremental: {len(diferenca['adicionadas'])} frase(s) nova(s), "
+            f"{len(diferenca['removidas'])} removida(s) · "
+            f"{diagrama.rotas_reaproveitadas}/{len(diagrama.rotas)} rotas reaproveitadas"
+        )
+    if diagrama.problemas:
+        with st.expander(f"🩹 {len(diagrama.problemas)} correção(ões) automática(s) no JSON"):
+            for problema in diagrama.problemas:
+                ids = ", ".join(str(i) for i in problema.ids if i)
+                marca = "✅" if problema.corrigido else "⚠️"
+                st.markdown(f"{marca} {problema.mensagem}" + (f" — `{ids}`" if ids else ""))
+    
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+    col_m1.metric("⏱️ Tempo", f"{tempo_total:.1f}s")
+    col_m2.metric("📦 Elementos", len(json_data.get("elementos", [])))
+    col_m3.metric("➡️ Fluxos", len(json_data.get("fluxos", [])))
+    col_m4.metric("📄 Linhas XML", xml_data.count('\n') + 1)
+    if resultado['etapas']:
+        st.caption("⏱️ " + " · ".join(
+            f"{nome}: {segundos * 1000:.0f} ms" for nome, segundos in resultado['etapas'].items()
+        ))
+    
+    st.divider()
+    
+    # Visualização
+    st.markdown("### 🎨 Diagrama Interativo")
+    # key fixa: o iframe sobrevive aos reruns e só reimporta se o XML mudar
+    visualizador_bpmn(xml_data, altura=700, key="visualizador_bpmn")
+    
+    # Debug opcional
+    if mostrar_json:
+        st.divider()
+        with st.expander("🔍 JSON Intermediário"):
+            st.json(json_data)
+    
+    if mostrar_xml:
+        st.divider()
+        with st.expander("📄 Código XML BPMN 2.0"):
+            st.code(xml_data, language="xml", line_numbers=True)
+    
+    # Downloads
+    st.divider()
+    st.markdown("### 📥 Downloads")
+    col_d1, col_d2, col_d3, col_d4 = st.columns(4)
+    
+    with col_d1:
+        st.download_button(
+            "⬇️ Baixar .bpmn",
+            xml_data,
+            "processo.bpmn",
+            "application/xml",
+            use_container_width=True
+        )
+    
+    with col_d2:
+        st.download_button(
+            "⬇️ Baixar JSON",
+            memo_sessao("json", resultado['chave'], lambda: json.dumps(json_data, indent=2, ensure_ascii=False)),
+            "processo.json",
+            "application/json",
+            use_container_width=True
+        )
+    
+    with col_d3:
+        # Renderizado no servidor a partir do layout já calculado
+        st.download_button(
+            "⬇️ Baixar .svg",
+            memo_sessao("svg", resultado['chave'], diagrama.svg),
+            "processo.svg",
+            "image/svg+xml",
+            use_container_width=True
+        )
+    
+    with col_d4:
+        st.info(f"🎯 Modelo: {resultado['modelo']}")
+
 # Footer
 st.divider()
 col_f1, col_f2, col_f3 = st.columns(3)
@@ -0,0 +1,142 @@
+"""Agendador: baldes RPM/TPM e prioridades, com relógio falso (sem esperar os minutos de verdade)"""
+
+import threading
+import time
+
+import pytest
+
+from gerador_bpmn.agendador import PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, Agendador, BaldeTokens
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+        self.agendador = None
+
+    def __call__(self) -> float:
+        return self.agora
+
+    def avancar(self, segundos: float) -> None:
+        self.agora += segundos
+        if self.agendador is not None:
+            # Quem espera reavalia o balde com o novo horário
+            with self.agendador._cond:
+                self.agendador._cond.notify_all()
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+def criar(relogio, **kwargs) -> Agendador:
+    relogio.agendador = Agendador(relogio=relogio, **kwargs)
+    return relogio.agendador
+
+
+def em_thread(agendador, nome, feitos, **kwargs) -> threading.Thread:
+    def _chamar():
+        agendador.executar("k", lambda: feitos.append(nome), **kwargs)
+
+    thread = threading.Thread(target=_chamar, daemon=True)
+    thread.start()
+    return thread
+
+
+def esperar_fila(agendador, tamanho: int) -> None:
+    limite = time.monotonic() + 5
+    while agendador.metricas()["fila_total"] != tamanho:
+        assert time.monotonic() < limite, "a fila não chegou ao tamanho esperado"
+        time.sleep(0.001)
+
+
+def test_balde_repoe_continuamente_ate_a_capacidade(relogio):
+    balde = BaldeTokens(capacidade=10, por_minuto=60, relogio=relogio)
+    balde.consumir(10)
+    assert balde.tempo_ate(1) == pytest.approx(1.0)
+    relogio.avancar(3)
+    assert balde.tempo_ate(3) == 0.0
+    assert balde.tempo_ate(4) == pytest.approx(1.0)
+    relogio.avancar(600)
+    balde.consumir(0)
+    assert balde.nivel == 10  # não passa da capacidade
+
+
+def test_balde_ajuste_pode_deixar_nivel_negativo(relogio):
+    balde = BaldeTokens(capacidade=100, por_minuto=60, relogio=relogio)
+    balde.consumir(50)
+    balde.ajustar(80)  # consumo real foi 80 a mais que o estimado
+    assert balde.nivel == -30
+    assert balde.tempo_ate(10) == pytest.approx(40.0)
+
+
+def test_rpm_segura_a_chamada_excedente(relogio):
+    agendador = criar(relogio, rpm=2, tpm=10_000)
+    feitos = []
+    agendador.executar("k", lambda: feitos.append(1))
+    agendador.executar("k", lambda: feitos.append(2))
+    terceira = em_thread(agendador, 3, feitos)
+    esperar_fila(agendador, 1)
+    relogio.avancar(29)  # 2 por minuto: um token a cada 30 s
+    terceira.join(0.05)
+    assert feitos == [1, 2] and terceira.is_alive()
+    relogio.avancar(1)
+    terceira.join(5)
+    assert feitos == [1, 2, 3]
+    assert agendador.metricas()["espera_max_s"] == pytest.approx(30.0)
+
+
+def test_tpm_segura_e_corrige_com_tokens_reais(relogio):
+    agendador = criar(relogio, rpm=1000, tpm=100)
+    feitos = []
+    # Estimou 80, gastou 20: o balde volta a ter 80
+    agendador.executar("k", lambda: feitos.append(1), tokens_estimados=80, tokens_reais=lambda _: 20)
+    agendador.executar("k", lambda: feitos.append(2), tokens_estimados=80)
+    terceira = em_thread(agendador, 3, feitos, tokens_estimados=60)
+    esperar_fila(agendador, 1)
+    relogio.avancar(35)  # faltam 60 tokens a 100/min: 36 s
+    terceira.join(0.05)
+    assert terceira.is_alive()
+    relogio.avancar(1)
+    terceira.join(5)
+    assert feitos == [1, 2, 3]
+
+
+def test_chaves_tem_baldes_separados(relogio):
+    agendador = criar(relogio, rpm=1, tpm=10_000)
+    feitos = []
+    agendador.executar("a", lambda: feitos.append("a"))
+    agendador.executar("b", lambda: feitos.append("b"))
+    assert feitos == ["a", "b"]
+
+
+def test_interativa_passa_na_frente_do_lote(relogio):
+    agendador = criar(relogio, rpm=1, tpm=10_000)
+    feitos = []
+    agendador.executar("k", lambda: feitos.append("primeira"))
+    lote = em_thread(agendador, "lote", feitos, prioridade=PRIORIDADE_LOTE)
+    esperar_fila(agendador, 1)
+    interativa = em_thread(agendador, "interativa", feitos, prioridade=PRIORIDADE_INTERATIVA)
+    esperar_fila(agendador, 2)
+
+    relogio.avancar(60)
+    interativa.join(5)
+    lote.join(0.05)
+    assert feitos == ["primeira", "interativa"] and lote.is_alive()
+    relogio.avancar(60)
+    lote.join(5)
+    assert feitos == ["primeira", "interativa", "lote"]
+
+
+def test_mesma_prioridade_e_fifo(relogio):
+    agendador = criar(relogio, rpm=1, tpm=10_000)
+    feitos = []
+    agendador.executar("k", lambda: feitos.append(0))
+    threads = []
+    for i in range(1, 4):
+        threads.append(em_thread(agendador, i, feitos, prioridade=PRIORIDADE_LOTE))
+        esperar_fila(agendador, i)
+    for thread in threads:
+        relogio.avancar(60)
+        thread.join(5)
+    assert feitos == [0, 1, 2, 3]
@@ -0,0 +1,102 @@
+"""Cache de respostas: LRU, TTL, chave normalizada e persistência no SQLite"""
+
+import types
+
+import pytest
+
+from gerador_bpmn import cache as modulo
+from gerador_bpmn.cache import CacheRespostas, chave_cache
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio manual: `relogio.agora` é o que time.time() devolve dentro de cache.py"""
+    falso = types.SimpleNamespace(agora=1_000_000.0)
+    falso.time = lambda: falso.agora
+    monkeypatch.setattr(modulo, "time", falso)
+    return falso
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheRespostas(caminho=None, max_memoria=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # "a" passa a ser o mais recente
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+    assert cache.estatisticas()["itens_memoria"] == 2
+
+
+def test_get_devolve_copia():
+    cache = CacheRespostas(caminho=None)
+    cache.set("a", {"elementos": []})
+    cache.get("a")["elementos"].append("x")
+    assert cache.get("a") == {"elementos": []}
+
+
+@pytest.mark.parametrize("persistente", [False, True])
+def test_ttl_expira(relogio, tmp_path, persistente):
+    cache = CacheRespostas(caminho=str(tmp_path / "c.sqlite3") if persistente else None, ttl=60)
+    cache.set("a", {"v": 1})
+    relogio.agora += 59
+    assert cache.get("a") == {"v": 1}
+    relogio.agora += 2
+    assert cache.get("a") is None
+    assert cache.estatisticas()["itens_disco"] == 0
+
+
+@pytest.mark.parametrize("outra", [
+    "Cliente  envia\tpedido\n\nGerente aprova",
+    "  Cliente envia pedido  \r\nGerente aprova\n",
+    "Cliente envia pedido\nGerente aprova",
+])
+def test_chave_ignora_espacamento(outra):
+    base = chave_cache("Cliente envia pedido\nGerente aprova", "P", "m", 0.1)
+    assert chave_cache(outra, "P", "m", 0.1) == base
+
+
+def test_chave_ignora_forma_unicode():
+    composto = "Funcion\u00e1rio aprova"
+    decomposto = "Funciona\u0301rio aprova"
+    assert chave_cache(composto, "P", "m", 0.1) == chave_cache(decomposto, "P", "m", 0.1)
+
+
+@pytest.mark.parametrize("diferente", [
+    ("Cliente envia pedidos", "P", "m", 0.1),
+    ("Cliente envia pedido", "Q", "m", 0.1),
+    ("Cliente envia pedido", "P", "n", 0.1),
+    ("Cliente envia pedido", "P", "m", 0.2),
+    ("Cliente envia pedido", "P", "m", 0.1, "estruturado:v2"),
+])
+def test_chave_distingue_prompt_modelo_temperatura_e_modo(diferente):
+    assert chave_cache(*diferente) != chave_cache("Cliente envia pedido", "P", "m", 0.1)
+
+
+def test_persistencia_entre_instancias(tmp_path):
+    caminho = str(tmp_path / "sub" / "respostas.sqlite3")
+    cache = CacheRespostas(caminho=caminho)
+    cache.set("a", {"processo": "Compra", "elementos": [{"id": "Task_1", "nome": "Ação"}]})
+    cache.fechar()
+
+    reaberto = CacheRespostas(caminho=caminho)
+    assert reaberto.get("a") == {"processo": "Compra", "elementos": [{"id": "Task_1", "nome": "Ação"}]}
+    assert reaberto.get("a") is not None
+    estatisticas = reaberto.estatisticas()
+    assert (estatisticas["hits_disco"], estatisticas["hits_memoria"]) == (1, 1)
+    reaberto.fechar()
+
+
+def test_disco_limitado_descarta_menos_acessados(relogio, tmp_path):
+    cache = CacheRespostas(caminho=str(tmp_path / "c.sqlite3"), max_memoria=1, max_disco=2)
+    cache.set("a", {"v": 1})
+    relogio.agora += 1
+    cache.set("b", {"v": 2})
+    relogio.agora += 1
+    assert cache.get("a") == {"v": 1}  # vem do disco e atualiza o acesso
+    relogio.agora += 1
+    cache.set("c", {"v": 3})
+    assert cache.estatisticas()["itens_disco"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
@@ -0,0 +1,92 @@
+"""Coalescedor: chamadas idênticas simultâneas viram uma só"""
+
+import threading
+import time
+
+import pytest
+
+from gerador_bpmn.coalescencia import Coalescedor
+
+N = 8
+
+
+class Contador:
+    """Função retida até `liberar`, contando quantas vezes foi chamada"""
+
+    def __init__(self, erro=None):
+        self.chamadas = 0
+        self.liberar = threading.Event()
+        self.erro = erro
+
+    def __call__(self):
+        self.chamadas += 1
+        assert self.liberar.wait(10)
+        if self.erro is not None:
+            raise self.erro
+        return {"elementos": [self.chamadas]}
+
+
+def concorrentes(coalescedor, funcao, chave="k") -> list:
+    """Dispara N chamadas; libera a função quando todas estão esperando; devolve (resultado, erro) de cada"""
+    saidas = [None] * N
+
+    def _chamar(i):
+        try:
+            saidas[i] = (coalescedor.executar(chave, funcao), None)
+        except Exception as e:
+            saidas[i] = (None, e)
+
+    threads = [threading.Thread(target=_chamar, args=(i,), daemon=True) for i in range(N)]
+    for thread in threads:
+        thread.start()
+    limite = time.monotonic() + 5
+    while coalescedor.metricas()["coalescidas"] < N - 1:
+        assert time.monotonic() < limite, "as chamadas não se juntaram"
+        time.sleep(0.001)
+    funcao.liberar.set()
+    for thread in threads:
+        thread.join(5)
+    return saidas
+
+
+def test_uma_chamada_para_todos():
+    coalescedor = Coalescedor()
+    funcao = Contador()
+    saidas = concorrentes(coalescedor, funcao)
+    assert funcao.chamadas == 1
+    assert [r for r, _ in saidas] == [{"elementos": [1]}] * N
+    # Cada chamador recebe o seu objeto
+    assert len({id(r) for r, _ in saidas}) == N
+    metricas = coalescedor.metricas()
+    assert (metricas["executadas"], metricas["coalescidas"], metricas["max_seguidores"]) == (1, N - 1, N - 1)
+
+
+def test_excecao_chega_a_todos():
+    coalescedor = Coalescedor()
+    erro = RuntimeError("cota esgotada")
+    funcao = Contador(erro)
+    saidas = concorrentes(coalescedor, funcao)
+    assert funcao.chamadas == 1
+    assert all(r is None and e is erro for r, e in saidas)
+    assert coalescedor.metricas()["erros"] == 1
+
+
+@pytest.mark.parametrize("erro", [None, ValueError("resposta inválida")])
+def test_chave_liberada_depois(erro):
+    coalescedor = Coalescedor()
+    concorrentes(coalescedor, Contador(erro))
+    assert coalescedor.metricas()["em_andamento"] == 0
+
+    seguinte = Contador()
+    seguinte.liberar.set()
+    assert coalescedor.executar("k", seguinte) == {"elementos": [1]}
+    assert seguinte.chamadas == 1
+
+
+def test_chaves_diferentes_nao_se_juntam():
+    coalescedor = Coalescedor()
+    funcao = Contador()
+    funcao.liberar.set()
+    assert coalescedor.executar("a", funcao) == {"elementos": [1]}
+    assert coalescedor.executar("b", funcao) == {"elementos": [2]}
+    assert coalescedor.metricas()["coalescidas"] == 0
@@ -0,0 +1,57 @@
+"""Extração do JSON da resposta: um caso por caminho de reparo"""
+
+import pytest
+
+from gerador_bpmn.extracao import REPAROS, extrair_json, extrair_json_com_reparos
+
+CASOS = [
+    ("texto_ao_redor", 'Aqui está:\n```json\n{"a": 1}\n```\nEspero ter ajudado.', {"a": 1}),
+    ("comentarios", '{"a": 1, // id\n "b": /* x */ 2, # fim\n}', {"a": 1, "b": 2}),
+    ("aspas_simples", "{'a': 'x', 'b': 'it\\'s \"ok\"'}", {"a": "x", "b": 'it\'s "ok"'}),
+    ("chaves_sem_aspas", "{a: 1, tipo_2: 2}", {"a": 1, "tipo_2": 2}),
+    ("texto_sem_aspas", '{"tipo": userTask}', {"tipo": "userTask"}),
+    ("literais_python", '{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ("virgula_final", '{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ("virgula_ausente", '{"a": 1 "b": 2}', {"a": 1, "b": 2}),
+    ("virgula_extra", '{"a": 1,, "b": 2}', {"a": 1, "b": 2}),
+    ("dois_pontos_ausentes", '{"a" 1}', {"a": 1}),
+    ("valor_ausente", '{"a": }', {"a": None}),
+    ("quebra_em_string", '{"a": "linha 1\nlinha 2\tfim\x01"}', {"a": "linha 1\nlinha 2\tfim\x01"}),
+    ("numero_invalido", '{"a": 01, "b": .5, "c": 5., "d": -0.25}', {"a": 1, "b": 0.5, "c": 5.0, "d": -0.25}),
+    ("escape_invalido", '{"a": "C:\\dados"}', {"a": "C:\\dados"}),
+    ("fechamento_trocado", '{"a": [1, 2}', {"a": [1, 2]}),
+    ("caractere_invalido", '{"a": @1}', {"a": 1}),
+    ("truncado", '{"elementos": [{"id": "A"}, {"id": "B", "nome": "Apro',
+     {"elementos": [{"id": "A"}, {"id": "B"}]}),
+]
+
+
+def test_todo_reparo_tem_caso():
+    assert {codigo for codigo, _, _ in CASOS} == set(REPAROS)
+
+
+@pytest.mark.parametrize("codigo, texto, esperado", CASOS, ids=[c[0] for c in CASOS])
+def test_reparo(codigo, texto, esperado):
+    dados, reparos = extrair_json_com_reparos(texto)
+    assert dados == esperado
+    assert codigo in reparos
+
+
+@pytest.mark.parametrize("texto", [
+    '{"a": 1}',
+    '```json\n{"a": [1, 2], "b": "x"}\n```',
+    '\n  {"a": {"b": null}}  \n',
+])
+def test_json_valido_sem_reparos(texto):
+    assert extrair_json_com_reparos(texto)[1] == []
+
+
+def test_bloco_cercado_vence_exemplo_anterior():
+    texto = 'Formato: {"exemplo": true}\n```json\n{"processo": "P"}\n```'
+    assert extrair_json(texto) == {"processo": "P"}
+
+
+@pytest.mark.parametrize("texto", ["", "Não consegui gerar o processo.", "```json\n```"])
+def test_sem_json_falha(texto):
+    with pytest.raises(ValueError):
+        extrair_json(texto)
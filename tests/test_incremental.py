@@ -0,0 +1,31 @@
+"""Patch do JSON: itens malformados viram ValueError (e os chamadores geram do zero)"""
+
+import pytest
+
+from gerador_bpmn.incremental import aplicar_patch
+
+DATA = {
+    "processo": "P",
+    "elementos": [{"id": "A", "tipo": "task"}, {"id": "B", "tipo": "task"}],
+    "fluxos": [{"id": "F1", "origem": "A", "destino": "B"}],
+}
+
+
+@pytest.mark.parametrize("patch", [
+    {"remover_elementos": [{"id": "A"}]},
+    {"remover_fluxos": [["F1"]]},
+    {"alterar_elementos": [{"id": 3, "nome": "x"}]},
+    {"alterar_fluxos": ["F1"]},
+    {"adicionar_elementos": {"id": "C"}},
+    ["nao", "e", "objeto"],
+])
+def test_patch_malformado(patch):
+    with pytest.raises(ValueError):
+        aplicar_patch(DATA, patch)
+
+
+def test_patch_valido_remove_fluxos_orfaos():
+    novo = aplicar_patch(DATA, {"remover_elementos": ["B"], "adicionar_elementos": [{"id": {"x": 1}}]})
+    assert [e["id"] for e in novo["elementos"]] == ["A"]
+    assert novo["fluxos"] == []
+    assert len(DATA["elementos"]) == 2  # o original não muda
@@ -0,0 +1,150 @@
+"""Serviço HTTP com o LLM falso, numa porta livre escolhida pelo sistema"""
+
+import http.client
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from gerador_bpmn.agendador import PRIORIDADE_INTERATIVA
+from gerador_bpmn.servico import PROCESSANDO, Servico, criar_servidor
+from gerador_bpmn.stub import LLMStub, _conteudo
+
+DESCRICAO = "Processo de compra:\n1. Funcionário cria pedido\n2. Gerente aprova\n3. Compras executa"
+
+
+class LLMRetido(LLMStub):
+    """Só responde depois de `liberar`; guarda a ordem das descrições atendidas"""
+
+    def __init__(self):
+        super().__init__()
+        self.liberar = threading.Event()
+        self.atendidas = []
+
+    def _texto(self, messages) -> str:
+        assert self.liberar.wait(10)
+        self.atendidas.append(_conteudo(messages[-1]).split("Descrição:", 1)[-1].strip())
+        return super()._texto(messages)
+
+
+@pytest.fixture(autouse=True)
+def sem_langchain(monkeypatch):
+    monkeypatch.setitem(sys.modules, "langchain_core", None)
+    monkeypatch.setitem(sys.modules, "langchain_core.messages", None)
+
+
+@pytest.fixture
+def servidor():
+    iniciados = []
+
+    def _iniciar(llm=None, concorrencia=2):
+        servico = Servico(concorrencia=concorrencia, llm=llm or LLMStub())
+        servico.iniciar()
+        http_servidor = criar_servidor(servico, porta=0, timeout_sincrono=10, silencioso=True)
+        threading.Thread(target=http_servidor.serve_forever, args=(0.05,), daemon=True).start()
+        iniciados.append((servico, http_servidor))
+        return servico, http_servidor.server_port
+
+    yield _iniciar
+    for servico, http_servidor in iniciados:
+        http_servidor.shutdown()
+        http_servidor.server_close()
+        servico.parar()
+
+
+def requisitar(porta: int, metodo: str, caminho: str, corpo=None, cabecalhos=None) -> tuple:
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=10)
+    try:
+        if isinstance(corpo, dict):
+            corpo = json.dumps(corpo).encode("utf-8")
+        conexao.request(metodo, caminho, body=corpo, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        bruto = resposta.read()
+        if resposta.getheader("Content-Type", "").startswith("application/json"):
+            return resposta.status, json.loads(bruto)
+        return resposta.status, bruto.decode("utf-8")
+    finally:
+        conexao.close()
+
+
+def test_gerar_e_consultar_job(servidor):
+    _, porta = servidor()
+    status, corpo = requisitar(porta, "POST", "/gerar", {"descricao": DESCRICAO})
+    assert status == 200
+    assert corpo["status"] == "concluido"
+    assert "definitions" in corpo["bpmn"]
+
+    status, job = requisitar(porta, "GET", f"/jobs/{corpo['id']}")
+    assert status == 200
+    assert job["status"] == "concluido"
+    assert job["elementos"] == len(corpo["processo"]["elementos"])
+    status, xml = requisitar(porta, "GET", f"/jobs/{corpo['id']}/bpmn")
+    assert status == 200 and xml == corpo["bpmn"]
+
+
+def test_pedidos_identicos_compartilham_o_job(servidor):
+    llm = LLMRetido()
+    servico, porta = servidor(llm)
+    status1, primeiro = requisitar(porta, "POST", "/jobs", {"descricao": DESCRICAO})
+    status2, segundo = requisitar(porta, "POST", "/jobs", {"descricao": DESCRICAO})
+    assert (status1, status2) == (202, 202)
+    assert segundo["id"] == primeiro["id"]
+    assert (primeiro["deduplicado"], segundo["deduplicado"]) == (False, True)
+
+    llm.liberar.set()
+    assert servico.obter(primeiro["id"]).pronto.wait(10)
+    assert llm.chamadas == 1
+    assert servico.metricas()["deduplicados"] == 1
+
+
+def test_job_de_lote_promovido_passa_na_frente(servidor):
+    llm = LLMRetido()
+    servico, porta = servidor(llm, concorrencia=1)
+    ocupado, _ = servico.submeter("Processo X:\n1. Alguém ocupa o worker")
+    limite = time.monotonic() + 5
+    while ocupado.status != PROCESSANDO:
+        assert time.monotonic() < limite, "o worker não pegou o primeiro job"
+        time.sleep(0.001)
+    a, _ = servico.submeter("Processo A:\n1. Lote chega primeiro")
+    b, _ = servico.submeter("Processo B:\n1. Lote chega depois")
+    # /gerar sobre B enquanto B espera na fila: o mesmo job, agora interativo
+    promovido, novo = servico.submeter(b.descricao, prioridade=PRIORIDADE_INTERATIVA)
+    assert promovido is b and not novo
+    assert b.prioridade == PRIORIDADE_INTERATIVA
+
+    llm.liberar.set()
+    for job in (ocupado, a, b):
+        assert job.pronto.wait(10)
+    assert [d.split(":")[0] for d in llm.atendidas] == ["Processo X", "Processo B", "Processo A"]
+    assert llm.chamadas == 3  # a entrada antiga de B na fila é ignorada
+
+
+@pytest.mark.parametrize("tamanho, status", [("abc", 400), ("-1", 400), ("²", 400), ("2000000", 413)])
+def test_content_length_invalido(servidor, tamanho, status):
+    _, porta = servidor()
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=10)
+    try:
+        conexao.putrequest("POST", "/jobs")
+        conexao.putheader("Content-Length", tamanho.encode("utf-8"))
+        conexao.endheaders()
+        resposta = conexao.getresponse()
+        assert resposta.status == status
+        assert "erro" in json.loads(resposta.read())
+    finally:
+        conexao.close()
+
+
+def test_erro_inesperado_vira_500(servidor, monkeypatch):
+    servico, porta = servidor()
+
+    def _quebrar():
+        raise RuntimeError("falha interna")
+
+    monkeypatch.setattr(servico, "metricas", _quebrar)
+    status, corpo = requisitar(porta, "GET", "/saude")
+    assert status == 500
+    assert corpo == {"erro": "Erro interno: RuntimeError"}
+    # O servidor continua atendendo
+    assert requisitar(porta, "GET", "/jobs/inexistente")[0] == 404
@@ -0,0 +1,79 @@
+"""Índice de descrições parecidas: limiar, substituição, descarte e persistência"""
+
+import pytest
+
+from gerador_bpmn.similaridade import IndiceSimilaridade, assinatura, similaridade
+
+COMPRA = "Processo de compra:\n1. Funcionário cria o pedido\n2. Gerente aprova o pedido\n3. Compras emite a ordem"
+REESCRITA = "PROCESSO DE COMPRA:\n- funcionario cria um pedido\n- gerente aprova pedido\n- compras emite ordem"
+EDITADA = "Processo de compra:\n1. Funcionário cria o pedido\n2. Diretor aprova o pedido\n3. Compras emite a ordem"
+OUTRA = "Processo de férias:\n1. Colaborador solicita férias\n2. RH registra no sistema"
+
+
+@pytest.fixture
+def indice():
+    return IndiceSimilaridade(caminho=None)
+
+
+def test_reescrita_tem_a_mesma_assinatura():
+    assert similaridade(assinatura(COMPRA), assinatura(REESCRITA)) == 1.0
+
+
+def test_limiar(indice):
+    indice.adicionar(COMPRA, {"processo": "compra"})
+    valor = similaridade(assinatura(COMPRA), assinatura(EDITADA))
+    assert 0.3 < valor < 1.0
+    parecido = indice.buscar(EDITADA, limiar=valor)
+    assert parecido is not None and parecido.similaridade == valor
+    assert parecido.dados == {"processo": "compra"} and parecido.descricao == COMPRA
+    assert indice.buscar(EDITADA, limiar=valor + 0.01) is None
+    assert indice.buscar(OUTRA, limiar=indice.limiar_adaptacao) is None
+
+
+def test_contexto_separa(indice):
+    indice.adicionar(COMPRA, {"processo": "compra"}, contexto="m|0.1|texto")
+    assert indice.buscar(COMPRA, contexto="m|0.1|compacto") is None
+    assert indice.buscar(COMPRA, contexto="m|0.1|texto") is not None
+
+
+def test_mesma_descricao_substitui(indice):
+    indice.adicionar(COMPRA, {"versao": 1})
+    indice.adicionar("  " + COMPRA.replace("\n", "\n\n") + "  ", {"versao": 2})
+    assert len(indice) == 1
+    assert indice.buscar(COMPRA).dados == {"versao": 2}
+
+
+def test_descarta_o_mais_antigo():
+    indice = IndiceSimilaridade(caminho=None, max_itens=2)
+    indice.adicionar(COMPRA, {"i": 0})
+    indice.adicionar(OUTRA, {"i": 1})
+    indice.adicionar("Processo de viagem:\n1. Colaborador pede passagens", {"i": 2})
+    assert len(indice) == 2
+    assert indice.buscar(COMPRA, limiar=0.9) is None
+    assert indice.buscar(OUTRA, limiar=0.9).dados == {"i": 1}
+
+
+@pytest.mark.parametrize("vazia", ["", "...", "1. o\n2. a", "de da do e para"])
+def test_texto_sem_termos_nao_casa_nem_e_indexado(indice, vazia):
+    indice.adicionar(vazia, {"processo": "vazio"})
+    assert len(indice) == 0
+    indice.adicionar("!!!", {"processo": "outro vazio"})
+    assert indice.buscar(vazia) is None
+    assert assinatura(vazia) is None
+
+
+def test_recarrega_do_sqlite(tmp_path):
+    caminho = str(tmp_path / "similares.sqlite3")
+    indice = IndiceSimilaridade(caminho=caminho, max_itens=2)
+    for i, texto in enumerate([COMPRA, OUTRA, EDITADA]):
+        indice.adicionar(texto, {"i": i}, contexto="c")
+    indice.fechar()
+
+    reaberto = IndiceSimilaridade(caminho=caminho, max_itens=2)
+    assert len(reaberto) == 2
+    assert reaberto.buscar(EDITADA, contexto="c", limiar=1.0).dados == {"i": 2}
+    assert reaberto.buscar(OUTRA, contexto="c", limiar=1.0).dados == {"i": 1}
+    # Novos ids continuam depois dos gravados: nada é sobrescrito
+    reaberto.adicionar("Processo de viagem:\n1. Colaborador pede passagens", {"i": 3}, contexto="c")
+    reaberto.fechar()
+    assert len(IndiceSimilaridade(caminho=caminho, max_itens=10)) == 2
@@ -0,0 +1,69 @@
+"""Pipeline completo offline com o LLM falso (sem rede e sem LangChain)"""
+
+import json
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from gerador_bpmn.cache import CacheRespostas
+from gerador_bpmn.cli import main
+from gerador_bpmn.geracao import gerar_bpmn
+from gerador_bpmn.incremental import montar_diagrama
+from gerador_bpmn.stub import LLMStub
+
+DESCRICAO = (
+    "Processo de compra:\n1. Funcionário cria pedido\n2. Se valor alto: gerente aprova\n"
+    "3. Sistema emite nota automaticamente\n4. Compras executa"
+)
+BPMN = "{http://www.omg.org/spec/BPMN/20100524/MODEL}"
+
+
+@pytest.fixture(autouse=True)
+def sem_langchain(monkeypatch):
+    # Um import de langchain_core levanta ImportError: o modo offline não pode depender dele
+    monkeypatch.setitem(sys.modules, "langchain_core", None)
+    monkeypatch.setitem(sys.modules, "langchain_core.messages", None)
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+def test_gerar_e_montar_diagrama(compacto):
+    llm = LLMStub()
+    data = gerar_bpmn(DESCRICAO, "stub", 0.0, llm=llm, compacto=compacto)
+    assert llm.chamadas == 1
+
+    diagrama = montar_diagrama(data)
+    tipos = [e["tipo"] for e in diagrama.data["elementos"]]
+    assert tipos[0] == "startEvent" and tipos[-1] == "endEvent"
+    assert "exclusiveGateway" in tipos and "serviceTask" in tipos
+
+    processo = ET.fromstring(diagrama.xml()).find(f"{BPMN}process")
+    assert len(processo.findall(f"{BPMN}sequenceFlow")) == len(diagrama.data["fluxos"])
+    assert diagrama.svg().startswith("<svg")
+
+
+def test_cache_separa_os_modos_de_saida():
+    llm = LLMStub()
+    cache = CacheRespostas(caminho=None)
+    for i, modo in enumerate([{}, {"estruturado": True}, {"compacto": True}], start=1):
+        gerar_bpmn(DESCRICAO, "stub", 0.0, llm=llm, cache=cache, **modo)
+        gerar_bpmn(DESCRICAO, "stub", 0.0, llm=llm, cache=cache, **modo)
+        assert llm.chamadas == i
+
+
+def test_cli_em_lote(tmp_path):
+    entrada = tmp_path / "entrada.jsonl"
+    entrada.write_text(
+        "\n".join(json.dumps({"id": f"p{i}", "descricao": DESCRICAO}) for i in range(3)),
+        encoding="utf-8",
+    )
+    saida = tmp_path / "saida"
+
+    assert main([str(entrada), "--saida", str(saida), "--stub", "--silencioso", "--svg"]) == 0
+
+    relatorio = json.loads((saida / "relatorio.json").read_text(encoding="utf-8"))
+    assert relatorio["resumo"]["sucesso"] == 3 and relatorio["resumo"]["falhas"] == 0
+    for i in range(3):
+        ET.parse(saida / f"p{i}.bpmn")
+        assert json.loads((saida / f"p{i}.json").read_text(encoding="utf-8"))["elementos"]
+        assert (saida / f"p{i}.svg").exists()
@@ -0,0 +1,19 @@
+"""Normalização do JSON: extremos de fluxo que não são ids"""
+
+import pytest
+
+from gerador_bpmn.validacao import normalizar_processo
+
+ELEMENTOS = [{"id": "A", "tipo": "task", "nome": "a"}, {"id": "B", "tipo": "task", "nome": "b"}]
+
+
+@pytest.mark.parametrize("fluxo, codigo", [
+    ({"id": "F", "origem": ["A"], "destino": "B"}, "fluxo_sem_origem"),
+    ({"id": "F", "origem": {"id": "A"}, "destino": "B"}, "fluxo_sem_origem"),
+    ({"id": "F", "origem": "A", "destino": ["B"]}, "fluxo_sem_destino"),
+    ({"id": "F", "origem": "A", "destino": {"id": "B"}}, "fluxo_sem_destino"),
+])
+def test_extremo_nao_texto_conta_como_ausente(fluxo, codigo):
+    data, problemas = normalizar_processo({"processo": "P", "elementos": ELEMENTOS, "fluxos": [fluxo]})
+    assert codigo in [p.codigo for p in problemas]
+    assert all(f.get("id") != "F" for f in data["fluxos"])
@@ -0,0 +1,45 @@
+"""Visualizador bpmn-js como componente Streamlit, com assets servidos localmente
+
+O iframe do componente é criado uma vez por `key` e sobrevive aos reruns:
+a cada render o Streamlit só envia os argumentos (o XML), e o frontend
+reimporta o diagrama apenas quando o XML muda. O bundle do bpmn-js fica em
+frontend/vendor: se ainda não estiver lá, é baixado no primeiro uso (ou
+antes, com `python -m visualizador.baixar_assets`). Só se o download
+falhar o frontend recorre ao CDN.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import streamlit.components.v1 as components
+
+from .baixar_assets import DESTINO, FRONTEND, baixar
+
+logger = logging.getLogger(__name__)
+
+_componente = components.declare_component("visualizador_bpmn", path=str(FRONTEND))
+_lock = threading.Lock()
+_tentou_baixar = False
+
+
+def _garantir_bundle() -> None:
+    """Baixa o bundle na primeira renderização do processo, se ele ainda não existir"""
+    global _tentou_baixar
+    if _tentou_baixar or DESTINO.exists():
+        return
+    with _lock:
+        if _tentou_baixar:
+            return
+        _tentou_baixar = True
+        try:
+            baixar(timeout=15)
+            logger.info("bpmn-js baixado para %s", DESTINO)
+        except OSError as e:
+            logger.warning("Não foi possível baixar o bpmn-js (%s); o visualizador vai usar o CDN", e)
+
+
+def visualizador_bpmn(xml: str, altura: int = 700, key: Optional[str] = None):
+    """Renderiza o diagrama; reutiliza o iframe existente quando `key` se repete entre reruns"""
+    _garantir_bundle()
+    return _componente(xml=xml, altura=altura, key=key, default=None)
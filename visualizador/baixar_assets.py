@@ -0,0 +1,38 @@
+"""Baixa o bundle do bpmn-js para frontend/vendor (redes sem acesso ao CDN em produção)
+
+O visualizador já baixa o bundle no primeiro uso; rodar o script antes
+evita a espera na primeira renderização (e serve para imagens de deploy).
+BPMN_JS_URL (ou o argumento) aponta para um espelho interno.
+
+Uso:
+    python -m visualizador.baixar_assets
+    python -m visualizador.baixar_assets https://espelho.interno/bpmn-viewer.production.min.js
+"""
+
+import os
+import sys
+import urllib.request
+from pathlib import Path
+
+# Mantenha em sincronia com VERSAO_BPMN_JS em frontend/main.js
+VERSAO_BPMN_JS = "17.11.1"
+ARQUIVO = "bpmn-viewer.production.min.js"
+URL = os.environ.get("BPMN_JS_URL") or f"https://unpkg.com/bpmn-js@{VERSAO_BPMN_JS}/dist/{ARQUIVO}"
+
+FRONTEND = Path(__file__).parent / "frontend"
+DESTINO = FRONTEND / "vendor" / ARQUIVO
+
+
+def baixar(url: str = URL, destino: Path = DESTINO, timeout: float = 60) -> Path:
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with urllib.request.urlopen(url, timeout=timeout) as resposta:
+        conteudo = resposta.read()
+    temporario = destino.with_suffix(".tmp")
+    temporario.write_bytes(conteudo)
+    temporario.replace(destino)
+    return destino
+
+
+if __name__ == "__main__":
+    caminho = baixar(sys.argv[1] if len(sys.argv) > 1 else URL)
+    print(f"{caminho} ({caminho.stat().st_size // 1024} KB)")
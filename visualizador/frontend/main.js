@@ -0,0 +1,133 @@
+// Componente Streamlit sem build: fala o protocolo de mensagens do
+// streamlit-component-lib diretamente (componentReady / render / setFrameHeight).
+
+// Mantenha em sincronia com VERSAO_BPMN_JS em baixar_assets.py
+const VERSAO_BPMN_JS = '17.11.1';
+const BUNDLE = 'bpmn-viewer.production.min.js';
+const FONTES_BUNDLE = [
+    // A versão na query string separa o cache do navegador entre atualizações
+    `vendor/${BUNDLE}?v=${VERSAO_BPMN_JS}`,
+    `https://unpkg.com/bpmn-js@${VERSAO_BPMN_JS}/dist/${BUNDLE}`,
+];
+
+let viewer = null;
+let xmlAtual = null;
+let alturaAtual = null;
+let fila = Promise.resolve();
+
+function enviar(tipo, dados) {
+    window.parent.postMessage(Object.assign({ isStreamlitMessage: true, type: tipo }, dados), '*');
+}
+
+function carregarScript(src) {
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = src;
+        script.onload = resolve;
+        script.onerror = () => { script.remove(); reject(new Error(src)); };
+        document.head.appendChild(script);
+    });
+}
+
+async function carregarBpmnJs() {
+    for (const src of FONTES_BUNDLE) {
+        try {
+            await carregarScript(src);
+            return;
+        } catch (err) {
+            console.warn('bpmn-js indisponível em', src);
+        }
+    }
+    throw new Error('Não foi possível carregar o bpmn-js');
+}
+
+const pronto = carregarBpmnJs().then(() => {
+    viewer = new BpmnJS({ container: '#canvas' });
+});
+
+function mostrarErro(err) {
+    console.error('Erro:', err);
+    document.getElementById('canvas').innerHTML =
+        '<div class="erro">❌ Erro ao renderizar diagrama</div>';
+    // O viewer perdeu o container; recria no próximo XML
+    viewer = null;
+}
+
+async function importar(xml) {
+    await pronto;
+    if (viewer === null) {
+        document.getElementById('canvas').innerHTML = '';
+        viewer = new BpmnJS({ container: '#canvas' });
+    }
+    await viewer.importXML(xml);
+    viewer.get('canvas').zoom('fit-viewport');
+    updateZoom();
+}
+
+function ajustarAltura(altura) {
+    if (altura === alturaAtual) {
+        return;
+    }
+    alturaAtual = altura;
+    document.getElementById('canvas').style.height = (altura - 50) + 'px';
+    enviar('streamlit:setFrameHeight', { height: altura });
+}
+
+window.addEventListener('message', (event) => {
+    if (!event.data || event.data.type !== 'streamlit:render') {
+        return;
+    }
+    const args = event.data.args || {};
+    ajustarAltura(args.altura || 700);
+    // Reruns sem mudança no XML não tocam no diagrama (zoom e posição ficam)
+    if (args.xml === xmlAtual) {
+        return;
+    }
+    xmlAtual = args.xml;
+    const xml = args.xml;
+    fila = fila.then(() => importar(xml)).catch(mostrarErro);
+});
+
+function updateZoom() {
+    const zoom = Math.round(viewer.get('canvas').zoom() * 100);
+    document.getElementById('zoom').textContent = zoom + '%';
+}
+
+function zoomPor(delta) {
+    if (viewer === null) {
+        return;
+    }
+    const canvas = viewer.get('canvas');
+    canvas.zoom(canvas.zoom() + delta);
+    updateZoom();
+}
+
+function zoomFit() {
+    if (viewer === null) {
+        return;
+    }
+    viewer.get('canvas').zoom('fit-viewport');
+    updateZoom();
+}
+
+async function downloadSVG() {
+    try {
+        const { svg } = await viewer.saveSVG();
+        const blob = new Blob([svg], { type: 'image/svg+xml' });
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = 'diagrama-bpmn.svg';
+        a.click();
+        URL.revokeObjectURL(url);
+    } catch (err) {
+        console.error('Erro ao baixar:', err);
+    }
+}
+
+document.getElementById('zoom-mais').addEventListener('click', () => zoomPor(0.1));
+document.getElementById('zoom-menos').addEventListener('click', () => zoomPor(-0.1));
+document.getElementById('zoom-ajustar').addEventListener('click', zoomFit);
+document.getElementById('baixar-svg').addEventListener('click', downloadSVG);
+
+enviar('streamlit:componentReady', { apiVersion: 1 });